@@ -0,0 +1,282 @@
+"""
+Alta masiva de socios desde una planilla (CSV exportado desde Excel u hoja de cálculo).
+
+Todo el archivo se valida antes de escribir: RUT en una pasada vectorizada y
+duplicados contra conjuntos en memoria armados con dos consultas. Luego User,
+PerfilUsuario y Cliente se insertan por lotes con bulk_create, con contraseña
+inutilizable, y en la misma transacción una CredencialPendiente por socio.
+
+Las contraseñas temporales no se generan en el alta (ni se guardan en texto
+plano): enviar_credenciales_pendientes (comando enviar_credenciales) las
+genera, las hashea en paralelo, las asigna y las envía por correo. Si el
+proceso se cae, las credenciales no enviadas quedan pendientes y se reintentan
+con una contraseña nueva, hasta MAX_INTENTOS_CREDENCIAL envíos fallidos.
+
+Cada credencial guarda su usuario y el hash que se le dejó a la cuenta (el
+inutilizable del alta, luego el de cada intento). Solo se asigna una contraseña
+si la cuenta sigue con ese hash: si un administrador o el socio la cambiaron,
+o la cuenta ya no existe, la credencial se descarta.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMessage, get_connection
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import F
+from .busqueda import indexar_lote
+from .hashing import hashear_passwords
+from .models import Cliente, CredencialPendiente, PerfilUsuario
+from .notifications import ASUNTO_CREDENCIALES, mensaje_credenciales
+from .sincronizacion_entrenador import registrar_cambios
+from .utils import en_lotes, formatear_ruts, generar_password_temporal, validar_ruts
+import re
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+NOMBRE_VALIDO = re.compile(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s]+$')
+MAX_INTENTOS_CREDENCIAL = 5
+MEMBRESIAS = {clave: clave for clave, _ in Cliente.TIPOS_MEMBRESIA}
+MEMBRESIAS.update({nombre.lower(): clave for clave, nombre in Cliente.TIPOS_MEMBRESIA})
+
+
+def _existentes():
+    """RUT (cuerpo numérico) y emails ya registrados, con una consulta a User y otra a Cliente"""
+    usernames, emails = [], set()
+    for username, email in User.objects.values_list('username', 'email').iterator(chunk_size=5000):
+        usernames.append(username)
+        if email:
+            emails.add(email.lower())
+    validos, numeros, _ = validar_ruts(usernames)
+    ruts = {int(numero) for valido, numero in zip(list(validos), list(numeros)) if valido}
+
+    for rut_numero, email in Cliente.objects.values_list('rut_numero', 'email').iterator(chunk_size=5000):
+        if rut_numero is not None:
+            ruts.add(rut_numero)
+        emails.add(email.lower())
+    return ruts, emails
+
+
+class AltaMasivaSocios:
+    """
+    Crea socios (usuario, perfil y cliente) a partir de filas con rut, nombre,
+    email y opcionalmente telefono y membresia. Si alguna fila es inválida no
+    se escribe nada, salvo con omitir_invalidas=True.
+    """
+
+    def __init__(self, tamano_lote=500, dry_run=False, omitir_invalidas=False, enviar_correos=True, max_detalle=500):
+        self.tamano_lote = tamano_lote
+        self.dry_run = dry_run
+        self.omitir_invalidas = omitir_invalidas
+        self.enviar_correos = enviar_correos
+        self.max_detalle = max_detalle
+        self.reporte = {
+            'leidas': 0,
+            'validas': 0,
+            'invalidas': 0,
+            'duplicadas': 0,
+            'creadas': 0,
+            'correos_encolados': 0,
+            'errores': [],
+        }
+
+    def importar(self, filas):
+        socios = self.validar(filas)
+        hay_errores = self.reporte['invalidas'] or self.reporte['duplicadas']
+        if self.dry_run or not socios or (hay_errores and not self.omitir_invalidas):
+            return self.reporte
+
+        for lote in en_lotes(socios, self.tamano_lote):
+            self._crear_lote(lote)
+
+        logger.info(
+            f"Alta masiva de socios: {self.reporte['creadas']} creados de {self.reporte['leidas']} leídos, "
+            f"{self.reporte['correos_encolados']} correos encolados"
+        )
+        return self.reporte
+
+    def _registrar_error(self, numero, fila, motivo):
+        if len(self.reporte['errores']) < self.max_detalle:
+            self.reporte['errores'].append({'fila': numero, 'rut': fila.get('rut', ''), 'motivo': motivo})
+
+    def validar(self, filas):
+        """Valida todo el archivo; retorna los socios válidos y no duplicados"""
+        filas = list(filas)
+        self.reporte['leidas'] = len(filas)
+        validos, numeros, dvs = validar_ruts([fila.get('rut', '') for fila in filas])
+        formateados = formatear_ruts(numeros, dvs)
+        ruts_existentes, emails_existentes = _existentes()
+
+        socios = []
+        for numero, (fila, rut_valido, rut_numero, rut_dv, rut) in enumerate(
+            zip(filas, list(validos), list(numeros), list(dvs), list(formateados)), start=1
+        ):
+            nombre = ' '.join((fila.get('nombre') or '').split())
+            email = (fila.get('email') or '').lower()
+            membresia = MEMBRESIAS.get((fila.get('membresia') or 'anual').lower())
+            motivo = None
+            if not rut_valido:
+                motivo = f"RUT inválido: {fila.get('rut', '')}"
+            elif len(nombre) < 2 or not NOMBRE_VALIDO.match(nombre):
+                motivo = f"Nombre inválido: {nombre}"
+            elif membresia is None:
+                motivo = f"Membresía inválida: {fila.get('membresia')}"
+            else:
+                try:
+                    validate_email(email)
+                except ValidationError:
+                    motivo = f"Email inválido: {email}"
+            if motivo:
+                self.reporte['invalidas'] += 1
+                self._registrar_error(numero, fila, motivo)
+                continue
+
+            # Los conjuntos incluyen las filas ya aceptadas, así también se detectan duplicados dentro del archivo
+            rut_numero = int(rut_numero)
+            if rut_numero in ruts_existentes or email in emails_existentes:
+                self.reporte['duplicadas'] += 1
+                self._registrar_error(
+                    numero, fila,
+                    f"Ya existe un usuario con el RUT: {rut}" if rut_numero in ruts_existentes
+                    else f"Ya existe un usuario con el email: {email}"
+                )
+                continue
+            ruts_existentes.add(rut_numero)
+            emails_existentes.add(email)
+            socios.append({
+                'rut': str(rut),
+                'rut_numero': rut_numero,
+                'rut_dv': str(rut_dv),
+                'nombre': nombre,
+                'email': email,
+                'telefono': (fila.get('telefono') or '')[:20],
+                'membresia': membresia,
+            })
+        self.reporte['validas'] = len(socios)
+        return socios
+
+    def _crear_lote(self, lote):
+        usuarios = [
+            User(
+                username=socio['rut'],
+                email=socio['email'],
+                # Sin hash en el alta: la contraseña temporal se asigna al enviar la credencial
+                password=make_password(None),
+                first_name=socio['nombre'].split()[0],
+                last_name=' '.join(socio['nombre'].split()[1:]),
+            )
+            for socio in lote
+        ]
+        with transaction.atomic():
+            User.objects.bulk_create(usuarios)
+            if any(usuario.pk is None for usuario in usuarios):
+                # MySQL no retorna los ids generados por un INSERT múltiple
+                ids = dict(User.objects.filter(username__in=[u.username for u in usuarios]).values_list('username', 'id'))
+                for usuario in usuarios:
+                    usuario.pk = ids[usuario.username]
+
+            PerfilUsuario.objects.bulk_create([
+                PerfilUsuario(user_id=usuario.pk, debe_cambiar_password=True, rol='cliente')
+                for usuario in usuarios
+            ])
+
+            # bulk_create no llama a save() ni a las señales: qr_code, columnas del RUT, índice y outbox se cubren aquí
+            clientes = [
+                Cliente(user_id=usuario.pk, qr_code=str(uuid.uuid4()), **socio)
+                for usuario, socio in zip(usuarios, lote)
+            ]
+            Cliente.objects.bulk_create(clientes)
+            if any(cliente.pk is None for cliente in clientes):
+                ids = dict(Cliente.objects.filter(user_id__in=[u.pk for u in usuarios]).values_list('user_id', 'id'))
+                for cliente in clientes:
+                    cliente.pk = ids[cliente.user_id]
+            indexar_lote('cliente', clientes)
+            registrar_cambios(cliente.pk for cliente in clientes)
+
+            if self.enviar_correos:
+                CredencialPendiente.objects.bulk_create([
+                    CredencialPendiente(
+                        nombre=socio['nombre'], email=socio['email'], rut=socio['rut'],
+                        user_id=usuario.pk, password_temporal=usuario.password,
+                    )
+                    for usuario, socio in zip(usuarios, lote)
+                ])
+                self.reporte['correos_encolados'] += len(lote)
+        self.reporte['creadas'] += len(lote)
+
+
+def _enviar_lote_credenciales(credenciales, procesos=None):
+    # Se hashea antes de la transacción para no retener los bloqueos de las cuentas
+    passwords = [generar_password_temporal() for _ in credenciales]
+    hashes = hashear_passwords(passwords, procesos=procesos)
+    # La contraseña se asigna antes de enviarla: si el envío falla, el próximo intento asigna otra
+    with transaction.atomic():
+        actuales = dict(
+            User.objects.select_for_update()
+            .filter(id__in=[c.user_id for c in credenciales if c.user_id])
+            .values_list('id', 'password')
+        )
+        vigentes, descartadas = [], []
+        for credencial, password, password_hash in zip(credenciales, passwords, hashes):
+            if credencial.user_id in actuales and actuales[credencial.user_id] == credencial.password_temporal:
+                credencial.password_temporal = password_hash
+                vigentes.append((credencial, password))
+            else:
+                descartadas.append(credencial)
+        User.objects.bulk_update(
+            [User(id=credencial.user_id, password=credencial.password_temporal) for credencial, _ in vigentes],
+            ['password'],
+        )
+        CredencialPendiente.objects.bulk_update([credencial for credencial, _ in vigentes], ['password_temporal'])
+        CredencialPendiente.objects.filter(pk__in=[c.pk for c in descartadas]).delete()
+    for credencial in descartadas:
+        logger.warning(f"Credencial de {credencial.rut} descartada: la cuenta no existe o ya cambió su contraseña")
+
+    enviadas, fallidas = [], []
+    conexion = get_connection()
+    try:
+        conexion.open()
+        for credencial, password in vigentes:
+            mensaje = EmailMessage(
+                ASUNTO_CREDENCIALES, mensaje_credenciales(credencial.nombre, credencial.rut, password),
+                settings.DEFAULT_FROM_EMAIL, [credencial.email], connection=conexion,
+            )
+            try:
+                mensaje.send()
+                enviadas.append(credencial.pk)
+            except Exception as e:
+                logger.error(f"Error enviando credenciales a {credencial.email}: {e}")
+                fallidas.append(credencial.pk)
+    finally:
+        conexion.close()
+        CredencialPendiente.objects.filter(pk__in=enviadas).update(enviado=True)
+        CredencialPendiente.objects.filter(pk__in=fallidas).update(intentos=F('intentos') + 1)
+    return len(enviadas), len(fallidas)
+
+
+def enviar_credenciales_pendientes(tamano_lote=200, procesos=None):
+    """
+    Genera, asigna y envía por correo las contraseñas temporales de las
+    credenciales pendientes, por lotes. Retorna (enviadas, fallidas); las
+    fallidas quedan pendientes para el siguiente intento, salvo las que ya
+    fallaron MAX_INTENTOS_CREDENCIAL veces.
+    """
+    enviadas = fallidas = 0
+    ultimo = 0
+    while True:
+        credenciales = list(
+            CredencialPendiente.objects.filter(enviado=False, intentos__lt=MAX_INTENTOS_CREDENCIAL, pk__gt=ultimo)
+            .order_by('pk')[:tamano_lote]
+        )
+        if not credenciales:
+            break
+        ultimo = credenciales[-1].pk
+        ok, error = _enviar_lote_credenciales(credenciales, procesos=procesos)
+        enviadas += ok
+        fallidas += error
+    if enviadas or fallidas:
+        logger.info(f"Credenciales enviadas: {enviadas}, fallidas: {fallidas}")
+    return enviadas, fallidas
@@ -0,0 +1,257 @@
+"""
+Analítica de ingresos, retención y asistencia con cómputo vectorizado (NumPy)
+
+Los datos se cargan con pocas consultas masivas a arreglos columnares y todas
+las métricas se calculan sobre esos arreglos, sin ciclos por cliente.
+"""
+from datetime import date, datetime, timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from .models import Cliente, Pago, Asistencia
+from .utils import MESES_POR_PLAN
+import logging
+
+logger = logging.getLogger(__name__)
+
+PLANES = list(MESES_POR_PLAN)
+EPOCA = date(1970, 1, 1)
+MESES_HISTORIA = 12
+DIAS_ASISTENCIA = 182
+DIAS_GRACIA_RENOVACION = 30
+MESES_PRONOSTICO = 3
+VIDA_MEDIA_ASISTENCIA = 14  # días
+
+
+def _dia(valor):
+    """Días desde 1970-01-01 para una fecha o datetime (en hora local)"""
+    if hasattr(valor, 'hour'):
+        valor = timezone.localtime(valor).date()
+    return (valor - EPOCA).days
+
+
+def _a_mes(np, dias):
+    """Convierte días desde la época a índice de mes absoluto (meses desde 1970-01)"""
+    return np.asarray(dias, dtype='datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+def _etiqueta_mes(mes):
+    return f"{1970 + mes // 12}-{mes % 12 + 1:02d}"
+
+
+def cargar_datos(hoy=None):
+    """Carga clientes, pagos pagados y asistencias recientes en arreglos columnares (3 consultas)"""
+    import numpy as np
+
+    hoy = hoy or timezone.localdate()
+
+    clientes = list(Cliente.objects.values_list('id', 'fecha_registro', 'activo').iterator(chunk_size=5000))
+    pagos = list(
+        Pago.objects.filter(estado='Pagado')
+        .values_list('cliente_id', 'fecha_pago', 'vencimiento', 'monto', 'plan')
+        .iterator(chunk_size=5000)
+    )
+    desde = timezone.make_aware(datetime.combine(hoy - timedelta(days=DIAS_ASISTENCIA), datetime.min.time()))
+    asistencias = list(
+        Asistencia.objects.filter(fecha__gte=desde).values_list('cliente_id', 'fecha').iterator(chunk_size=5000)
+    )
+
+    ids = np.fromiter((fila[0] for fila in clientes), dtype=np.int64, count=len(clientes))
+    orden = np.argsort(ids)
+    ids = ids[orden]
+    planes = {plan: i for i, plan in enumerate(PLANES)}
+
+    def indices(cliente_ids):
+        return np.searchsorted(ids, np.asarray(cliente_ids, dtype=np.int64))
+
+    return {
+        'hoy': (hoy - EPOCA).days,
+        'cliente_id': ids,
+        'cliente_registro': np.fromiter((_dia(fila[1]) for fila in clientes), dtype=np.int64, count=len(clientes))[orden],
+        'cliente_activo': np.fromiter((fila[2] for fila in clientes), dtype=bool, count=len(clientes))[orden],
+        'pago_cliente': indices([fila[0] for fila in pagos]),
+        'pago_dia': np.fromiter((_dia(fila[1]) for fila in pagos), dtype=np.int64, count=len(pagos)),
+        'pago_vencimiento': np.fromiter((_dia(fila[2]) for fila in pagos), dtype=np.int64, count=len(pagos)),
+        'pago_monto': np.fromiter((fila[3] for fila in pagos), dtype=np.float64, count=len(pagos)),
+        'pago_plan': np.fromiter((planes.get(fila[4], 0) for fila in pagos), dtype=np.int64, count=len(pagos)),
+        'asistencia_cliente': indices([fila[0] for fila in asistencias]),
+        'asistencia_dia': np.fromiter((_dia(fila[1]) for fila in asistencias), dtype=np.int64, count=len(asistencias)),
+    }
+
+
+def retencion_por_cohorte(np, datos, n_meses=MESES_HISTORIA):
+    """
+    Porcentaje de cada cohorte mensual de registro con membresía pagada vigente
+    k meses después. Retorna (meses_cohorte, tamanos, matriz[cohorte, k]) con NaN
+    en las celdas futuras.
+    """
+    n_clientes = len(datos['cliente_id'])
+    mes_inicio = _a_mes(np, datos['hoy']) - n_meses + 1
+
+    # Matriz de actividad cliente x mes mediante un arreglo de diferencias
+    ini = np.clip(_a_mes(np, datos['pago_dia']) - mes_inicio, 0, n_meses)
+    fin = np.clip(_a_mes(np, datos['pago_vencimiento']) - mes_inicio, 0, n_meses)
+    validos = fin > ini
+    diferencias = np.zeros((n_clientes, n_meses + 1), dtype=np.int32)
+    np.add.at(diferencias, (datos['pago_cliente'][validos], ini[validos]), 1)
+    np.add.at(diferencias, (datos['pago_cliente'][validos], fin[validos]), -1)
+    activo = np.cumsum(diferencias[:, :-1], axis=1) > 0
+
+    cohorte = _a_mes(np, datos['cliente_registro']) - mes_inicio
+    en_ventana = (cohorte >= 0) & (cohorte < n_meses)
+    filas = np.nonzero(en_ventana)[0]
+    cohorte = cohorte[en_ventana]
+
+    columnas = cohorte[:, None] + np.arange(n_meses)[None, :]
+    vigentes = columnas < n_meses
+    retenidos = activo[filas[:, None], np.minimum(columnas, n_meses - 1)] & vigentes
+
+    matriz = np.zeros((n_meses, n_meses), dtype=np.float64)
+    np.add.at(matriz, cohorte, retenidos)
+    tamanos = np.bincount(cohorte, minlength=n_meses)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        matriz = matriz / tamanos[:, None] * 100
+    matriz[(np.arange(n_meses)[:, None] + np.arange(n_meses)[None, :]) >= n_meses] = np.nan
+    matriz[tamanos == 0] = np.nan
+
+    return mes_inicio + np.arange(n_meses), tamanos, matriz
+
+
+def mrr_por_plan(np, datos, n_meses=MESES_HISTORIA):
+    """Ingreso mensual recurrente por plan: cada pago aporta monto/meses durante su vigencia"""
+    mes_inicio = _a_mes(np, datos['hoy']) - n_meses + 1
+    meses_plan = np.array([MESES_POR_PLAN[plan] for plan in PLANES], dtype=np.float64)
+
+    ini = np.clip(_a_mes(np, datos['pago_dia']) - mes_inicio, 0, n_meses)
+    fin = np.clip(_a_mes(np, datos['pago_vencimiento']) - mes_inicio, 0, n_meses)
+    mensual = datos['pago_monto'] / meses_plan[datos['pago_plan']]
+
+    diferencias = np.zeros((len(PLANES), n_meses + 1), dtype=np.float64)
+    np.add.at(diferencias, (datos['pago_plan'], ini), mensual)
+    np.add.at(diferencias, (datos['pago_plan'], fin), -mensual)
+    return mes_inicio + np.arange(n_meses), np.cumsum(diferencias[:, :-1], axis=1)
+
+
+def probabilidad_renovacion(np, datos):
+    """
+    Tasa histórica de renovación por plan: fracción de pagos vencidos en el último
+    año seguidos por otro pago del mismo cliente dentro del período de gracia.
+    Retorna (tasas_por_plan, tasa_global, orden, es_ultimo) para reutilizar el orden.
+    """
+    orden = np.lexsort((datos['pago_dia'], datos['pago_cliente']))
+    cliente = datos['pago_cliente'][orden]
+    dia = datos['pago_dia'][orden]
+    vencimiento = datos['pago_vencimiento'][orden]
+    plan = datos['pago_plan'][orden]
+
+    mismo_cliente = np.zeros(len(orden), dtype=bool)
+    mismo_cliente[:-1] = cliente[1:] == cliente[:-1]
+    siguiente_dia = np.empty(len(orden), dtype=np.int64)
+    siguiente_dia[:-1] = dia[1:]
+    renovado = mismo_cliente & (siguiente_dia <= vencimiento + DIAS_GRACIA_RENOVACION)
+
+    hoy = datos['hoy']
+    elegibles = (vencimiento >= hoy - 365) & (vencimiento <= hoy - DIAS_GRACIA_RENOVACION)
+    totales = np.bincount(plan[elegibles], minlength=len(PLANES))
+    renovados = np.bincount(plan[elegibles], weights=renovado[elegibles], minlength=len(PLANES))
+    global_ = renovados.sum() / totales.sum() if totales.sum() else 0.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tasas = np.where(totales > 0, renovados / np.maximum(totales, 1), global_)
+    return tasas, global_, orden, ~mismo_cliente
+
+
+def pronostico_ingresos(np, datos, tasas, orden, es_ultimo, n_meses=MESES_PRONOSTICO):
+    """Ingresos esperados por renovaciones: último pago de cada cliente que vence en los próximos meses"""
+    mes_hoy = _a_mes(np, datos['hoy'])
+    vencimiento = datos['pago_vencimiento'][orden][es_ultimo]
+    monto = datos['pago_monto'][orden][es_ultimo]
+    plan = datos['pago_plan'][orden][es_ultimo]
+
+    desplazamiento = _a_mes(np, vencimiento) - mes_hoy
+    en_horizonte = (desplazamiento >= 0) & (desplazamiento < n_meses) & (vencimiento >= datos['hoy'])
+    esperado = np.bincount(
+        desplazamiento[en_horizonte], weights=(monto * tasas[plan])[en_horizonte], minlength=n_meses
+    )
+    return mes_hoy + np.arange(n_meses), esperado
+
+
+def decaimiento_asistencia(np, datos, semanas=26):
+    """
+    Serie semanal de asistencias y clientes activos cuya asistencia de las últimas
+    4 semanas cayó a menos de la mitad respecto de las 4 anteriores.
+    """
+    n_clientes = len(datos['cliente_id'])
+    edad = datos['hoy'] - datos['asistencia_dia']
+    semana = edad // 7
+    en_rango = (semana >= 0) & (semana < semanas)
+    serie = np.bincount(semana[en_rango], minlength=semanas)[::-1]
+
+    cliente = datos['asistencia_cliente']
+    recientes = np.bincount(cliente[(semana >= 0) & (semana < 4)], minlength=n_clientes)
+    previas = np.bincount(cliente[(semana >= 4) & (semana < 8)], minlength=n_clientes)
+    activos = datos['cliente_activo']
+    en_declive = activos & (previas > 0) & (recientes * 2 < previas)
+
+    peso = 0.5 ** (np.maximum(edad, 0) / VIDA_MEDIA_ASISTENCIA)
+    puntaje = np.bincount(cliente, weights=peso, minlength=n_clientes)
+
+    return {
+        'serie_semanal': serie,
+        'clientes_en_declive': int(en_declive.sum()),
+        'porcentaje_en_declive': float(en_declive.sum() / activos.sum() * 100) if activos.sum() else 0.0,
+        'puntaje_medio': float(puntaje[activos].mean()) if activos.sum() else 0.0,
+    }
+
+
+def calcular_metricas(datos):
+    """Calcula todas las métricas a partir de los arreglos de cargar_datos()"""
+    import numpy as np
+
+    meses_cohorte, tamanos, matriz = retencion_por_cohorte(np, datos)
+    meses_mrr, mrr = mrr_por_plan(np, datos)
+    tasas, tasa_global, orden, es_ultimo = probabilidad_renovacion(np, datos)
+    meses_pronostico, esperado = pronostico_ingresos(np, datos, tasas, orden, es_ultimo)
+    asistencia = decaimiento_asistencia(np, datos)
+    nombres_plan = dict(Cliente.TIPOS_MEMBRESIA)
+
+    return {
+        'cohortes': [
+            {
+                'mes': _etiqueta_mes(int(mes)),
+                'tamano': int(tamano),
+                'valores': [None if np.isnan(valor) else round(float(valor), 1) for valor in fila],
+            }
+            for mes, tamano, fila in zip(meses_cohorte, tamanos, matriz)
+            if tamano > 0
+        ],
+        'mrr_meses': [_etiqueta_mes(int(mes)) for mes in meses_mrr],
+        'mrr_por_plan': [
+            {'plan': nombres_plan[plan], 'serie': [round(float(v)) for v in mrr[i]], 'actual': round(float(mrr[i, -1]))}
+            for i, plan in enumerate(PLANES)
+        ],
+        'mrr_total': round(float(mrr[:, -1].sum())),
+        'renovacion_por_plan': [
+            {'plan': nombres_plan[plan], 'probabilidad': round(float(tasas[i]) * 100, 1)}
+            for i, plan in enumerate(PLANES)
+        ],
+        'renovacion_global': round(float(tasa_global) * 100, 1),
+        'pronostico': [
+            {'mes': _etiqueta_mes(int(mes)), 'esperado': round(float(valor))}
+            for mes, valor in zip(meses_pronostico, esperado)
+        ],
+        'asistencia_semanal': [int(v) for v in asistencia['serie_semanal']],
+        'clientes_en_declive': asistencia['clientes_en_declive'],
+        'porcentaje_en_declive': round(asistencia['porcentaje_en_declive'], 1),
+        'puntaje_asistencia_medio': round(asistencia['puntaje_medio'], 2),
+    }
+
+
+def obtener_metricas(hoy=None):
+    """Métricas del día, cacheadas hasta el día siguiente"""
+    hoy = hoy or timezone.localdate()
+    clave = f'analitica:{hoy.isoformat()}'
+    metricas = cache.get(clave)
+    if metricas is None:
+        metricas = calcular_metricas(cargar_datos(hoy))
+        cache.set(clave, metricas, 60 * 60 * 24)
+        logger.info(f"Métricas analíticas recalculadas para {hoy}")
+    return metricas
@@ -0,0 +1,236 @@
+"""
+Archivo histórico de Asistencia, AuditoriaEvento y NotificacionEnviada.
+
+Las filas más antiguas que el horizonte (GYM_CONFIG['RETENCION_HISTORIAL_DIAS'])
+se mueven a archivos JSONL comprimidos con gzip, uno por tabla y mes:
+ARCHIVO_HISTORICO_DIR/<tabla>/<AAAA-MM>.jsonl.gz. Cada lote se agrega como un
+miembro gzip nuevo y se sincroniza a disco antes de eliminar las filas, en la
+misma transacción que acumula su conteo en ResumenArchivado. Si la transacción
+falla después de escribir, el lote queda repetido en el archivo y se descarta
+al leer por clave primaria: cada fila se cuenta y se lee una sola vez.
+
+registros() y conteo_mensual() combinan el archivo con las filas vigentes, de
+modo que un reporte que abarca períodos archivados no necesita saber dónde
+está cada fila. Debe correr un solo archivado a la vez.
+"""
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .models import Asistencia, AuditoriaEvento, NotificacionEnviada, ResumenArchivado
+import gzip
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+RETENCION_DIAS = 365
+# tabla: (modelo, campo de fecha, clave del resumen mensual)
+TABLAS = {
+    'asistencia': (Asistencia, 'fecha', lambda fila: str(fila['cliente_id'])),
+    'auditoria': (AuditoriaEvento, 'fecha', lambda fila: fila['tipo_evento']),
+    'notificacion': (
+        NotificacionEnviada, 'fecha_envio',
+        lambda fila: f"{fila['template_id']}:{'ok' if fila['exitoso'] else 'error'}",
+    ),
+}
+
+
+class ErrorArchivo(Exception):
+    pass
+
+
+def _tabla(tabla):
+    try:
+        return TABLAS[tabla]
+    except KeyError:
+        raise ErrorArchivo(f"Tabla desconocida: {tabla} (disponibles: {', '.join(TABLAS)})") from None
+
+
+def _campos(modelo):
+    return [campo.attname for campo in modelo._meta.concrete_fields]
+
+
+def directorio():
+    return Path(getattr(settings, 'ARCHIVO_HISTORICO_DIR', Path(settings.BASE_DIR) / 'archivo'))
+
+
+def _ruta(tabla, mes):
+    return directorio() / tabla / f'{mes:%Y-%m}.jsonl.gz'
+
+
+def _mes(fecha):
+    return timezone.localdate(fecha).replace(day=1)
+
+
+def _inicio(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _siguiente_mes(mes):
+    return (mes + timedelta(days=32)).replace(day=1)
+
+
+def _anexar(ruta, filas):
+    """Agrega las filas como un miembro gzip nuevo y las sincroniza a disco"""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta, 'ab') as archivo:
+        tamano = archivo.tell()
+        try:
+            with gzip.GzipFile(fileobj=archivo, mode='wb') as comprimido:
+                for fila in filas:
+                    comprimido.write(json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False).encode() + b'\n')
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        except BaseException:
+            # Un miembro incompleto dejaría ilegible toda la partición
+            archivo.truncate(tamano)
+            raise
+
+
+def _acumular_resumen(tabla, mes, conteos):
+    for clave, cantidad in conteos.items():
+        filtro = ResumenArchivado.objects.filter(tabla=tabla, mes=mes, clave=clave)
+        if not filtro.update(cantidad=F('cantidad') + cantidad):
+            ResumenArchivado.objects.create(tabla=tabla, mes=mes, clave=clave, cantidad=cantidad)
+
+
+def archivar(tabla, dias=None, tamano_lote=5000):
+    """
+    Mueve al archivo las filas de la tabla más antiguas que el horizonte, por
+    lotes de tamano_lote en su propia transacción. Retorna cuántas se movieron.
+    """
+    modelo, campo_fecha, clave = _tabla(tabla)
+    dias = dias if dias is not None else settings.GYM_CONFIG.get('RETENCION_HISTORIAL_DIAS', RETENCION_DIAS)
+    limite = _inicio(timezone.localdate() - timedelta(days=dias))
+    campos = _campos(modelo)
+    archivadas = 0
+    while True:
+        with transaction.atomic():
+            filas = list(
+                modelo.objects.filter(**{f'{campo_fecha}__lt': limite})
+                .order_by(campo_fecha, 'pk')
+                .values(*campos)[:tamano_lote]
+            )
+            if not filas:
+                break
+            por_mes = {}
+            for fila in filas:
+                por_mes.setdefault(_mes(fila[campo_fecha]), []).append(fila)
+            for mes, grupo in por_mes.items():
+                _anexar(_ruta(tabla, mes), grupo)
+                conteos = {}
+                for fila in grupo:
+                    conteos[clave(fila)] = conteos.get(clave(fila), 0) + 1
+                _acumular_resumen(tabla, mes, conteos)
+            modelo.objects.filter(pk__in=[fila['id'] for fila in filas]).delete()
+        archivadas += len(filas)
+    logger.info(f"Historial archivado: {archivadas} filas de {tabla} (horizonte {dias} días)")
+    return archivadas
+
+
+def particiones(tabla):
+    """Meses con archivo de la tabla, en orden"""
+    _tabla(tabla)
+    return sorted(
+        date.fromisoformat(f'{ruta.name[:7]}-01')
+        for ruta in (directorio() / tabla).glob('*.jsonl.gz')
+    )
+
+
+def leer_particion(tabla, mes):
+    """Filas archivadas de un mes como diccionarios, sin repetidos y con la fecha como datetime"""
+    _, campo_fecha, _ = _tabla(tabla)
+    ruta = _ruta(tabla, mes)
+    if not ruta.exists():
+        return
+    vistos = set()
+    try:
+        with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+            for linea in archivo:
+                fila = json.loads(linea)
+                if fila['id'] in vistos:
+                    continue
+                vistos.add(fila['id'])
+                fila[campo_fecha] = datetime.fromisoformat(fila[campo_fecha])
+                yield fila
+    except (OSError, EOFError, ValueError) as e:
+        raise ErrorArchivo(f"Archivo dañado {ruta}: {e}") from e
+
+
+def registros(tabla, desde=None, hasta=None, **filtros):
+    """
+    Filas de la tabla con fecha en [desde, hasta) como diccionarios, primero
+    las archivadas y luego las vigentes. filtros son igualdades por nombre de
+    columna (cliente_id=5, tipo_evento='login').
+    """
+    modelo, campo_fecha, _ = _tabla(tabla)
+    primer_mes = _mes(desde) if desde else None
+    ultimo_mes = _mes(hasta) if hasta else None
+    for mes in particiones(tabla):
+        if (primer_mes and mes < primer_mes) or (ultimo_mes and mes > ultimo_mes):
+            continue
+        for fila in leer_particion(tabla, mes):
+            fecha = fila[campo_fecha]
+            if (desde and fecha < desde) or (hasta and fecha >= hasta):
+                continue
+            if all(fila.get(campo) == valor for campo, valor in filtros.items()):
+                yield fila
+
+    vigentes = modelo.objects.filter(**filtros)
+    if desde:
+        vigentes = vigentes.filter(**{f'{campo_fecha}__gte': desde})
+    if hasta:
+        vigentes = vigentes.filter(**{f'{campo_fecha}__lt': hasta})
+    yield from vigentes.order_by(campo_fecha, 'pk').values(*_campos(modelo)).iterator(chunk_size=2000)
+
+
+def _filtro_clave(tabla, clave):
+    if tabla == 'asistencia':
+        return Q(cliente_id=clave)
+    if tabla == 'auditoria':
+        return Q(tipo_evento=clave)
+    template_id, _, resultado = clave.partition(':')
+    return Q(template_id=template_id, exitoso=resultado == 'ok')
+
+
+def conteo_mensual(tabla, desde, hasta, clave=None):
+    """
+    Filas por mes entre los meses de desde y hasta (fechas, inclusive): el
+    resumen de lo archivado más lo vigente, en dos consultas. clave restringe
+    al cliente, tipo de evento o plantilla:resultado, según la tabla.
+    """
+    modelo, campo_fecha, _ = _tabla(tabla)
+    meses = []
+    mes = desde.replace(day=1)
+    while mes <= hasta:
+        meses.append(mes)
+        mes = _siguiente_mes(mes)
+    conteos = dict.fromkeys(meses, 0)
+    if not meses:
+        return conteos
+
+    archivados = ResumenArchivado.objects.filter(tabla=tabla, mes__gte=meses[0], mes__lte=meses[-1])
+    if clave is not None:
+        archivados = archivados.filter(clave=str(clave))
+    for mes, cantidad in archivados.values_list('mes', 'cantidad'):
+        conteos[mes] += cantidad
+
+    vigentes = modelo.objects.all()
+    if clave is not None:
+        vigentes = vigentes.filter(_filtro_clave(tabla, str(clave)))
+    # Un Count filtrado por mes en vez de TruncMonth: no depende de las tablas de zonas horarias de MySQL
+    por_mes = vigentes.aggregate(**{
+        mes.isoformat(): Count('pk', filter=Q(**{
+            f'{campo_fecha}__gte': _inicio(mes), f'{campo_fecha}__lt': _inicio(_siguiente_mes(mes)),
+        }))
+        for mes in meses
+    })
+    for mes in meses:
+        conteos[mes] += por_mes[mes.isoformat()]
+    return conteos
+
@@ -1,27 +1,16 @@
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth.models import User
-from .models import Cliente, Profesor
+from .services import RutService
 
 class RUTAuthenticationBackend(BaseBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         if username is None or password is None:
             return None
         
-        # Buscar por RUT en Cliente
-        try:
-            cliente = Cliente.objects.get(rut=username, activo=True)
-            if cliente.user and cliente.user.is_active and cliente.user.check_password(password):
-                return cliente.user
-        except Cliente.DoesNotExist:
-            pass
-        
-        # Buscar por RUT en Profesor
-        try:
-            profesor = Profesor.objects.get(rut=username)
-            if profesor.user and profesor.user.is_active and profesor.user.check_password(password):
-                return profesor.user
-        except Profesor.DoesNotExist:
-            pass
+        # Buscar por RUT sin importar el formato ingresado: primero el cliente activo, luego el profesor
+        for user in RutService.usuarios(username):
+            if user.is_active and user.check_password(password):
+                return user
         
         # Fallback: autenticación normal por username (solo superusers)
         try:
@@ -37,4 +26,4 @@ class RUTAuthenticationBackend(BaseBackend):
         try:
             return User.objects.get(pk=user_id)
         except User.DoesNotExist:
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,188 @@
+"""
+Búsqueda de texto completo sobre clientes y ejercicios.
+
+El texto normalizado (minúsculas, sin tildes) de cada objeto vive en
+IndiceBusqueda. En SQLite se consulta a través de una tabla FTS5 sincronizada
+por triggers y en MySQL con un índice FULLTEXT en modo booleano; ambos se
+crean en la migración 0023. Otros motores recurren a LIKE.
+"""
+from django.db import connection
+from .models import Cliente, Ejercicio, IndiceBusqueda
+from .utils import formatear_rut, normalizar_rut
+import re
+import unicodedata
+import logging
+
+logger = logging.getLogger(__name__)
+
+TABLA_FTS = 'admin_gym_indicebusqueda_fts'
+LARGO_MINIMO_MYSQL = 3   # innodb_ft_min_token_size por defecto
+MAX_TERMINOS = 8
+LARGO_MINIMO_RANKING = 3   # Prefijos más cortos coinciden con demasiados documentos para ordenarlos
+NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes ni signos: 'Peñalolén 12.345' -> 'penalolen 12 345'"""
+    if not texto:
+        return ''
+    sin_tildes = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return NO_ALFANUMERICO.sub(' ', sin_tildes.lower()).strip()
+
+
+def _telefono(telefono):
+    """Número completo y sin código de país (últimos 8 dígitos), para buscar como se marca"""
+    digitos = re.sub(r'\D', '', telefono or '')
+    return f'{digitos} {digitos[-8:]}' if len(digitos) > 8 else digitos
+
+
+def texto_cliente(cliente):
+    return ' '.join(filter(None, [
+        normalizar(cliente.nombre),
+        normalizar(formatear_rut(cliente.rut)),
+        normalizar(normalizar_rut(cliente.rut)),
+        normalizar(cliente.email),
+        normalizar(cliente.email.split('@')[0]) if cliente.email else '',
+        _telefono(cliente.telefono),
+    ]))
+
+
+def texto_ejercicio(ejercicio):
+    return ' '.join(filter(None, [
+        normalizar(ejercicio.nombre),
+        normalizar(ejercicio.grupo_muscular),
+        normalizar(ejercicio.descripcion),
+    ]))
+
+
+DOCUMENTOS = {
+    'cliente': (Cliente, texto_cliente),
+    'ejercicio': (Ejercicio, texto_ejercicio),
+}
+
+
+def indexar(tipo, objeto):
+    _, generar_texto = DOCUMENTOS[tipo]
+    IndiceBusqueda.objects.update_or_create(tipo=tipo, objeto_id=objeto.pk, defaults={'texto': generar_texto(objeto)})
+
+
+def indexar_lote(tipo, objetos, tamano_lote=1000):
+    """Indexa objetos creados con bulk_create (que no emite post_save)"""
+    _, generar_texto = DOCUMENTOS[tipo]
+    IndiceBusqueda.objects.bulk_create(
+        [IndiceBusqueda(tipo=tipo, objeto_id=objeto.pk, texto=generar_texto(objeto)) for objeto in objetos],
+        batch_size=tamano_lote,
+        update_conflicts=True,
+        unique_fields=['tipo', 'objeto_id'],
+        update_fields=['texto'],
+    )
+
+
+def desindexar(tipo, objeto_id):
+    IndiceBusqueda.objects.filter(tipo=tipo, objeto_id=objeto_id).delete()
+
+
+def desindexar_lote(tipo, objeto_ids):
+    IndiceBusqueda.objects.filter(tipo=tipo, objeto_id__in=list(objeto_ids)).delete()
+
+
+def reconstruir_indice(tipos=None, tamano_lote=1000):
+    """Regenera el índice de los tipos indicados; retorna la cantidad de documentos por tipo"""
+    totales = {}
+    for tipo in tipos or DOCUMENTOS:
+        modelo, generar_texto = DOCUMENTOS[tipo]
+        documentos = [
+            IndiceBusqueda(tipo=tipo, objeto_id=objeto.pk, texto=generar_texto(objeto))
+            for objeto in modelo.objects.all().iterator(chunk_size=tamano_lote)
+        ]
+        IndiceBusqueda.objects.bulk_create(
+            documentos,
+            batch_size=tamano_lote,
+            update_conflicts=True,
+            unique_fields=['tipo', 'objeto_id'],
+            update_fields=['texto'],
+        )
+        IndiceBusqueda.objects.filter(tipo=tipo).exclude(
+            objeto_id__in=modelo.objects.values('pk')
+        ).delete()
+        totales[tipo] = len(documentos)
+    logger.info(f"Índice de búsqueda reconstruido: {totales}")
+    return totales
+
+
+def _buscar_sqlite(terminos, tipo, limite):
+    consulta = ' '.join(f'"{termino}"*' for termino in terminos)
+    sql = (
+        f'SELECT i.tipo, i.objeto_id FROM {TABLA_FTS} f '
+        # CROSS JOIN fija la tabla FTS como bucle externo en el planificador de SQLite
+        f'CROSS JOIN admin_gym_indicebusqueda i ON i.id = f.rowid '
+        f'WHERE {TABLA_FTS} MATCH %s'
+    )
+    parametros = [consulta]
+    if tipo:
+        sql += ' AND i.tipo = %s'
+        parametros.append(tipo)
+    if sum(map(len, terminos)) >= LARGO_MINIMO_RANKING:
+        sql += ' ORDER BY f.rank'
+    sql += ' LIMIT %s'
+    parametros.append(limite)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return cursor.fetchall()
+
+
+def _buscar_mysql(terminos, tipo, limite):
+    # Los términos más cortos que el mínimo de InnoDB no entran al índice FULLTEXT
+    largos = [t for t in terminos if len(t) >= LARGO_MINIMO_MYSQL]
+    cortos = [t for t in terminos if len(t) < LARGO_MINIMO_MYSQL]
+    condiciones, parametros = [], []
+    if largos:
+        condiciones.append('MATCH(texto) AGAINST (%s IN BOOLEAN MODE)')
+        parametros.append(' '.join(f'+{termino}*' for termino in largos))
+    for termino in cortos:
+        condiciones.append('texto LIKE %s')
+        parametros.append(f'%{termino}%')
+    if tipo:
+        condiciones.append('tipo = %s')
+        parametros.append(tipo)
+    sql = f'SELECT tipo, objeto_id FROM admin_gym_indicebusqueda WHERE {" AND ".join(condiciones)}'
+    if largos:
+        sql += ' ORDER BY MATCH(texto) AGAINST (%s IN BOOLEAN MODE) DESC'
+        parametros.append(parametros[0])
+    sql += ' LIMIT %s'
+    parametros.append(limite)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return cursor.fetchall()
+
+
+def _buscar_like(terminos, tipo, limite):
+    documentos = IndiceBusqueda.objects.all()
+    if tipo:
+        documentos = documentos.filter(tipo=tipo)
+    for termino in terminos:
+        documentos = documentos.filter(texto__contains=termino)
+    return list(documentos.values_list('tipo', 'objeto_id')[:limite])
+
+
+def buscar(consulta, tipo=None, limite=10):
+    """
+    Retorna [(tipo, objeto_id)] ordenados por relevancia. Todos los términos
+    deben aparecer y cada uno se busca como prefijo, para el type-ahead.
+    """
+    terminos = normalizar(consulta).split()[:MAX_TERMINOS]
+    if not terminos:
+        return []
+    if connection.vendor == 'sqlite':
+        return _buscar_sqlite(terminos, tipo, limite)
+    if connection.vendor == 'mysql':
+        return _buscar_mysql(terminos, tipo, limite)
+    return _buscar_like(terminos, tipo, limite)
+
+
+def buscar_objetos(consulta, tipo, limite=10):
+    """Instancias del tipo indicado en orden de relevancia"""
+    ids = [objeto_id for _, objeto_id in buscar(consulta, tipo=tipo, limite=limite)]
+    modelo, _ = DOCUMENTOS[tipo]
+    objetos = modelo.objects.in_bulk(ids)
+    return [objetos[objeto_id] for objeto_id in ids if objeto_id in objetos]
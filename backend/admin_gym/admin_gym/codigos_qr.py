@@ -0,0 +1,158 @@
+"""
+Imágenes QR de clientes con almacenamiento direccionado por contenido.
+
+El nombre del archivo es el hash del contenido del QR (y de los parámetros de
+dibujo), así que un código que no cambió nunca se vuelve a dibujar ni a escribir
+y dos generaciones del mismo código comparten archivo. El dibujo masivo se
+reparte en un pool de procesos.
+"""
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from .hashing import crear_pool, procesos_disponibles
+from .models import Cliente
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_QR = 'qr_codes'
+TAMANO_MODULO = 10
+BORDE = 4
+# Cambiar los parámetros de dibujo cambia también los nombres de archivo
+VERSION_DIBUJO = f'v1-l-{TAMANO_MODULO}-{BORDE}'
+# Una imagen recién escrita puede no estar referenciada aún: su generar_lote no ha hecho commit
+GRACIA_HUERFANOS = timedelta(hours=1)
+
+
+def huella(contenido):
+    return hashlib.sha256(f'{VERSION_DIBUJO}:{contenido}'.encode()).hexdigest()[:32]
+
+
+def nombre_archivo(contenido):
+    return f'{DIRECTORIO_QR}/qr_{huella(contenido)}.png'
+
+
+def _qr(contenido):
+    import qrcode
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=TAMANO_MODULO,
+        border=BORDE,
+    )
+    qr.add_data(contenido)
+    qr.make(fit=True)
+    return qr
+
+
+def renderizar_png(contenido):
+    from io import BytesIO
+    buffer = BytesIO()
+    _qr(contenido).make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def renderizar_svg(contenido):
+    from io import BytesIO
+    from qrcode.image.svg import SvgPathImage
+    buffer = BytesIO()
+    _qr(contenido).make_image(image_factory=SvgPathImage).save(buffer)
+    return buffer.getvalue()
+
+
+def _guardar(nombre, imagen):
+    guardado = default_storage.save(nombre, ContentFile(imagen))
+    if guardado != nombre:
+        # Otro proceso escribió el mismo archivo entre la consulta y el guardado
+        default_storage.delete(guardado)
+
+
+def guardar_png(contenido):
+    """Guarda la imagen del contenido si aún no existe; retorna el nombre en el storage"""
+    nombre = nombre_archivo(contenido)
+    if not default_storage.exists(nombre):
+        _guardar(nombre, renderizar_png(contenido))
+    return nombre
+
+
+def _archivos_existentes():
+    try:
+        _, archivos = default_storage.listdir(DIRECTORIO_QR)
+    except FileNotFoundError:
+        return set()
+    return set(archivos)
+
+
+def generar_lote(clientes=None, procesos=None, tamano_lote=500):
+    """
+    Asegura la imagen QR de los clientes indicados (todos por defecto). Solo se
+    dibujan los contenidos sin archivo, en paralelo, y solo se actualizan los
+    clientes cuyo qr_image no apunta ya a su archivo.
+    """
+    queryset = Cliente.objects.exclude(qr_code='')
+    if clientes is not None:
+        queryset = queryset.filter(id__in=clientes)
+    filas = list(queryset.values_list('id', 'qr_code', 'qr_image'))
+
+    existentes = _archivos_existentes()
+    por_dibujar = {}
+    cambios = []
+    for cliente_id, contenido, actual in filas:
+        nombre = nombre_archivo(contenido)
+        if nombre.rsplit('/', 1)[1] not in existentes:
+            por_dibujar[nombre] = contenido
+        if actual != nombre:
+            cambios.append(Cliente(id=cliente_id, qr_image=nombre))
+
+    procesos = procesos or procesos_disponibles()
+    contenidos = list(por_dibujar.values())
+    if procesos > 1 and len(contenidos) > 1:
+        with crear_pool(min(procesos, len(contenidos))) as pool:
+            imagenes = pool.map(renderizar_png, contenidos, chunksize=max(len(contenidos) // (procesos * 4), 1))
+            escritos = _escribir(por_dibujar, imagenes)
+    else:
+        escritos = _escribir(por_dibujar, map(renderizar_png, contenidos))
+
+    with transaction.atomic():
+        Cliente.objects.bulk_update(cambios, ['qr_image'], batch_size=tamano_lote)
+
+    resumen = {'clientes': len(filas), 'dibujados': escritos, 'reutilizados': len(filas) - escritos, 'actualizados': len(cambios)}
+    logger.info(f"Imágenes QR: {resumen}")
+    return resumen
+
+
+def _escribir(por_dibujar, imagenes):
+    escritos = 0
+    for nombre, imagen in zip(por_dibujar, imagenes):
+        _guardar(nombre, imagen)
+        escritos += 1
+    return escritos
+
+
+def _reciente(archivo, limite):
+    try:
+        return default_storage.get_modified_time(f'{DIRECTORIO_QR}/{archivo}') > limite
+    except (NotImplementedError, FileNotFoundError):
+        # Sin fecha no se puede descartar que se esté generando: se conserva
+        return True
+
+
+def limpiar_huerfanos(dry_run=False, gracia=GRACIA_HUERFANOS):
+    """
+    Elimina de qr_codes/ las imágenes que ningún cliente referencia y que tienen
+    más de gracia de antigüedad; retorna sus nombres
+    """
+    limite = timezone.now() - gracia
+    referenciados = {
+        nombre.rsplit('/', 1)[-1]
+        for nombre in Cliente.objects.exclude(qr_image='').values_list('qr_image', flat=True).iterator(chunk_size=5000)
+    }
+    huerfanos = sorted(archivo for archivo in _archivos_existentes() - referenciados if not _reciente(archivo, limite))
+    if not dry_run:
+        for archivo in huerfanos:
+            default_storage.delete(f'{DIRECTORIO_QR}/{archivo}')
+        logger.info(f"Imágenes QR huérfanas eliminadas: {len(huerfanos)}")
+    return huerfanos
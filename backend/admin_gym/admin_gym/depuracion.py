@@ -0,0 +1,90 @@
+"""
+Eliminación masiva por lotes para los comandos de limpieza.
+
+Los conjuntos a eliminar se expresan como querysets (subconsultas y joins, sin
+recorrer objetos en Python) y se eliminan por lotes de ids, paginados por
+clave primaria, cada uno en su propia transacción: los bloqueos duran lo que
+tarda un lote y entre lotes se puede pausar para no acaparar la base. Las
+cascadas las resuelve el ORM con una consulta por modelo relacionado y lote.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from .busqueda import desindexar_lote
+from .models import Cliente, Profesor
+from .signals import bajas_en_lote
+from .sincronizacion_entrenador import registrar_bajas
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def lotes_de_ids(queryset, tamano_lote=500):
+    """Ids del queryset por lotes en orden de clave primaria, sin OFFSET"""
+    ultimo = None
+    while True:
+        pendientes = queryset.order_by('pk')
+        if ultimo is not None:
+            pendientes = pendientes.filter(pk__gt=ultimo)
+        ids = list(pendientes.values_list('pk', flat=True)[:tamano_lote])
+        if not ids:
+            return
+        yield ids
+        ultimo = ids[-1]
+
+
+def eliminar_en_lotes(queryset, eliminar_lote=None, tamano_lote=500, pausa=0.0, al_avanzar=None):
+    """
+    Elimina las filas del queryset por lotes. eliminar_lote(ids) reemplaza el
+    borrado por defecto (para eliminar además filas asociadas); al_avanzar(hechas,
+    total) se llama tras cada lote. Retorna la cantidad de filas procesadas.
+    """
+    modelo = queryset.model
+    # Por defecto se vuelve a aplicar el filtro: una fila que dejó de cumplirlo no se elimina
+    eliminar_lote = eliminar_lote or (lambda ids: queryset.filter(pk__in=ids).delete())
+    total = queryset.count()
+    hechas = 0
+    for ids in lotes_de_ids(queryset, tamano_lote):
+        with transaction.atomic():
+            eliminar_lote(ids)
+        hechas += len(ids)
+        if al_avanzar:
+            al_avanzar(hechas, total)
+        if pausa:
+            time.sleep(pausa)
+    logger.info(f"Eliminados {hechas} {modelo._meta.verbose_name_plural} en lotes de {tamano_lote}")
+    return hechas
+
+
+def _eliminar_lote_clientes(ids):
+    filas = list(Cliente.objects.filter(id__in=ids).values_list('id', 'user_id'))
+    # Outbox e índice de búsqueda en lote, en vez de una consulta por cliente en las señales
+    registrar_bajas(filas)
+    desindexar_lote('cliente', ids)
+    with bajas_en_lote():
+        # El cliente primero: con el cliente como origen de la cascada, sus registros
+        # de progreso no recalculan el resumen uno por uno (ver signals.descontar_resumen_progreso)
+        Cliente.objects.filter(id__in=ids).delete()
+        User.objects.filter(id__in=[user_id for _, user_id in filas if user_id]).delete()
+
+
+def _eliminar_lote_profesores(ids):
+    User.objects.filter(profesor__id__in=ids).delete()
+    Profesor.objects.filter(id__in=ids).delete()
+
+
+def eliminar_clientes(queryset=None, **opciones):
+    """Elimina clientes y sus usuarios; opciones como en eliminar_en_lotes"""
+    queryset = Cliente.objects.all() if queryset is None else queryset
+    return eliminar_en_lotes(queryset, _eliminar_lote_clientes, **opciones)
+
+
+def eliminar_profesores(queryset=None, **opciones):
+    """Elimina profesores y sus usuarios; opciones como en eliminar_en_lotes"""
+    queryset = Profesor.objects.all() if queryset is None else queryset
+    return eliminar_en_lotes(queryset, _eliminar_lote_profesores, **opciones)
+
+
+def usuarios_huerfanos():
+    """Usuarios sin cliente ni profesor (excepto superusuarios), con un LEFT JOIN en vez de dos consultas por usuario"""
+    return User.objects.filter(is_superuser=False, cliente__isnull=True, profesor__isnull=True)
@@ -1,6 +1,25 @@
 from django import forms
 from .models import Cliente, Profesor, Sesion, Pago, Ejercicio, Rutina, EjercicioRutina, NotificacionTemplate, ConfiguracionSistema
 from django.forms import inlineformset_factory
+from .services import RutService
+from .utils import MAX_DIGITOS_RUT, calcular_dv, componer_rut, descomponer_rut, normalizar_rut
+
+
+def _descomponer_rut_formulario(rut):
+    """(numero, dv) de un RUT válido; si no, ValidationError indicando el dígito verificador correcto"""
+    if not rut:
+        raise forms.ValidationError("RUT es obligatorio")
+    partes = descomponer_rut(rut)
+    if partes is None:
+        rut_limpio = normalizar_rut(rut)
+        numero = rut_limpio[:-1]
+        if len(rut_limpio) >= 2 and numero.isascii() and numero.isdigit():
+            if len(numero.lstrip('0')) > MAX_DIGITOS_RUT:
+                raise forms.ValidationError(f"RUT inválido: el número no puede tener más de {MAX_DIGITOS_RUT} dígitos")
+            raise forms.ValidationError(f"RUT inválido. El dígito verificador correcto para {numero} es: {calcular_dv(numero)}")
+        raise forms.ValidationError(f"RUT inválido: {rut}")
+    return partes
+
 class ClienteForm(forms.ModelForm):
 
     
@@ -28,29 +47,17 @@ class ClienteForm(forms.ModelForm):
             self.fields['membresia'].initial = 'anual'
     
     def clean_rut(self):
-        from .utils import validar_rut, formatear_rut, calcular_dv
-        rut = self.cleaned_data.get('rut', '').strip()
-        
-        if not rut:
-            raise forms.ValidationError("RUT es obligatorio")
-        
-        if not validar_rut(rut):
-            # Extraer solo los números para calcular el DV correcto
-            rut_limpio = rut.upper().replace('.', '').replace('-', '').replace(' ', '')
-            if len(rut_limpio) >= 2 and rut_limpio[:-1].isdigit():
-                numero = rut_limpio[:-1]
-                dv_correcto = calcular_dv(numero)
-                raise forms.ValidationError(f"RUT inválido. El dígito verificador correcto para {numero} es: {dv_correcto}")
-            else:
-                raise forms.ValidationError(f"RUT inválido: {rut}")
-        
-        rut_formateado = formatear_rut(rut)
+        numero, dv = _descomponer_rut_formulario(self.cleaned_data.get('rut', '').strip())
         
-        # Verificar que no exista otro cliente ACTIVO con el mismo RUT
-        if Cliente.objects.filter(rut=rut_formateado, activo=True).exclude(pk=self.instance.pk).exists():
-            raise forms.ValidationError("Ya existe un cliente activo con este RUT")
+        # Una sola consulta sobre el índice numérico, cualquiera sea el formato guardado
+        activo = RutService.clientes(numero).exclude(pk=self.instance.pk).values_list('activo', flat=True).first()
+        if activo is not None:
+            raise forms.ValidationError(
+                "Ya existe un cliente activo con este RUT" if activo
+                else "Ya existe un cliente inactivo con este RUT; reactívelo en lugar de crear uno nuevo"
+            )
         
-        return rut_formateado
+        return componer_rut(numero, dv)
     
 
     
@@ -74,29 +81,13 @@ class ProfesorForm(forms.ModelForm):
         self.fields['especialidad'].required = False
     
     def clean_rut(self):
-        from .utils import validar_rut, formatear_rut, calcular_dv
-        rut = self.cleaned_data.get('rut', '').strip()
-        
-        if not rut:
-            raise forms.ValidationError("RUT es obligatorio")
-        
-        if not validar_rut(rut):
-            # Extraer solo los números para calcular el DV correcto
-            rut_limpio = rut.upper().replace('.', '').replace('-', '').replace(' ', '')
-            if len(rut_limpio) >= 2 and rut_limpio[:-1].isdigit():
-                numero = rut_limpio[:-1]
-                dv_correcto = calcular_dv(numero)
-                raise forms.ValidationError(f"RUT inválido. El dígito verificador correcto para {numero} es: {dv_correcto}")
-            else:
-                raise forms.ValidationError(f"RUT inválido: {rut}")
-        
-        rut_formateado = formatear_rut(rut)
+        numero, dv = _descomponer_rut_formulario(self.cleaned_data.get('rut', '').strip())
         
         # Verificar que no exista otro profesor con el mismo RUT
-        if Profesor.objects.filter(rut=rut_formateado).exclude(pk=self.instance.pk).exists():
+        if RutService.profesores(numero).exclude(pk=self.instance.pk).exists():
             raise forms.ValidationError("Ya existe un profesor con este RUT")
         
-        return rut_formateado
+        return componer_rut(numero, dv)
 
 class SesionForm(forms.ModelForm):
     class Meta:
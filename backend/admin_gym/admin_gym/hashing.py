@@ -0,0 +1,91 @@
+"""
+Hash de contraseñas en paralelo.
+
+Cada hash PBKDF2 ocupa un núcleo durante cientos de milisegundos, por lo que
+se calcula en procesos aparte (el GIL impide aprovechar hilos). Los lotes se
+reparten entre todos los núcleos disponibles. Un hash suelto se calcula en
+línea con make_password: enviarlo al pool solo agrega la ida y vuelta.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.contrib.auth.hashers import make_password
+import multiprocessing
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+MINIMO_PARALELO = 8   # Con menos contraseñas no compensa repartir un lote
+
+_pool = None
+_candado = threading.Lock()
+
+
+def _inicializar_proceso():
+    # Con spawn/forkserver el proceso hijo parte sin Django configurado
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def procesos_disponibles():
+    """Núcleos que este proceso puede usar (respeta la afinidad de CPU del contenedor)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def crear_pool(procesos=None):
+    """
+    Pool de procesos para hashear. Se usa forkserver donde existe: hacer fork de
+    un servidor web con hilos puede heredar locks tomados.
+    """
+    contexto = None
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context('forkserver')
+    return ProcessPoolExecutor(
+        max_workers=procesos or procesos_disponibles(),
+        mp_context=contexto,
+        initializer=_inicializar_proceso,
+    )
+
+
+def _pool_compartido():
+    global _pool
+    with _candado:
+        if _pool is None:
+            _pool = crear_pool()
+        return _pool
+
+
+def _descartar_pool(pool):
+    global _pool
+    with _candado:
+        if _pool is pool:
+            _pool = None
+
+
+def hashear_passwords(passwords, procesos=None):
+    """
+    Hashes (en el mismo orden) de una lista de contraseñas en texto plano.
+    Sin procesos usa el pool compartido; con procesos, uno propio de ese tamaño.
+    """
+    passwords = list(passwords)
+    procesos_lote = procesos or procesos_disponibles()
+    if procesos_lote == 1 or len(passwords) < MINIMO_PARALELO:
+        return [make_password(password) for password in passwords]
+    tamano_bloque = max(len(passwords) // (procesos_lote * 4), 1)
+    if procesos is None:
+        pool = _pool_compartido()
+        try:
+            return list(pool.map(make_password, passwords, chunksize=tamano_bloque))
+        except BrokenProcessPool:
+            # Un proceso hijo murió (p.ej. por el OOM killer); se recrea el pool
+            logger.warning('Pool de hashing roto, se recrea')
+            _descartar_pool(pool)
+            return list(_pool_compartido().map(make_password, passwords, chunksize=tamano_bloque))
+    with crear_pool(min(procesos, len(passwords))) as pool:
+        return list(pool.map(make_password, passwords, chunksize=tamano_bloque))
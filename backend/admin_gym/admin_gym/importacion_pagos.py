@@ -0,0 +1,256 @@
+"""
+Importación masiva y conciliación de pagos desde archivos bancarios y POS
+"""
+import csv
+import logging
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Cliente, Pago
+from .sincronizacion_entrenador import registrar_cambios
+from .utils import MESES_POR_PLAN, calcular_vencimientos, en_lotes, validar_ruts
+
+logger = logging.getLogger(__name__)
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y%m%d')
+ESTADOS_PAGO = {'pagado': 'Pagado', 'pendiente': 'Pendiente', 'vencido': 'Vencido'}
+RUT_EN_TEXTO = re.compile(r'\b(\d{1,2}\.?\d{3}\.?\d{3}-?[\dkK])\b')
+TAG_OFX = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+def leer_csv(archivo, delimitador=','):
+    """
+    Lee un archivo CSV de forma incremental (fila a fila).
+    Columnas esperadas: rut, monto, fecha y opcionalmente plan y estado.
+    """
+    lector = csv.DictReader(archivo, delimiter=delimitador)
+    for fila in lector:
+        yield {
+            (clave or '').strip().lower(): (valor or '').strip()
+            for clave, valor in fila.items()
+        }
+
+
+def leer_ofx(archivo):
+    """
+    Lee transacciones <STMTTRN> de un extracto tipo OFX de forma incremental.
+    El RUT del cliente se toma del campo MEMO o NAME de cada transacción.
+    """
+    transaccion = None
+    for linea in archivo:
+        linea = linea.strip()
+        if linea.upper().startswith('<STMTTRN>'):
+            transaccion = {}
+        if transaccion is None:
+            continue
+        for tag, valor in TAG_OFX.findall(linea):
+            transaccion[tag.upper()] = valor.strip()
+        if '</STMTTRN>' in linea.upper():
+            texto = f"{transaccion.get('MEMO', '')} {transaccion.get('NAME', '')}"
+            encontrado = RUT_EN_TEXTO.search(texto)
+            yield {
+                'rut': encontrado.group(1) if encontrado else '',
+                'monto': transaccion.get('TRNAMT', ''),
+                'fecha': transaccion.get('DTPOSTED', '')[:8],
+                'referencia': transaccion.get('FITID', ''),
+            }
+            transaccion = None
+
+
+def construir_indice_clientes():
+    """Índice en memoria cuerpo numérico del RUT -> datos del cliente, con una sola consulta"""
+    indice = {}
+    for cliente_id, rut_numero, rut, nombre, membresia, estado, vencimiento in Cliente.objects.filter(
+        rut_numero__isnull=False
+    ).values_list(
+        'id', 'rut_numero', 'rut', 'nombre', 'membresia', 'estado_membresia', 'fecha_vencimiento'
+    ).iterator(chunk_size=2000):
+        indice[rut_numero] = {
+            'id': cliente_id,
+            'rut': rut,
+            'nombre': nombre,
+            'membresia': membresia,
+            'estado_membresia': estado,
+            'fecha_vencimiento': vencimiento,
+        }
+    return indice
+
+
+def _parsear_fecha(texto):
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha inválida: {texto}")
+
+
+def _parsear_monto(texto):
+    """Montos en CLP: acepta '30000', '30.000', '$30.000' y '30000.00'"""
+    limpio = texto.replace('$', '').replace(' ', '')
+    if re.match(r'^\d{1,3}(\.\d{3})+$', limpio):
+        limpio = limpio.replace('.', '')
+    try:
+        monto = Decimal(limpio.replace(',', '.')).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"Monto inválido: {texto}")
+    if monto < 0:
+        raise ValueError('El monto no puede ser negativo')
+    return monto
+
+
+class ImportadorPagos:
+    """
+    Concilia filas de pagos contra clientes por RUT y las persiste por lotes.
+    Cada lote se escribe en su propia transacción con bulk_create/bulk_update.
+    En modo dry_run no se escribe nada y solo se genera el reporte de diferencias.
+    """
+
+    def __init__(self, tamano_lote=500, dry_run=False, max_detalle=500):
+        self.tamano_lote = tamano_lote
+        self.dry_run = dry_run
+        self.max_detalle = max_detalle
+        self.indice = construir_indice_clientes()
+        self._vistos = set()
+        self.reporte = {
+            'leidas': 0,
+            'importadas': 0,
+            'duplicadas': 0,
+            'sin_cliente': 0,
+            'invalidas': 0,
+            'clientes_actualizados': 0,
+            'errores': [],
+            'cambios_clientes': [],
+        }
+
+    def importar(self, filas):
+        numero = 0
+        for lote in en_lotes(filas, self.tamano_lote):
+            numerado = list(enumerate(lote, start=numero + 1))
+            numero += len(lote)
+            self._procesar_lote(numerado)
+        logger.info(
+            f"Importación de pagos{' (dry-run)' if self.dry_run else ''}: "
+            f"{self.reporte['importadas']} importados de {self.reporte['leidas']} leídos"
+        )
+        return self.reporte
+
+    def _registrar_error(self, numero, fila, motivo):
+        if len(self.reporte['errores']) < self.max_detalle:
+            self.reporte['errores'].append({'fila': numero, 'rut': fila.get('rut', ''), 'motivo': motivo})
+
+    def _procesar_lote(self, numerado):
+        validas = []
+        # Validación y descomposición de todos los RUT del lote en una pasada
+        ruts_validos, ruts_numero, _ = validar_ruts([fila.get('rut') for _, fila in numerado])
+        for (numero, fila), rut_valido, rut_numero in zip(numerado, list(ruts_validos), list(ruts_numero)):
+            self.reporte['leidas'] += 1
+            if not rut_valido:
+                self.reporte['invalidas'] += 1
+                self._registrar_error(numero, fila, f"RUT inválido: {fila.get('rut', '')}")
+                continue
+            cliente = self.indice.get(int(rut_numero))
+            if cliente is None:
+                self.reporte['sin_cliente'] += 1
+                self._registrar_error(numero, fila, 'Cliente no encontrado')
+                continue
+            try:
+                fecha = _parsear_fecha(fila.get('fecha', ''))
+                monto = _parsear_monto(fila.get('monto', ''))
+            except ValueError as e:
+                self.reporte['invalidas'] += 1
+                self._registrar_error(numero, fila, str(e))
+                continue
+            plan = (fila.get('plan') or cliente['membresia']).lower()
+            if plan not in MESES_POR_PLAN:
+                self.reporte['invalidas'] += 1
+                self._registrar_error(numero, fila, f"Plan inválido: {plan}")
+                continue
+            estado = ESTADOS_PAGO.get((fila.get('estado') or 'pagado').lower())
+            if estado is None:
+                self.reporte['invalidas'] += 1
+                self._registrar_error(numero, fila, f"Estado inválido: {fila.get('estado')}")
+                continue
+            validas.append((cliente, fecha, monto, plan, estado))
+
+        if not validas:
+            return
+
+        vencimientos = calcular_vencimientos(
+            [fecha for _, fecha, _, _, _ in validas],
+            [MESES_POR_PLAN[plan] for _, _, _, plan, _ in validas],
+        )
+        existentes = self._pagos_existentes(validas)
+
+        pagos = []
+        cambios = {}
+        for (cliente, fecha, monto, plan, estado), vencimiento in zip(validas, vencimientos):
+            clave = (cliente['id'], monto, fecha)
+            if clave in existentes or clave in self._vistos:
+                self.reporte['duplicadas'] += 1
+                continue
+            self._vistos.add(clave)
+            pagos.append(Pago(
+                cliente_id=cliente['id'],
+                monto=monto,
+                fecha_pago=timezone.make_aware(datetime.combine(fecha, datetime.min.time())),
+                plan=plan,
+                vencimiento=vencimiento,
+                estado=estado,
+            ))
+            if estado == 'Pagado':
+                self._acumular_cambio(cambios, cliente, vencimiento)
+
+        if not self.dry_run:
+            with transaction.atomic():
+                Pago.objects.bulk_create(pagos, batch_size=self.tamano_lote)
+                Cliente.objects.bulk_update(
+                    [
+                        Cliente(id=cliente_id, estado_membresia='activa', fecha_vencimiento=vencimiento)
+                        for cliente_id, (_, vencimiento) in cambios.items()
+                    ],
+                    ['estado_membresia', 'fecha_vencimiento'],
+                    batch_size=self.tamano_lote,
+                )
+                registrar_cambios(cambios)
+
+        self.reporte['importadas'] += len(pagos)
+        self.reporte['clientes_actualizados'] += len(cambios)
+        for cliente, vencimiento in cambios.values():
+            if len(self.reporte['cambios_clientes']) < self.max_detalle:
+                self.reporte['cambios_clientes'].append({
+                    'rut': cliente['rut'],
+                    'nombre': cliente['nombre'],
+                    'estado_anterior': cliente['estado_membresia'],
+                    'vencimiento_anterior': cliente['fecha_vencimiento'],
+                    'vencimiento_nuevo': vencimiento,
+                })
+            # Mantener el índice al día para los lotes siguientes
+            cliente['estado_membresia'] = 'activa'
+            cliente['fecha_vencimiento'] = vencimiento
+
+    @staticmethod
+    def _acumular_cambio(cambios, cliente, vencimiento):
+        """Un pago pagado activa la membresía y extiende el vencimiento si corresponde"""
+        actual = cambios[cliente['id']][1] if cliente['id'] in cambios else cliente['fecha_vencimiento']
+        if cliente['estado_membresia'] == 'activa' and actual and actual >= vencimiento:
+            return
+        cambios[cliente['id']] = (cliente, max(vencimiento, actual) if actual else vencimiento)
+
+    @staticmethod
+    def _pagos_existentes(validas):
+        """Pagos ya registrados (cliente, monto, día) en el rango del lote, en una consulta"""
+        fechas = [fecha for _, fecha, _, _, _ in validas]
+        desde = timezone.make_aware(datetime.combine(min(fechas), datetime.min.time()))
+        hasta = timezone.make_aware(datetime.combine(max(fechas), datetime.max.time()))
+        existentes = set()
+        for cliente_id, monto, fecha_pago in Pago.objects.filter(
+            cliente_id__in={cliente['id'] for cliente, _, _, _, _ in validas},
+            fecha_pago__range=(desde, hasta),
+        ).values_list('cliente_id', 'monto', 'fecha_pago'):
+            existentes.add((cliente_id, monto, timezone.localtime(fecha_pago).date()))
+        return existentes
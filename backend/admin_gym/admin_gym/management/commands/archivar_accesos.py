@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.registro_accesos import archivar_accesos
+
+
+class Command(BaseCommand):
+    """
+    Aplica la retención de AccesoQR: el detalle más antiguo que la retención se
+    resume por cliente y mes en ResumenMensualAcceso y se elimina.
+    """
+    help = 'Archiva los accesos QR antiguos en el resumen mensual'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help="Días de detalle a conservar (default: GYM_CONFIG['RETENCION_ACCESOS_DIAS'])")
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por transacción (default: 5000)')
+
+    def handle(self, *args, **options):
+        if options['dias'] is not None and options['dias'] < 0:
+            raise CommandError('--dias no puede ser negativo')
+        archivados = archivar_accesos(dias=options['dias'], tamano_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"Accesos archivados: {archivados}"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.archivo_historico import TABLAS, archivar
+
+
+class Command(BaseCommand):
+    """
+    Mueve Asistencia, AuditoriaEvento y NotificacionEnviada más antiguas que el
+    horizonte al archivo histórico (JSONL comprimido por mes) y acumula su
+    conteo mensual en ResumenArchivado.
+    """
+    help = 'Archiva el historial antiguo de asistencias, auditoría y notificaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tabla', choices=list(TABLAS), action='append', help='Tabla a archivar (repetible; default: todas)')
+        parser.add_argument('--dias', type=int, help="Días a conservar en la base (default: GYM_CONFIG['RETENCION_HISTORIAL_DIAS'])")
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por transacción (default: 5000)')
+
+    def handle(self, *args, **options):
+        if options['dias'] is not None and options['dias'] < 0:
+            raise CommandError('--dias no puede ser negativo')
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+        for tabla in options['tabla'] or TABLAS:
+            archivadas = archivar(tabla, dias=options['dias'], tamano_lote=options['lote'])
+            self.stdout.write(self.style.SUCCESS(f"{tabla}: {archivadas} filas archivadas"))
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from admin_gym.analitica import EPOCA, PLANES, calcular_metricas
+from admin_gym.utils import MESES_POR_PLAN
+import time
+
+
+class Command(BaseCommand):
+    """
+    Mide el tiempo de cálculo de las métricas analíticas sobre un conjunto
+    sintético generado en memoria (no toca la base de datos).
+    """
+    help = 'Benchmark de la analítica vectorizada sobre datos sintéticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=50000, help='Cantidad de clientes sintéticos (default: 50000)')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Repeticiones del cálculo (default: 5)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla aleatoria (default: 42)')
+
+    def handle(self, *args, **options):
+        try:
+            import numpy as np
+        except ImportError:
+            raise CommandError('NumPy no está instalado')
+
+        inicio = time.perf_counter()
+        datos = self.generar_datos(np, options['clientes'], options['semilla'])
+        generacion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"Datos sintéticos: {len(datos['cliente_id'])} clientes, "
+            f"{len(datos['pago_dia'])} pagos, {len(datos['asistencia_dia'])} asistencias "
+            f"(generados en {generacion:.2f}s)"
+        )
+
+        tiempos = []
+        for _ in range(options['repeticiones']):
+            inicio = time.perf_counter()
+            metricas = calcular_metricas(datos)
+            tiempos.append(time.perf_counter() - inicio)
+
+        self.stdout.write(f"MRR total: ${metricas['mrr_total']:,}")
+        self.stdout.write(f"Renovación global: {metricas['renovacion_global']}%")
+        self.stdout.write(f"Clientes en declive: {metricas['clientes_en_declive']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Cálculo de métricas: mín {min(tiempos) * 1000:.1f} ms, "
+            f"medio {sum(tiempos) / len(tiempos) * 1000:.1f} ms ({len(tiempos)} repeticiones)"
+        ))
+
+    def generar_datos(self, np, n_clientes, semilla):
+        """Clientes con cadenas de renovaciones y asistencias en los últimos 6 meses"""
+        rng = np.random.default_rng(semilla)
+        hoy = (timezone.localdate() - EPOCA).days
+
+        registro = hoy - rng.integers(0, 3 * 365, n_clientes)
+        activo = rng.random(n_clientes) < 0.9
+
+        meses_plan = np.array([MESES_POR_PLAN[plan] for plan in PLANES])
+        renovaciones = rng.poisson(3, n_clientes) + 1
+        pago_cliente = np.repeat(np.arange(n_clientes), renovaciones)
+        plan = rng.integers(0, len(PLANES), len(pago_cliente))
+        duracion = meses_plan[plan] * 30
+        # Días acumulados de membresía desde el registro de cada cliente
+        acumulado = np.cumsum(duracion + rng.integers(0, 45, len(pago_cliente)))
+        base = np.repeat(np.cumsum(renovaciones) - renovaciones, renovaciones)
+        dias_desde_registro = acumulado - np.concatenate(([0], acumulado[:-1]))[base]
+        pago_dia = registro[pago_cliente] + dias_desde_registro - duracion
+        pasados = pago_dia <= hoy
+
+        asistencias_por_cliente = rng.poisson(40, n_clientes)
+        asistencia_cliente = np.repeat(np.arange(n_clientes), asistencias_por_cliente)
+        asistencia_dia = hoy - rng.integers(0, 182, len(asistencia_cliente))
+
+        return {
+            'hoy': hoy,
+            'cliente_id': np.arange(1, n_clientes + 1),
+            'cliente_registro': registro,
+            'cliente_activo': activo,
+            'pago_cliente': pago_cliente[pasados],
+            'pago_dia': pago_dia[pasados],
+            'pago_vencimiento': (pago_dia + duracion)[pasados],
+            'pago_monto': (rng.integers(20, 60, len(pago_cliente)) * 1000.0 * meses_plan[plan])[pasados],
+            'pago_plan': plan[pasados],
+            'asistencia_cliente': asistencia_cliente,
+            'asistencia_dia': asistencia_dia,
+        }
@@ -0,0 +1,55 @@
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.hashing import crear_pool, procesos_disponibles
+import time
+
+
+def _hashear(argumentos):
+    password, iteraciones = argumentos
+    hasher = PBKDF2PasswordHasher()
+    return hasher.encode(password, hasher.salt(), iterations=iteraciones)
+
+
+class Command(BaseCommand):
+    """
+    Mide cuántas contraseñas por segundo se hashean con PBKDF2 según el tamaño
+    del pool de procesos y la cantidad de iteraciones (no toca la base de datos).
+    """
+    help = 'Benchmark del hash de contraseñas en paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=64, help='Contraseñas por medición (default: 64)')
+        parser.add_argument(
+            '--procesos', type=int, nargs='+',
+            help='Tamaños de pool a medir (default: 1, 2, 4... hasta los núcleos disponibles)'
+        )
+        parser.add_argument(
+            '--iteraciones', type=int, nargs='+',
+            help=f'Iteraciones PBKDF2 a medir (default: 100000 y {PBKDF2PasswordHasher.iterations})'
+        )
+
+    def handle(self, *args, **options):
+        nucleos = procesos_disponibles()
+        tamanos = options['procesos'] or sorted({min(2 ** k, nucleos) for k in range(nucleos.bit_length() + 1)})
+        iteraciones = options['iteraciones'] or [100000, PBKDF2PasswordHasher.iterations]
+        if min(tamanos) < 1 or min(iteraciones) < 1 or options['cantidad'] < 1:
+            raise CommandError('Cantidad, procesos e iteraciones deben ser positivos')
+
+        self.stdout.write(f"Núcleos disponibles: {nucleos}; {options['cantidad']} contraseñas por medición")
+        self.stdout.write(f"{'iteraciones':>12} {'procesos':>9} {'hash/s':>9} {'ms/hash':>9} {'aceleración':>12}")
+        for cantidad_iteraciones in iteraciones:
+            argumentos = [(f'password-{i}', cantidad_iteraciones) for i in range(options['cantidad'])]
+            base = None
+            for procesos in tamanos:
+                with crear_pool(procesos) as pool:
+                    # Calentamiento: arranque de los procesos e inicialización de Django
+                    list(pool.map(_hashear, argumentos[:procesos]))
+                    inicio = time.perf_counter()
+                    list(pool.map(_hashear, argumentos, chunksize=max(len(argumentos) // (procesos * 4), 1)))
+                    duracion = time.perf_counter() - inicio
+                por_segundo = len(argumentos) / duracion
+                base = base or por_segundo
+                self.stdout.write(
+                    f"{cantidad_iteraciones:>12} {procesos:>9} {por_segundo:>9.1f} "
+                    f"{duracion / len(argumentos) * 1000:>9.1f} {por_segundo / base:>11.2f}x"
+                )
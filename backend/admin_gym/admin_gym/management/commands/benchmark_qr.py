@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from admin_gym.models import Cliente
+from admin_gym.tokens_qr import PERIODO, PASOS_TOLERADOS, TokenInvalido, generar_token, verificar_token
+import random
+import time
+
+
+class Command(BaseCommand):
+    """
+    Mide la verificación de tokens QR firmados sobre una mezcla de códigos
+    válidos, falsificados, vencidos y malformados, y confirma que no consulta
+    la base de datos. Opcionalmente la compara con una búsqueda por qr_code.
+    """
+    help = 'Benchmark de la verificación de tokens QR rotativos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=200000, help='Tokens a verificar (default: 200000)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla aleatoria (default: 42)')
+        parser.add_argument('--comparar-bd', type=int, default=0, metavar='N', help='Además mide N búsquedas de cliente por qr_code')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['semilla'])
+        ahora = time.time()
+        codigos = [self.generar_codigo(rng, ahora) for _ in range(options['cantidad'])]
+
+        resultados = {'validos': 0, 'rechazados': 0}
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            for codigo in codigos:
+                try:
+                    verificar_token(codigo, instante=ahora)
+                    resultados['validos'] += 1
+                except TokenInvalido:
+                    resultados['rechazados'] += 1
+            duracion = time.perf_counter() - inicio
+
+        self.stdout.write(f"Tokens: {len(codigos)} ({resultados['validos']} válidos, {resultados['rechazados']} rechazados)")
+        self.stdout.write(f"Consultas a la base durante la verificación: {len(consultas)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Verificación: {len(codigos) / duracion:,.0f} tokens/s, {duracion / len(codigos) * 1e6:.2f} µs por token"
+        ))
+
+        if options['comparar_bd']:
+            qr_codes = list(Cliente.objects.values_list('qr_code', flat=True)[:options['comparar_bd']])
+            inicio = time.perf_counter()
+            for qr_code in qr_codes:
+                Cliente.objects.filter(qr_code=qr_code).first()
+            duracion_bd = time.perf_counter() - inicio
+            if qr_codes:
+                self.stdout.write(
+                    f"Búsqueda por qr_code en la base: {duracion_bd / len(qr_codes) * 1e6:.0f} µs por código "
+                    f"({len(qr_codes)} búsquedas)"
+                )
+
+    def generar_codigo(self, rng, ahora):
+        """70% válidos, 10% vencidos, 10% con firma alterada y 10% malformados"""
+        cliente_id = rng.randint(1, 50000)
+        tipo = rng.random()
+        if tipo < 0.7:
+            return generar_token(cliente_id, instante=ahora - rng.uniform(0, PERIODO * PASOS_TOLERADOS))
+        if tipo < 0.8:
+            return generar_token(cliente_id, instante=ahora - PERIODO * (PASOS_TOLERADOS + 1 + rng.randint(0, 100)))
+        if tipo < 0.9:
+            token = generar_token(cliente_id, instante=ahora)
+            return token[:-1] + ('A' if token[-1] != 'A' else 'B')
+        return f'G1.{cliente_id}.x.{rng.getrandbits(64):x}'
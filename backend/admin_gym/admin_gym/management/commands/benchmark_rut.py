@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.utils import calcular_dvs, componer_rut, descomponer_rut, formatear_ruts, validar_ruts
+import time
+
+# Entradas fijas que ninguna de las dos versiones debe aceptar
+CASOS_INVALIDOS = ['', None, '-', '5', '0-0', '00000000-0', '12.345.678-', '-5', '123456789-2', '1234567890-K']
+
+
+class Command(BaseCommand):
+    """
+    Compara la validación y el formateo de RUT uno a uno contra la versión
+    vectorizada, sobre RUT sintéticos en formatos mixtos y casos límite: cuerpos
+    cortos y de 9 dígitos, ceros a la izquierda, espacios, tabuladores, K fuera de
+    lugar y dígitos no ASCII (no toca la base de datos).
+    """
+    help = 'Benchmark de validación y formateo de RUT en lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=1000000, help='Cantidad de RUT sintéticos (default: 1000000)')
+        parser.add_argument('--invalidos', type=float, default=0.05, help='Fracción de RUT con dígito verificador alterado (default: 0.05)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla aleatoria (default: 42)')
+
+    def handle(self, *args, **options):
+        try:
+            import numpy as np
+        except ImportError:
+            raise CommandError('NumPy no está instalado')
+
+        inicio = time.perf_counter()
+        ruts = self.generar_ruts(np, options['cantidad'], options['invalidos'], options['semilla'])
+        self.stdout.write(f"RUT sintéticos: {len(ruts)} (generados en {time.perf_counter() - inicio:.2f}s)")
+
+        inicio = time.perf_counter()
+        escalar = [componer_rut(*partes) if partes else '' for partes in map(descomponer_rut, ruts)]
+        tiempo_escalar = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        validos, numeros, dvs = validar_ruts(ruts)
+        formateados = formatear_ruts(numeros, dvs)
+        tiempo_vectorizado = time.perf_counter() - inicio
+        lista = formateados.tolist()
+        tiempo_con_lista = time.perf_counter() - inicio
+
+        diferencias = [rut for rut, a, b in zip(ruts, escalar, lista) if a != b]
+        if diferencias:
+            ejemplos = ', '.join(repr(rut) for rut in diferencias[:5])
+            raise CommandError(f"Los resultados difieren en {len(diferencias)} RUT (p.ej. {ejemplos})")
+
+        self.stdout.write(f"Válidos: {int(validos.sum())} de {len(ruts)}")
+        self.stdout.write(f"Uno a uno:    {tiempo_escalar:.2f}s ({len(ruts) / tiempo_escalar:,.0f} RUT/s)")
+        self.stdout.write(f"Vectorizado:  {tiempo_vectorizado:.2f}s ({len(ruts) / tiempo_vectorizado:,.0f} RUT/s)")
+        self.stdout.write(f"  con tolist: {tiempo_con_lista:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Aceleración: {tiempo_escalar / tiempo_con_lista:.1f}x"))
+
+    def generar_ruts(self, np, cantidad, fraccion_invalidos, semilla):
+        """
+        RUT con y sin puntos, sin guion o con 'k' minúscula, más una parte de casos
+        límite; una fracción con dv alterado
+        """
+        rng = np.random.default_rng(semilla)
+        # Mayoría en el rango habitual y el resto repartido en escala logarítmica hasta 9 dígitos
+        habituales = rng.integers(1000000, 30000000, cantidad)
+        extremos = (10 ** rng.uniform(0, 9, cantidad)).astype(np.int64)
+        numeros = np.where(rng.random(cantidad) < 0.8, habituales, extremos)
+        dvs = np.asarray(calcular_dvs(numeros)).astype(object)
+
+        alterados = rng.random(cantidad) < fraccion_invalidos
+        dvs[alterados] = np.where(dvs[alterados] == '0', '1', '0')
+
+        formatos = rng.integers(0, 10, cantidad)
+        ceros = rng.integers(1, 4, cantidad)
+        invalidos = rng.integers(0, len(CASOS_INVALIDOS), cantidad)
+        ruts = []
+        for numero, dv, formato, cero, invalido in zip(
+            numeros.tolist(), dvs.tolist(), formatos.tolist(), ceros.tolist(), invalidos.tolist()
+        ):
+            canonico = componer_rut(numero, dv)
+            if formato == 0:
+                ruts.append(canonico)
+            elif formato == 1:
+                ruts.append(f'{numero}-{dv}')
+            elif formato == 2:
+                ruts.append(f'{numero}{dv}')
+            elif formato == 3:
+                ruts.append(canonico.lower())
+            elif formato == 4:
+                ruts.append(f"{'0' * cero}{numero}-{dv}")
+            elif formato == 5:
+                ruts.append(f' {canonico}\t')
+            elif formato == 6:
+                ruts.append(f'{numero} - {dv}\r\n')
+            elif formato == 7:
+                ruts.append(f'K{numero}-{dv}' if cero == 1 else f'{numero}k{dv}')
+            elif formato == 8:
+                # Dígitos de ancho completo: isdigit() los acepta pero no son un RUT
+                ruts.append(f'{numero}-{dv}'.translate(str.maketrans('0123456789', '０１２３４５６７８９')))
+            else:
+                ruts.append(CASOS_INVALIDOS[invalido])
+        return ruts
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from admin_gym.riesgo import calcular_riesgo
+
+
+class Command(BaseCommand):
+    """
+    Calcula en lote el riesgo de abandono de los clientes con membresía activa.
+    Por defecto es incremental; usar --completo para re-evaluar a todos.
+    """
+    help = 'Calcula el riesgo de abandono de clientes según su asistencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Re-evaluar a todos los clientes en lugar de solo los cambios desde la última ejecución'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Tamaño de lote para lectura y escritura (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        resumen = calcular_riesgo(completo=options['completo'], tamano_lote=options['lote'])
+
+        modo = 'incremental' if resumen['incremental'] else 'completo'
+        self.stdout.write(f"Cálculo {modo}: {resumen['evaluados']} clientes evaluados")
+        if resumen['eliminados']:
+            self.stdout.write(f"Eliminados {resumen['eliminados']} puntajes de clientes sin membresía activa")
+        self.stdout.write(self.style.SUCCESS(f"Clientes en riesgo: {resumen['en_riesgo']}"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.alta_masiva import MAX_INTENTOS_CREDENCIAL, enviar_credenciales_pendientes
+
+
+class Command(BaseCommand):
+    """
+    Envía las credenciales pendientes de las altas masivas: genera cada
+    contraseña temporal, la hashea en paralelo, la asigna al usuario y la envía
+    por correo. Pensado para ejecutarse periódicamente (cron).
+    """
+    help = 'Envía las credenciales de acceso pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=200, help='Credenciales por lote (default: 200)')
+        parser.add_argument('--procesos', type=int, help='Procesos para hashear contraseñas (default: núcleos disponibles)')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+        enviadas, fallidas = enviar_credenciales_pendientes(tamano_lote=options['lote'], procesos=options['procesos'])
+        self.stdout.write(self.style.SUCCESS(f"Credenciales enviadas: {enviadas}"))
+        if fallidas:
+            self.stdout.write(self.style.WARNING(f"Fallidas (se reintentan hasta {MAX_INTENTOS_CREDENCIAL} veces): {fallidas}"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from admin_gym.codigos_qr import generar_lote, limpiar_huerfanos
+
+
+class Command(BaseCommand):
+    """
+    Genera las imágenes QR de los clientes en paralelo. Los archivos se nombran
+    por el hash de su contenido, así que los códigos sin cambios no se vuelven a dibujar.
+    """
+    help = 'Genera imágenes QR de clientes y elimina las huérfanas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cliente', type=int, action='append', help='ID de cliente (repetible; por defecto todos)')
+        parser.add_argument('--procesos', type=int, help='Procesos de dibujo (default: núcleos disponibles)')
+        parser.add_argument('--limpiar', action='store_true', help='Elimina además las imágenes que ningún cliente referencia (salvo las de la última hora)')
+        parser.add_argument('--dry-run', action='store_true', help='Con --limpiar, solo lista las imágenes huérfanas')
+
+    def handle(self, *args, **options):
+        if not options['dry_run']:
+            resumen = generar_lote(clientes=options['cliente'], procesos=options['procesos'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Clientes: {resumen['clientes']}, imágenes dibujadas: {resumen['dibujados']}, "
+                f"reutilizadas: {resumen['reutilizados']}, clientes actualizados: {resumen['actualizados']}"
+            ))
+
+        if options['limpiar']:
+            huerfanos = limpiar_huerfanos(dry_run=options['dry_run'])
+            for archivo in huerfanos:
+                self.stdout.write(f"  {archivo}")
+            accion = 'a eliminar' if options['dry_run'] else 'eliminadas'
+            self.stdout.write(self.style.SUCCESS(f"Imágenes huérfanas {accion}: {len(huerfanos)}"))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.recomendaciones import generar_recomendaciones
+import time
+
+
+class Command(BaseCommand):
+    """
+    Genera recomendaciones de entrenamiento (estancamiento, progresión excesiva,
+    sobrecarga, cambio de rutina) a partir de RegistroProgreso.
+    Pensado para ejecución nocturna; por defecto es incremental.
+    """
+    help = 'Genera recomendaciones de entrenamiento desde el registro de progreso'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Evaluar a todos los clientes en lugar de solo los con registros nuevos'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Tamaño de lote para inserción (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            resumen = generar_recomendaciones(completo=options['completo'], tamano_lote=options['lote'])
+        except ImportError:
+            raise CommandError('NumPy no está instalado')
+        duracion = time.perf_counter() - inicio
+
+        modo = 'incremental' if resumen['incremental'] else 'completo'
+        self.stdout.write(f"Análisis {modo}: {resumen['registros']} registros de progreso en {duracion:.2f}s")
+        for tipo, cantidad in resumen['creadas'].items():
+            self.stdout.write(f"  {tipo}: {cantidad}")
+        if resumen['omitidas']:
+            self.stdout.write(f"Omitidas por estar ya pendientes: {resumen['omitidas']}")
+        self.stdout.write(self.style.SUCCESS(f"Recomendaciones creadas: {sum(resumen['creadas'].values())}"))
@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.importacion_pagos import ImportadorPagos, leer_csv, leer_ofx
+from pathlib import Path
+
+
+class Command(BaseCommand):
+    """
+    Importa pagos desde archivos de liquidación bancaria o POS (CSV u OFX)
+    y concilia cada fila con su cliente por RUT.
+    """
+    help = 'Importa y concilia pagos desde un archivo CSV u OFX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', type=str, help='Ruta del archivo a importar')
+        parser.add_argument(
+            '--formato',
+            choices=['csv', 'ofx'],
+            help='Formato del archivo (por defecto se deduce de la extensión)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='No escribe en la base de datos, solo muestra el reporte de diferencias'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Filas por transacción (default: 500)'
+        )
+        parser.add_argument(
+            '--delimitador',
+            type=str,
+            default=',',
+            help="Delimitador de columnas CSV (default: ',')"
+        )
+        parser.add_argument(
+            '--encoding',
+            type=str,
+            default='utf-8-sig',
+            help='Codificación del archivo (default: utf-8-sig)'
+        )
+
+    def handle(self, *args, **options):
+        ruta = Path(options['archivo'])
+        if not ruta.exists():
+            raise CommandError(f"Archivo no encontrado: {ruta}")
+
+        formato = options['formato'] or ('ofx' if ruta.suffix.lower() in ('.ofx', '.qfx') else 'csv')
+        dry_run = options['dry_run']
+
+        self.stdout.write(f"Importando {ruta} ({formato.upper()}){' en modo dry-run' if dry_run else ''}...")
+
+        importador = ImportadorPagos(tamano_lote=options['lote'], dry_run=dry_run)
+        with open(ruta, 'r', encoding=options['encoding'], newline='') as archivo:
+            if formato == 'ofx':
+                filas = leer_ofx(archivo)
+            else:
+                filas = leer_csv(archivo, delimitador=options['delimitador'])
+            reporte = importador.importar(filas)
+
+        self.mostrar_reporte(reporte, dry_run)
+
+    def mostrar_reporte(self, reporte, dry_run):
+        if reporte['cambios_clientes']:
+            self.stdout.write('\nCambios en clientes:')
+            for cambio in reporte['cambios_clientes']:
+                self.stdout.write(
+                    f"  {cambio['rut']} {cambio['nombre']}: "
+                    f"{cambio['estado_anterior']} -> activa, "
+                    f"vence {cambio['vencimiento_anterior'] or '-'} -> {cambio['vencimiento_nuevo']}"
+                )
+
+        if reporte['errores']:
+            self.stdout.write('\nFilas no importadas:')
+            for error in reporte['errores']:
+                self.stdout.write(
+                    self.style.WARNING(f"  Fila {error['fila']} ({error['rut'] or 'sin RUT'}): {error['motivo']}")
+                )
+
+        accion = 'a importar' if dry_run else 'importados'
+        self.stdout.write('')
+        self.stdout.write(f"Filas leídas: {reporte['leidas']}")
+        self.stdout.write(f"Duplicadas: {reporte['duplicadas']}")
+        self.stdout.write(f"Sin cliente: {reporte['sin_cliente']}")
+        self.stdout.write(f"Inválidas: {reporte['invalidas']}")
+        self.stdout.write(f"Clientes actualizados: {reporte['clientes_actualizados']}")
+        self.stdout.write(self.style.SUCCESS(f"Pagos {accion}: {reporte['importadas']}"))
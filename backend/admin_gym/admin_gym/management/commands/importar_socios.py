@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.alta_masiva import AltaMasivaSocios, enviar_credenciales_pendientes
+from admin_gym.importacion_pagos import leer_csv
+from pathlib import Path
+
+
+class Command(BaseCommand):
+    """
+    Da de alta socios en bloque desde una planilla CSV con columnas rut, nombre,
+    email y opcionalmente telefono y membresia. Valida todo el archivo antes de
+    escribir y luego envía las credenciales (las que fallen quedan pendientes
+    para el comando enviar_credenciales).
+    """
+    help = 'Alta masiva de socios desde una planilla CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', type=str, help='Ruta de la planilla CSV')
+        parser.add_argument('--dry-run', action='store_true', help='Solo valida y muestra el reporte')
+        parser.add_argument('--omitir-invalidas', action='store_true', help='Crea las filas válidas aunque otras tengan errores')
+        parser.add_argument('--sin-correo', action='store_true', help='No envía las credenciales por email')
+        parser.add_argument('--lote', type=int, default=500, help='Socios por transacción (default: 500)')
+        parser.add_argument('--procesos', type=int, help='Procesos para hashear contraseñas (default: núcleos disponibles)')
+        parser.add_argument('--delimitador', type=str, default=',', help="Delimitador de columnas (default: ',')")
+        parser.add_argument('--encoding', type=str, default='utf-8-sig', help='Codificación del archivo (default: utf-8-sig)')
+
+    def handle(self, *args, **options):
+        ruta = Path(options['archivo'])
+        if not ruta.exists():
+            raise CommandError(f"Archivo no encontrado: {ruta}")
+
+        alta = AltaMasivaSocios(
+            tamano_lote=options['lote'],
+            dry_run=options['dry_run'],
+            omitir_invalidas=options['omitir_invalidas'],
+            enviar_correos=not options['sin_correo'],
+        )
+        with open(ruta, 'r', encoding=options['encoding'], newline='') as archivo:
+            reporte = alta.importar(leer_csv(archivo, delimitador=options['delimitador']))
+
+        enviadas = fallidas = 0
+        if reporte['correos_encolados']:
+            enviadas, fallidas = enviar_credenciales_pendientes(procesos=options['procesos'])
+
+        for error in reporte['errores']:
+            self.stdout.write(self.style.WARNING(f"  Fila {error['fila']} ({error['rut'] or 'sin RUT'}): {error['motivo']}"))
+
+        self.stdout.write('')
+        self.stdout.write(f"Filas leídas: {reporte['leidas']}")
+        self.stdout.write(f"Válidas: {reporte['validas']}")
+        self.stdout.write(f"Inválidas: {reporte['invalidas']}")
+        self.stdout.write(f"Duplicadas: {reporte['duplicadas']}")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Socios a crear: {reporte['validas']}"))
+        elif reporte['creadas'] or not reporte['leidas']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Socios creados: {reporte['creadas']} ({enviadas} credenciales enviadas)"
+            ))
+            if fallidas:
+                self.stdout.write(self.style.WARNING(
+                    f"{fallidas} credenciales no se pudieron enviar; reintente con el comando enviar_credenciales"
+                ))
+        else:
+            self.stdout.write(self.style.ERROR('No se creó ningún socio; corrija las filas o use --omitir-invalidas'))
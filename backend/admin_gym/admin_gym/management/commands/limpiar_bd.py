@@ -1,27 +1,45 @@
-from django.core.management.base import BaseCommand
-from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.depuracion import eliminar_clientes, eliminar_profesores
 from admin_gym.models import Cliente, Profesor
 
 class Command(BaseCommand):
+    """
+    Elimina clientes y profesores (con sus usuarios) por lotes, cada uno en su
+    propia transacción, con pausa opcional entre lotes para no bloquear las
+    tablas en producción.
+    """
     help = 'Elimina todos los clientes y profesores de la base de datos'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa cuántos registros se eliminarían')
+        parser.add_argument('--lote', type=int, default=500, help='Registros por transacción (default: 500)')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos de espera entre lotes (default: 0)')
+
     def handle(self, *args, **options):
-        # Eliminar todos los clientes
-        clientes_count = Cliente.objects.count()
-        for cliente in Cliente.objects.all():
-            if cliente.user:
-                cliente.user.delete()
-            cliente.delete()
-        
-        # Eliminar todos los profesores
-        profesores_count = Profesor.objects.count()
-        for profesor in Profesor.objects.all():
-            if profesor.user:
-                profesor.user.delete()
-            profesor.delete()
-        
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        if options['dry_run']:
+            clientes = Cliente.objects.count()
+            profesores = Profesor.objects.count()
+            usuarios = Cliente.objects.filter(user__isnull=False).count() + Profesor.objects.filter(user__isnull=False).count()
+            self.stdout.write(
+                f'[dry-run] Se eliminarían {clientes} clientes y {profesores} profesores '
+                f'({usuarios} usuarios asociados, con sus registros en cascada)'
+            )
+            return
+
+        opciones = {'tamano_lote': options['lote'], 'pausa': options['pausa']}
+        clientes_count = eliminar_clientes(al_avanzar=self._progreso('Clientes'), **opciones)
+        profesores_count = eliminar_profesores(al_avanzar=self._progreso('Profesores'), **opciones)
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'Eliminados {clientes_count} clientes y {profesores_count} profesores de la base de datos'
             )
-        )
\ No newline at end of file
+        )
+
+    def _progreso(self, etiqueta):
+        def informar(hechos, total):
+            self.stdout.write(f'{etiqueta}: {hechos}/{total}')
+        return informar
@@ -1,28 +1,34 @@
-from django.core.management.base import BaseCommand
-from django.contrib.auth.models import User
-from admin_gym.models import Cliente, Profesor
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.depuracion import eliminar_en_lotes, usuarios_huerfanos
 
 class Command(BaseCommand):
     help = 'Elimina usuarios huérfanos que no tienen cliente o profesor asociado'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo lista los usuarios que se eliminarían')
+        parser.add_argument('--lote', type=int, default=500, help='Usuarios por transacción (default: 500)')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos de espera entre lotes (default: 0)')
+
     def handle(self, *args, **options):
-        usuarios_eliminados = 0
-        
-        for user in User.objects.all():
-            # No eliminar superusuarios
-            if user.is_superuser:
-                continue
-                
-            # Verificar si tiene cliente o profesor asociado
-            tiene_cliente = Cliente.objects.filter(user=user).exists()
-            tiene_profesor = Profesor.objects.filter(user=user).exists()
-            
-            # Si no tiene ninguno, eliminarlo
-            if not tiene_cliente and not tiene_profesor:
-                self.stdout.write(f'Eliminando usuario huérfano: {user.username} ({user.email})')
-                user.delete()
-                usuarios_eliminados += 1
-        
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        # Superusuarios excluidos; huérfanos resueltos con un LEFT JOIN a cliente y profesor
+        huerfanos = usuarios_huerfanos()
+        if options['dry_run'] or options['verbosity'] >= 2:
+            for username, email in huerfanos.order_by('pk').values_list('username', 'email').iterator(chunk_size=2000):
+                self.stdout.write(f'{"Se eliminaría" if options["dry_run"] else "Eliminando"} usuario huérfano: {username} ({email})')
+        if options['dry_run']:
+            self.stdout.write(f'[dry-run] {huerfanos.count()} usuarios huérfanos')
+            return
+
+        usuarios_eliminados = eliminar_en_lotes(
+            huerfanos,
+            tamano_lote=options['lote'],
+            pausa=options['pausa'],
+            al_avanzar=lambda hechos, total: self.stdout.write(f'Usuarios: {hechos}/{total}'),
+        )
+
         self.stdout.write(
             self.style.SUCCESS(f'Eliminados {usuarios_eliminados} usuarios huérfanos')
-        )
\ No newline at end of file
+        )
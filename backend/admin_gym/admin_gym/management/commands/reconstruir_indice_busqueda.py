@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from admin_gym.busqueda import DOCUMENTOS, reconstruir_indice
+
+
+class Command(BaseCommand):
+    """
+    Regenera el índice de búsqueda. Las altas y cambios individuales se indexan
+    por señales; este comando cubre cargas masivas con bulk_create.
+    """
+    help = 'Reconstruye el índice de búsqueda de clientes y ejercicios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tipo',
+            choices=list(DOCUMENTOS),
+            action='append',
+            help='Tipo a reconstruir (repetible; por defecto todos)'
+        )
+
+    def handle(self, *args, **options):
+        totales = reconstruir_indice(tipos=options['tipo'])
+        for tipo, total in totales.items():
+            self.stdout.write(self.style.SUCCESS(f"{tipo}: {total} documentos indexados"))
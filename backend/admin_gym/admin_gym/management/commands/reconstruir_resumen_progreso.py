@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from admin_gym.progreso import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    """
+    Regenera el resumen semanal de progreso desde RegistroProgreso. Necesario
+    una vez tras la migración y después de cargas que no disparan señales.
+    """
+    help = 'Reconstruye el resumen semanal de RegistroProgreso'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cliente',
+            type=int,
+            action='append',
+            help='ID de cliente a reconstruir (repetible; por defecto todos)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=2000,
+            help='Tamaño de lote para lectura y escritura (default: 2000)'
+        )
+
+    def handle(self, *args, **options):
+        creados = reconstruir_resumenes(clientes=options['cliente'], tamano_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"Resumen reconstruido: {creados} semanas"))
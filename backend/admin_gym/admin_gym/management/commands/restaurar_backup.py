@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.restauracion import cadena, eliminar_destino, restaurar
+from admin_gym.respaldos import ErrorRespaldo
+
+
+class Command(BaseCommand):
+    """
+    Restaura un backup en una base de prueba y lo verifica: SHA-256 del archivo,
+    filas y checksum de cada tabla contra el manifiesto. Informa el tiempo y el
+    rendimiento de la restauración (el tiempo real de recuperación).
+    """
+    help = 'Restaura y verifica un backup en una base de prueba'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Archivo de backup (gym_backup_*.sql.gz / .zst)')
+        parser.add_argument(
+            '--destino',
+            help='Archivo SQLite o nombre de la base MySQL de prueba, terminado en _restauracion (default: temporal / <BD>_restauracion)'
+        )
+        parser.add_argument('--tablas', nargs='+', help='Restaura solo estas tablas (nombre de tabla o de modelo)')
+        parser.add_argument('--sin-verificar', action='store_true', help='No compara filas ni checksums')
+        parser.add_argument('--conservar', action='store_true', help='No elimina la base de prueba al terminar')
+
+    def handle(self, *args, **options):
+        try:
+            motor = cadena(options['archivo'])[-1]['motor']
+            reporte = restaurar(
+                options['archivo'],
+                destino=options['destino'],
+                tablas=options['tablas'],
+                verificar=not options['sin_verificar'],
+            )
+        except (ErrorRespaldo, OSError) as e:
+            raise CommandError(f'Error restaurando: {e}')
+
+        segundos = reporte['segundos_restauracion'] or 0.001
+        megabytes = reporte['bytes'] / 1024 / 1024
+        self.stdout.write(f"Restaurado: {' + '.join(reporte['archivos'])} -> {reporte['destino']}")
+        self.stdout.write(
+            f"Tiempo de restauración: {reporte['segundos_restauracion']:.1f}s | "
+            f"{reporte['bytes_comprimidos'] / 1024 / 1024:.1f} MB comprimidos, {megabytes:.1f} MB de SQL "
+            f"({megabytes / segundos:.1f} MB/s)"
+        )
+        if reporte['filas'] is not None:
+            self.stdout.write(
+                f"Filas: {reporte['filas']} ({reporte['filas'] / segundos:.0f} filas/s) | "
+                f"verificación: {reporte['segundos_verificacion']:.1f}s"
+            )
+            for tabla in reporte['diferencias']:
+                detalle = reporte['tablas'][tabla]
+                self.stdout.write(self.style.WARNING(
+                    f"  {tabla}: {detalle['filas']} filas (esperadas {detalle['filas_esperadas']}), checksum distinto"
+                    if detalle['filas'] == detalle['filas_esperadas'] else
+                    f"  {tabla}: {detalle['filas']} filas (esperadas {detalle['filas_esperadas']})"
+                ))
+        elif not options['sin_verificar']:
+            self.stdout.write(self.style.WARNING('El manifiesto no tiene checksums por tabla; no se verificó el contenido'))
+
+        if not options['conservar'] and not options['destino']:
+            eliminar_destino(reporte['destino'], motor)
+
+        if reporte['diferencias']:
+            raise CommandError(f"{len(reporte['diferencias'])} tablas no coinciden con el manifiesto")
+        self.stdout.write(self.style.SUCCESS(
+            f"Backup verificado: {len(reporte['tablas'])} tablas" if reporte['tablas'] else 'Backup restaurado'
+        ))
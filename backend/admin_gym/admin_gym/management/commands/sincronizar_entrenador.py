@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from admin_gym.sincronizacion_entrenador import MAX_INTENTOS, DestinoNoDisponible, purgar_eventos, sincronizar
+import time
+
+
+class Command(BaseCommand):
+    """
+    Relay del outbox de clientes: entrega a entrenador_app en lote las altas,
+    modificaciones y bajas registradas en EventoSincronizacion. Con --intervalo
+    queda corriendo y revisa el outbox cada tantos segundos.
+    """
+    help = 'Sincroniza los cambios de clientes con la app de entrenadores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Eventos por lote (default: 500)')
+        parser.add_argument('--intervalo', type=int, help='Segundos entre revisiones; sin él se ejecuta una vez')
+        parser.add_argument('--purgar-dias', type=int, default=7, help='Elimina eventos entregados hace más de N días (default: 7)')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+        while True:
+            try:
+                resumen = sincronizar(tamano_lote=options['lote'])
+            except DestinoNoDisponible as e:
+                raise CommandError(str(e))
+            except Exception as e:
+                if options['intervalo'] is None:
+                    raise CommandError(f'Error de sincronización, los eventos quedan pendientes: {e}')
+                resumen = None
+            if resumen and resumen['eventos']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Eventos: {resumen['eventos']} | creados: {resumen['creados']} | "
+                    f"actualizados: {resumen['actualizados']} | eliminados: {resumen['eliminados']}"
+                ))
+            if resumen and (resumen['fallidos'] or resumen['descartados']):
+                self.stdout.write(self.style.WARNING(
+                    f"Eventos rechazados: {resumen['fallidos']} pendientes de reintento, "
+                    f"{resumen['descartados']} descartados tras {MAX_INTENTOS} intentos"
+                ))
+            purgados = purgar_eventos(options['purgar_dias'])
+            if purgados:
+                self.stdout.write(f'Eventos antiguos purgados: {purgados}')
+            if options['intervalo'] is None:
+                break
+            time.sleep(options['intervalo'])
@@ -1,9 +1,11 @@
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib.auth.signals import user_logged_in, user_logged_out
 from django.dispatch import receiver
+from django.conf import settings
 from django.utils import timezone
 from .models import AuditoriaEvento
 import json
+import time
 
 class AuditMiddleware(MiddlewareMixin):
     """
@@ -79,6 +81,30 @@ class SecurityMiddleware(MiddlewareMixin):
         
         return response
 
+def sin_renovar_sesion(vista):
+    """Marca una vista de polling: sus peticiones no extienden la sesión"""
+    vista.sin_renovar_sesion = True
+    return vista
+
+class RenovacionSesionMiddleware(MiddlewareMixin):
+    """
+    Expiración deslizante sin escribir la sesión en cada petición: la sesión se
+    vuelve a guardar (y su vencimiento se corre SESSION_COOKIE_AGE) a lo sumo
+    una vez cada SESSION_RENOVACION_SEGUNDOS. Vence entre una hora menos el
+    intervalo y una hora después de la última petición del usuario; el polling
+    automático (vistas con sin_renovar_sesion) no la mantiene viva.
+    """
+    CLAVE = '_renovada'
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        sesion = getattr(request, 'session', None)
+        if sesion is None or not sesion.session_key or getattr(view_func, 'sin_renovar_sesion', False):
+            return None
+        ahora = int(time.time())
+        if ahora - sesion.get(self.CLAVE, 0) >= getattr(settings, 'SESSION_RENOVACION_SEGUNDOS', 60):
+            sesion[self.CLAVE] = ahora
+        return None
+
 # Signals para auditoría de login/logout
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs):
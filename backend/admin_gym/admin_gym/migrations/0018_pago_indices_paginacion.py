@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0017_remove_asistencia_clase_sesion_asistencia_sesion_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['fecha_pago', 'id'], name='pago_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['estado', 'fecha_pago'], name='pago_estado_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:05
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0018_pago_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiesgoAbandono',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntaje', models.FloatField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('en_riesgo', models.BooleanField(default=False)),
+                ('asistencias_recientes', models.PositiveIntegerField(default=0, help_text='Últimas 4 semanas')),
+                ('asistencias_previas', models.PositiveIntegerField(default=0, help_text='Semanas 5 a 8')),
+                ('ultima_asistencia', models.DateTimeField(blank=True, null=True)),
+                ('dias_sin_asistir', models.PositiveIntegerField(default=0)),
+                ('fecha_calculo', models.DateTimeField()),
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='riesgo', to='admin_gym.cliente')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['en_riesgo', 'puntaje'], name='riesgo_en_riesgo_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0019_riesgoabandono'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroprogreso',
+            index=models.Index(fields=['cliente', 'ejercicio', 'fecha'], name='progreso_cli_ej_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroprogreso',
+            index=models.Index(fields=['cliente', 'fecha'], name='progreso_cli_fecha_idx'),
+        ),
+        migrations.CreateModel(
+            name='ResumenSemanalProgreso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semana', models.DateField(help_text='Lunes de la semana')),
+                ('registros', models.PositiveIntegerField(default=0)),
+                ('series', models.PositiveIntegerField(default=0)),
+                ('volumen', models.DecimalField(decimal_places=2, default=0, help_text='Series x repeticiones x peso', max_digits=12)),
+                ('peso_maximo', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('e1rm_maximo', models.DecimalField(blank=True, decimal_places=2, help_text='1RM estimado (Epley)', max_digits=7, null=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='admin_gym.cliente')),
+                ('ejercicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='admin_gym.ejercicio')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cliente', 'semana'], name='resumen_cli_semana_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cliente', 'ejercicio', 'semana'), name='resumen_semanal_unico')],
+            },
+        ),
+    ]
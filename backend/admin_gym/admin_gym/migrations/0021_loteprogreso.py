@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0020_registroprogreso_indices_resumensemanalprogreso'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteProgreso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(help_text='Clave de idempotencia enviada por el cliente HTTP', max_length=64, unique=True)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('registros', models.PositiveIntegerField(default=0)),
+                ('respuesta', models.JSONField(default=dict)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='admin_gym.cliente')),
+                ('registrado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
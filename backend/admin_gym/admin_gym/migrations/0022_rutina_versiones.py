@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0021_loteprogreso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rutina',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Aumenta con cada cambio en sus ejercicios'),
+        ),
+        migrations.AddField(
+            model_name='rutina',
+            name='plantilla_origen',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='copias', to='admin_gym.rutina'),
+        ),
+        migrations.AddField(
+            model_name='rutina',
+            name='version_origen',
+            field=models.PositiveIntegerField(blank=True, help_text='Versión de la plantilla al clonarla', null=True),
+        ),
+        migrations.AddField(
+            model_name='rutina',
+            name='cliente',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rutinas_personalizadas', to='admin_gym.cliente'),
+        ),
+        migrations.AddField(
+            model_name='rutinacliente',
+            name='version_asignada',
+            field=models.PositiveIntegerField(default=1, help_text='Versión de la rutina al asignarla'),
+        ),
+        migrations.AddIndex(
+            model_name='rutinacliente',
+            index=models.Index(fields=['cliente', 'activa'], name='rutinacliente_activa_idx'),
+        ),
+    ]
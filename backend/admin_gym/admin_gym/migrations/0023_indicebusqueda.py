@@ -0,0 +1,118 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:52
+
+from django.db import migrations, models
+import re
+import unicodedata
+
+TABLA = 'admin_gym_indicebusqueda'
+TABLA_FTS = 'admin_gym_indicebusqueda_fts'
+
+SQLITE_CREAR = [
+    f"CREATE VIRTUAL TABLE {TABLA_FTS} USING fts5(texto, content='{TABLA}', content_rowid='id')",
+    f"CREATE TRIGGER {TABLA_FTS}_ai AFTER INSERT ON {TABLA} BEGIN "
+    f"INSERT INTO {TABLA_FTS}(rowid, texto) VALUES (new.id, new.texto); END",
+    f"CREATE TRIGGER {TABLA_FTS}_ad AFTER DELETE ON {TABLA} BEGIN "
+    f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, texto) VALUES ('delete', old.id, old.texto); END",
+    f"CREATE TRIGGER {TABLA_FTS}_au AFTER UPDATE ON {TABLA} BEGIN "
+    f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, texto) VALUES ('delete', old.id, old.texto); "
+    f"INSERT INTO {TABLA_FTS}(rowid, texto) VALUES (new.id, new.texto); END",
+]
+SQLITE_ELIMINAR = [
+    f"DROP TRIGGER IF EXISTS {TABLA_FTS}_ai",
+    f"DROP TRIGGER IF EXISTS {TABLA_FTS}_ad",
+    f"DROP TRIGGER IF EXISTS {TABLA_FTS}_au",
+    f"DROP TABLE IF EXISTS {TABLA_FTS}",
+]
+MYSQL_CREAR = [f"CREATE FULLTEXT INDEX indice_busqueda_texto_ft ON {TABLA} (texto)"]
+MYSQL_ELIMINAR = [f"DROP INDEX indice_busqueda_texto_ft ON {TABLA}"]
+
+
+def crear_indice_texto(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    sentencias = SQLITE_CREAR if vendor == 'sqlite' else MYSQL_CREAR if vendor == 'mysql' else []
+    for sentencia in sentencias:
+        schema_editor.execute(sentencia)
+
+
+def eliminar_indice_texto(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    sentencias = SQLITE_ELIMINAR if vendor == 'sqlite' else MYSQL_ELIMINAR if vendor == 'mysql' else []
+    for sentencia in sentencias:
+        schema_editor.execute(sentencia)
+
+
+# Copias congeladas de admin_gym.busqueda: la migración no debe cambiar si cambia la app
+def normalizar(texto):
+    if not texto:
+        return ''
+    sin_tildes = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', ' ', sin_tildes.lower()).strip()
+
+
+def rut_compacto(rut):
+    return str(rut or '').upper().replace('.', '').replace('-', '').replace(' ', '').strip()
+
+
+def rut_formateado(rut):
+    compacto = str(rut or '').upper().replace('.', '').replace('-', '')
+    if len(compacto) < 2:
+        return rut
+    numero = compacto[:-1]
+    grupos = [numero[max(i - 3, 0):i] for i in range(len(numero), 0, -3)]
+    return f"{'.'.join(reversed(grupos))}-{compacto[-1]}"
+
+
+def texto_cliente(cliente):
+    digitos = re.sub(r'\D', '', cliente.telefono or '')
+    return ' '.join(filter(None, [
+        normalizar(cliente.nombre),
+        normalizar(rut_formateado(cliente.rut)),
+        normalizar(rut_compacto(cliente.rut)),
+        normalizar(cliente.email),
+        normalizar(cliente.email.split('@')[0]) if cliente.email else '',
+        f'{digitos} {digitos[-8:]}' if len(digitos) > 8 else digitos,
+    ]))
+
+
+def texto_ejercicio(ejercicio):
+    return ' '.join(filter(None, [
+        normalizar(ejercicio.nombre),
+        normalizar(ejercicio.grupo_muscular),
+        normalizar(ejercicio.descripcion),
+    ]))
+
+
+def poblar_indice(apps, schema_editor):
+    IndiceBusqueda = apps.get_model('admin_gym', 'IndiceBusqueda')
+    for tipo, modelo, generar_texto in (
+        ('cliente', apps.get_model('admin_gym', 'Cliente'), texto_cliente),
+        ('ejercicio', apps.get_model('admin_gym', 'Ejercicio'), texto_ejercicio),
+    ):
+        IndiceBusqueda.objects.bulk_create(
+            [IndiceBusqueda(tipo=tipo, objeto_id=objeto.pk, texto=generar_texto(objeto)) for objeto in modelo.objects.iterator()],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0022_rutina_versiones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('cliente', 'Cliente'), ('ejercicio', 'Ejercicio')], max_length=20)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('texto', models.TextField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='indice_busqueda_unico')],
+            },
+        ),
+        migrations.RunPython(crear_indice_texto, eliminar_indice_texto),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
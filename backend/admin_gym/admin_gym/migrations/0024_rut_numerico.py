@@ -0,0 +1,74 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:30
+
+import logging
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+# Copia congelada de admin_gym.utils.descomponer_rut: la migración no debe cambiar si cambia la app
+def descomponer_rut(rut):
+    rut = str(rut or '').upper().replace('.', '').replace('-', '').replace(' ', '').strip()
+    cuerpo = rut[:-1]
+    if len(rut) < 2 or not (cuerpo.isascii() and cuerpo.isdigit()) or len(cuerpo.lstrip('0')) > 8:
+        return None
+    numero = int(cuerpo)
+    suma = sum(int(c) * (2 + i % 6) for i, c in enumerate(reversed(str(numero))))
+    dv = {11: '0', 10: 'K'}.get(11 - suma % 11, str(11 - suma % 11))
+    if numero == 0 or dv != rut[-1]:
+        return None
+    return numero, dv
+
+
+def poblar_rut_numerico(apps, schema_editor):
+    for nombre_modelo in ('Cliente', 'Profesor'):
+        modelo = apps.get_model('admin_gym', nombre_modelo)
+        vistos = set()
+        actualizados = []
+        omitidos = []
+        for objeto in modelo.objects.order_by('id').only('id', 'rut'):
+            partes = descomponer_rut(objeto.rut)
+            # RUTs inválidos o repetidos en otro formato quedan sin columna numérica
+            if partes is None or partes[0] in vistos:
+                omitidos.append(f"{objeto.id} ('{objeto.rut}')")
+                continue
+            vistos.add(partes[0])
+            objeto.rut_numero, objeto.rut_dv = partes
+            actualizados.append(objeto)
+        modelo.objects.bulk_update(actualizados, ['rut_numero', 'rut_dv'], batch_size=1000)
+        if omitidos:
+            logger.warning(
+                f"{nombre_modelo}: {len(omitidos)} RUT inválidos o duplicados quedan sin columna numérica: "
+                f"{', '.join(omitidos[:100])}{' ...' if len(omitidos) > 100 else ''}"
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0023_indicebusqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='rut_numero',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Cuerpo numérico del RUT', null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='rut_dv',
+            field=models.CharField(blank=True, editable=False, max_length=1),
+        ),
+        migrations.AddField(
+            model_name='profesor',
+            name='rut_numero',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Cuerpo numérico del RUT', null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='profesor',
+            name='rut_dv',
+            field=models.CharField(blank=True, editable=False, max_length=1),
+        ),
+        migrations.RunPython(poblar_rut_numerico, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 21:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0024_rut_numerico'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accesoqr',
+            name='cliente',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='admin_gym.cliente'),
+        ),
+        migrations.AlterField(
+            model_name='accesoqr',
+            name='fecha_acceso',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='accesoqr',
+            index=models.Index(fields=['cliente', 'fecha_acceso'], name='accesoqr_cli_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesoqr',
+            index=models.Index(fields=['fecha_acceso'], name='accesoqr_fecha_idx'),
+        ),
+        migrations.CreateModel(
+            name='ResumenMensualAcceso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes')),
+                ('exitosos', models.PositiveIntegerField(default=0)),
+                ('fallidos', models.PositiveIntegerField(default=0)),
+                ('primer_acceso', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_acceso', models.DateTimeField(blank=True, null=True)),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='admin_gym.cliente')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cliente', 'mes'], name='resumen_acceso_cli_mes_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 22:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0025_accesoqr_registro'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoSincronizacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cliente_id', models.PositiveIntegerField()),
+                ('user_id', models.PositiveIntegerField(blank=True, help_text='Usuario del cliente eliminado (clave en la app de entrenadores)', null=True)),
+                ('tipo', models.CharField(choices=[('upsert', 'Alta o modificación'), ('baja', 'Eliminación')], default='upsert', max_length=10)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('procesado', models.DateTimeField(blank=True, null=True)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['procesado', 'id'], name='evento_sync_pendiente_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0026_eventosincronizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabla', models.CharField(max_length=30)),
+                ('mes', models.DateField(help_text='Primer día del mes')),
+                ('clave', models.CharField(help_text='Cliente, tipo de evento o plantilla, según la tabla', max_length=50)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tabla', 'mes', 'clave'), name='resumen_archivado_unico')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['fecha'], name='asistencia_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacionenviada',
+            index=models.Index(fields=['fecha_envio'], name='notif_enviada_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditoriaevento',
+            index=models.Index(fields=['fecha'], name='auditoria_fecha_idx'),
+        ),
+    ]
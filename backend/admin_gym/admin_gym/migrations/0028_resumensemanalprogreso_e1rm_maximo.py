@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0027_resumenarchivado_indices_fecha'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resumensemanalprogreso',
+            name='e1rm_maximo',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='1RM estimado (Epley)', max_digits=14, null=True),
+        ),
+    ]
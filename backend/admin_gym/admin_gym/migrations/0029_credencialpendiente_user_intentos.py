@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-20 09:15
+
+import django.db.models.deletion
+import logging
+from django.conf import settings
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def asociar_usuarios(apps, schema_editor):
+    """
+    Asocia las credenciales pendientes a su usuario por RUT. Las que esperan su
+    primera contraseña guardan el hash inutilizable del alta, que es con el que
+    se compara antes de asignarla; las que no tienen usuario quedan sin asociar
+    y el envío las elimina.
+    """
+    CredencialPendiente = apps.get_model('admin_gym', 'CredencialPendiente')
+    User = apps.get_model('auth', 'User')
+    pendientes = list(CredencialPendiente.objects.filter(enviado=False, user__isnull=True))
+    usuarios = {
+        username: (user_id, password)
+        for username, user_id, password in User.objects.filter(username__in={c.rut for c in pendientes})
+        .values_list('username', 'id', 'password')
+    }
+    sin_usuario = []
+    for credencial in pendientes:
+        if credencial.rut not in usuarios:
+            sin_usuario.append(credencial.rut)
+            continue
+        credencial.user_id, password = usuarios[credencial.rut]
+        if not credencial.password_temporal and password.startswith('!'):
+            credencial.password_temporal = password
+    CredencialPendiente.objects.bulk_update(pendientes, ['user', 'password_temporal'], batch_size=1000)
+    if sin_usuario:
+        logger.warning(f"Credenciales pendientes sin usuario ({len(sin_usuario)}): {', '.join(sin_usuario[:50])}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_gym', '0028_resumensemanalprogreso_e1rm_maximo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='credencialpendiente',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='credencialpendiente',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(asociar_usuarios, migrations.RunPython.noop),
+    ]
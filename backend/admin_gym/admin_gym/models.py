@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -8,10 +8,34 @@ from django.contrib.auth.hashers import make_password, check_password
 import re
 import uuid
 import json
+import logging
+from .utils import descomponer_rut
+
+logger = logging.getLogger(__name__)
+
+def sincronizar_rut(instancia):
+    """
+    Copia el RUT a las columnas numéricas indexadas (vacías si el RUT es
+    inválido). Un registro heredado cuyo RUT repite el de otro en otro formato
+    (la migración 0024 lo dejó sin columna numérica) la conserva vacía en vez
+    de fallar por la restricción única.
+    """
+    partes = descomponer_rut(instancia.rut)
+    if partes and instancia.pk is not None and instancia.rut_numero is None:
+        repetido = type(instancia)._default_manager.filter(rut_numero=partes[0]).exclude(pk=instancia.pk)
+        if repetido.exists():
+            logger.warning(
+                f"{type(instancia).__name__} {instancia.pk}: RUT {instancia.rut} repetido en otro registro, "
+                "se deja sin columna numérica"
+            )
+            partes = None
+    instancia.rut_numero, instancia.rut_dv = partes if partes else (None, '')
 
 class Profesor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
     rut = models.CharField(max_length=12, unique=True, help_text="RUT con formato 12345678-9")
+    rut_numero = models.PositiveIntegerField(unique=True, null=True, blank=True, editable=False, help_text="Cuerpo numérico del RUT")
+    rut_dv = models.CharField(max_length=1, blank=True, editable=False)
     nombre = models.CharField(max_length=100)
     
     def clean(self):
@@ -21,6 +45,10 @@ class Profesor(models.Model):
     telefono = models.CharField(max_length=20)
     especialidad = models.CharField(max_length=100, blank=True)
 
+    def save(self, *args, **kwargs):
+        sincronizar_rut(self)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return escape(self.nombre)
 class PerfilUsuario(models.Model):
@@ -53,6 +81,8 @@ class Cliente(models.Model):
     ]
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
     rut = models.CharField(max_length=12, unique=True, help_text="RUT con formato 12345678-9")
+    rut_numero = models.PositiveIntegerField(unique=True, null=True, blank=True, editable=False, help_text="Cuerpo numérico del RUT")
+    rut_dv = models.CharField(max_length=1, blank=True, editable=False)
     nombre = models.CharField(max_length=100)
     
     def clean(self):
@@ -73,40 +103,21 @@ class Cliente(models.Model):
     def save(self, *args, **kwargs):
         if not self.qr_code:
             self.qr_code = str(uuid.uuid4())
-        super().save(*args, **kwargs)
+        sincronizar_rut(self)
+        # El evento de sincronización (señal post_save) se escribe en la misma transacción
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
     
     def generate_qr_code(self):
         """Generar código QR único para el cliente"""
-        import qrcode
-        from io import BytesIO
-        from django.core.files.base import ContentFile
+        from .codigos_qr import guardar_png
         
         # Generar nuevo token si no existe
         if not self.qr_code:
             self.qr_code = str(uuid.uuid4())
         
-        # Crear QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(self.qr_code)
-        qr.make(fit=True)
-        
-        # Generar imagen
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        
-        # Guardar archivo
-        filename = f'qr_{self.id}_{uuid.uuid4().hex[:8]}.png'
-        self.qr_image.save(
-            filename,
-            ContentFile(buffer.getvalue()),
-            save=False
-        )
+        # La imagen se nombra por su contenido: si el código no cambió, se reutiliza el archivo
+        self.qr_image.name = guardar_png(self.qr_code)
         
         return self.qr_code
     
@@ -137,6 +148,11 @@ class Asistencia(models.Model):
     fecha = models.DateTimeField(auto_now_add=True)
     sesion = models.ForeignKey(Sesion, on_delete=models.CASCADE, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha'], name='asistencia_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"{escape(self.cliente.nombre)} - {self.fecha:%Y-%m-%d %H:%M}"
 
@@ -155,6 +171,13 @@ class Pago(models.Model):
         ('Vencido', 'Vencido'),
     ], default='Pendiente')
 
+    class Meta:
+        indexes = [
+            # Paginación por clave del listado de pagos y filtros por estado
+            models.Index(fields=['fecha_pago', 'id'], name='pago_fecha_id_idx'),
+            models.Index(fields=['estado', 'fecha_pago'], name='pago_estado_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"{escape(self.cliente.nombre)} - {self.plan} - {self.estado}"
 class CredencialPendiente(models.Model):
@@ -162,7 +185,10 @@ class CredencialPendiente(models.Model):
     email = models.EmailField()
     rut = models.CharField(max_length=20)
     password_temporal = models.CharField(max_length=128)  # Aumentado para hash
+    # Cuenta a la que pertenece: solo se le asigna contraseña si sigue con la que se le dejó
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     enviado = models.BooleanField(default=False)
+    intentos = models.PositiveSmallIntegerField(default=0)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     
     def set_password_temporal(self, raw_password):
@@ -205,6 +231,10 @@ class Rutina(models.Model):
     creado_por = models.ForeignKey(User, on_delete=models.CASCADE)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     activa = models.BooleanField(default=True)
+    version = models.PositiveIntegerField(default=1, help_text="Aumenta con cada cambio en sus ejercicios")
+    plantilla_origen = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='copias')
+    version_origen = models.PositiveIntegerField(null=True, blank=True, help_text="Versión de la plantilla al clonarla")
+    cliente = models.ForeignKey('Cliente', on_delete=models.CASCADE, null=True, blank=True, related_name='rutinas_personalizadas')
     
     def __str__(self):
         return escape(self.nombre)
@@ -230,7 +260,13 @@ class RutinaCliente(models.Model):
     fecha_inicio = models.DateField()
     fecha_fin = models.DateField(null=True, blank=True)
     activa = models.BooleanField(default=True)
-    
+    version_asignada = models.PositiveIntegerField(default=1, help_text="Versión de la rutina al asignarla")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cliente', 'activa'], name='rutinacliente_activa_idx'),
+        ]
+
 class RegistroProgreso(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
     ejercicio = models.ForeignKey(Ejercicio, on_delete=models.CASCADE)
@@ -247,15 +283,122 @@ class RegistroProgreso(models.Model):
     calidad_sueno = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(10)], null=True, blank=True)
     nivel_energia = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(10)], null=True, blank=True)
     visto_por_profesor = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cliente', 'ejercicio', 'fecha'], name='progreso_cli_ej_fecha_idx'),
+            models.Index(fields=['cliente', 'fecha'], name='progreso_cli_fecha_idx'),
+        ]
+
+class ResumenSemanalProgreso(models.Model):
+    """Agregado semanal de RegistroProgreso por (cliente, ejercicio), mantenido al insertar"""
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
+    ejercicio = models.ForeignKey(Ejercicio, on_delete=models.CASCADE)
+    semana = models.DateField(help_text="Lunes de la semana")
+    registros = models.PositiveIntegerField(default=0)
+    series = models.PositiveIntegerField(default=0)
+    volumen = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Series x repeticiones x peso")
+    peso_maximo = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    # Epley crece con las repeticiones: 14 dígitos cubren un peso de 999.99 con cualquier PositiveIntegerField
+    e1rm_maximo = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, help_text="1RM estimado (Epley)")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cliente', 'ejercicio', 'semana'], name='resumen_semanal_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['cliente', 'semana'], name='resumen_cli_semana_idx'),
+        ]
     
-class AccesoQR(models.Model):
+class LoteProgreso(models.Model):
+    """Sesión de progreso registrada en lote; la clave evita duplicar reintentos"""
+    clave = models.CharField(max_length=64, unique=True, help_text="Clave de idempotencia enviada por el cliente HTTP")
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
+    registrado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+    registros = models.PositiveIntegerField(default=0)
+    respuesta = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"Lote {escape(self.clave)} - {escape(self.cliente.nombre)}"
+
+class IndiceBusqueda(models.Model):
+    """Texto normalizado de clientes y ejercicios para la búsqueda de texto completo"""
+    TIPOS = [
+        ('cliente', 'Cliente'),
+        ('ejercicio', 'Ejercicio'),
+    ]
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    objeto_id = models.PositiveIntegerField()
+    texto = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='indice_busqueda_unico'),
+        ]
+
+class AccesoQR(models.Model):
+    # Sin cliente cuando el código no corresponde a nadie (falsificado, vencido, RUT desconocido)
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, null=True, blank=True)
     qr_code = models.CharField(max_length=100)
-    fecha_acceso = models.DateTimeField(auto_now_add=True)
+    # Hora del escaneo, no de la inserción: los accesos se insertan en lote
+    fecha_acceso = models.DateTimeField(default=timezone.now)
     exitoso = models.BooleanField()
     motivo_fallo = models.CharField(max_length=200, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cliente', 'fecha_acceso'], name='accesoqr_cli_fecha_idx'),
+            models.Index(fields=['fecha_acceso'], name='accesoqr_fecha_idx'),
+        ]
+
+class ResumenMensualAcceso(models.Model):
+    """Accesos archivados: conteo mensual por cliente una vez vencida la retención del detalle"""
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, null=True, blank=True)
+    mes = models.DateField(help_text="Primer día del mes")
+    exitosos = models.PositiveIntegerField(default=0)
+    fallidos = models.PositiveIntegerField(default=0)
+    primer_acceso = models.DateTimeField(null=True, blank=True)
+    ultimo_acceso = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cliente', 'mes'], name='resumen_acceso_cli_mes_idx'),
+        ]
+
+class ResumenArchivado(models.Model):
+    """Conteo mensual de las filas movidas al archivo histórico, por tabla y clave de agrupación"""
+    tabla = models.CharField(max_length=30)
+    mes = models.DateField(help_text="Primer día del mes")
+    clave = models.CharField(max_length=50, help_text="Cliente, tipo de evento o plantilla, según la tabla")
+    cantidad = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tabla', 'mes', 'clave'], name='resumen_archivado_unico'),
+        ]
+
+class EventoSincronizacion(models.Model):
+    """Outbox de cambios de clientes pendientes de propagar a la app de entrenadores"""
+    TIPOS = [
+        ('upsert', 'Alta o modificación'),
+        ('baja', 'Eliminación'),
+    ]
+    # Sin FK: el evento de baja debe sobrevivir al cliente
+    cliente_id = models.PositiveIntegerField()
+    user_id = models.PositiveIntegerField(null=True, blank=True, help_text="Usuario del cliente eliminado (clave en la app de entrenadores)")
+    tipo = models.CharField(max_length=10, choices=TIPOS, default='upsert')
+    fecha = models.DateTimeField(default=timezone.now)
+    procesado = models.DateTimeField(null=True, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['procesado', 'id'], name='evento_sync_pendiente_idx'),
+        ]
+
 class ConfiguracionSistema(models.Model):
     clave = models.CharField(max_length=50, unique=True)
     valor = models.TextField()
@@ -280,6 +423,11 @@ class NotificacionEnviada(models.Model):
     template = models.ForeignKey(NotificacionTemplate, on_delete=models.CASCADE)
     fecha_envio = models.DateTimeField(auto_now_add=True)
     exitoso = models.BooleanField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_envio'], name='notif_enviada_fecha_idx'),
+        ]
     
 class AuditoriaEvento(models.Model):
     TIPOS_EVENTO = [
@@ -296,6 +444,11 @@ class AuditoriaEvento(models.Model):
     fecha = models.DateTimeField(auto_now_add=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     datos_adicionales = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha'], name='auditoria_fecha_idx'),
+        ]
     
 class RecomendacionSistema(models.Model):
     TIPOS_RECOMENDACION = [
@@ -318,6 +471,25 @@ class RecomendacionSistema(models.Model):
     fecha_respuesta = models.DateTimeField(null=True, blank=True)
     respondido_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
+class RiesgoAbandono(models.Model):
+    """Puntaje de riesgo de abandono por cliente, calculado en lote desde Asistencia"""
+    cliente = models.OneToOneField(Cliente, on_delete=models.CASCADE, related_name='riesgo')
+    puntaje = models.FloatField(validators=[MinValueValidator(0), MaxValueValidator(1)])
+    en_riesgo = models.BooleanField(default=False)
+    asistencias_recientes = models.PositiveIntegerField(default=0, help_text="Últimas 4 semanas")
+    asistencias_previas = models.PositiveIntegerField(default=0, help_text="Semanas 5 a 8")
+    ultima_asistencia = models.DateTimeField(null=True, blank=True)
+    dias_sin_asistir = models.PositiveIntegerField(default=0)
+    fecha_calculo = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['en_riesgo', 'puntaje'], name='riesgo_en_riesgo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{escape(self.cliente.nombre)} - {self.puntaje:.2f}"
+
 class ComentarioProgreso(models.Model):
     registro_progreso = models.ForeignKey(RegistroProgreso, on_delete=models.CASCADE, related_name='comentarios')
     profesor = models.ForeignKey(Profesor, on_delete=models.CASCADE)
@@ -1,12 +1,44 @@
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import send_mail, send_mass_mail, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.db import transaction
 from django.utils.html import strip_tags
 from .models import NotificacionEnviada, NotificacionTemplate, Cliente
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Ejecutor compartido para correos diferidos (fuera del ciclo request/response)
+_ejecutor_correos = ThreadPoolExecutor(max_workers=2, thread_name_prefix='notificaciones')
+
+def _enviar_lote(mensajes):
+    """Enviar varios correos reutilizando una sola conexión SMTP"""
+    try:
+        enviados = send_mass_mail(mensajes, fail_silently=False)
+        logger.info(f"Correos diferidos enviados: {enviados}/{len(mensajes)}")
+    except Exception as e:
+        logger.error(f"Error enviando {len(mensajes)} correos diferidos: {e}")
+
+ASUNTO_CREDENCIALES = "Credenciales de acceso - Fitspace "
+
+def mensaje_credenciales(nombre, usuario, password):
+    return f"""
+Hola {nombre},
+
+Tus credenciales de acceso al sistema Fitspace son:
+
+Usuario (RUT): {usuario}
+Contraseña temporal: {password}
+
+Por favor, cambia tu contraseña en el primer inicio de sesión.
+
+URL de acceso: 
+
+Saludos,
+Equipo Fitspace
+        """
+
 class NotificationService:
     """Servicio para envío real de notificaciones"""
     
@@ -101,4 +133,15 @@ class NotificationService:
             
         except Exception as e:
             logger.error(f"Error enviando credenciales a {email}: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    @staticmethod
+    def enviar_diferido(mensajes):
+        """
+        Encolar correos (asunto, mensaje, remitente, [destinatarios]) para enviarse
+        en segundo plano una vez confirmada la transacción en curso.
+        """
+        mensajes = list(mensajes)
+        if not mensajes:
+            return
+        transaction.on_commit(lambda: _ejecutor_correos.submit(_enviar_lote, mensajes))
@@ -0,0 +1,221 @@
+"""
+Series de tiempo de RegistroProgreso: resumen semanal pre-agregado y consultas
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .models import Ejercicio, RegistroProgreso, ResumenSemanalProgreso
+import logging
+
+logger = logging.getLogger(__name__)
+
+CENTAVOS = Decimal('0.01')
+CAMPOS_REGISTRO = ('cliente_id', 'ejercicio_id', 'fecha', 'series_completadas', 'repeticiones', 'peso')
+
+
+def inicio_semana(fecha):
+    """Lunes (fecha local) de la semana a la que pertenece un datetime"""
+    dia = timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+    return dia - timedelta(days=dia.weekday())
+
+
+def _decimal(peso):
+    """Peso como Decimal: un float o int asignado antes de guardar no opera con Decimal"""
+    if peso is None or isinstance(peso, Decimal):
+        return peso
+    return Decimal(str(peso))
+
+
+def e1rm(peso, repeticiones):
+    """1RM estimado con la fórmula de Epley"""
+    if peso is None or not repeticiones:
+        return None
+    return (_decimal(peso) * (30 + repeticiones) / 30).quantize(CENTAVOS)
+
+
+def _acumular(filas, por_semana=True):
+    """Agrupa filas (CAMPOS_REGISTRO) por (cliente, ejercicio, semana) o solo por (cliente, ejercicio)"""
+    grupos = {}
+    for cliente_id, ejercicio_id, fecha, series, repeticiones, peso in filas:
+        peso = _decimal(peso)
+        clave = (cliente_id, ejercicio_id, inicio_semana(fecha)) if por_semana else (cliente_id, ejercicio_id)
+        grupo = grupos.get(clave)
+        if grupo is None:
+            grupo = grupos[clave] = {'registros': 0, 'series': 0, 'volumen': Decimal(0), 'peso_maximo': None, 'e1rm_maximo': None}
+        grupo['registros'] += 1
+        grupo['series'] += series or 0
+        if peso is not None and repeticiones:
+            grupo['volumen'] += (series or 0) * repeticiones * peso
+        if peso is not None and (grupo['peso_maximo'] is None or peso > grupo['peso_maximo']):
+            grupo['peso_maximo'] = peso
+        estimado = e1rm(peso, repeticiones)
+        if estimado is not None and (grupo['e1rm_maximo'] is None or estimado > grupo['e1rm_maximo']):
+            grupo['e1rm_maximo'] = estimado
+    return grupos
+
+
+def _maximo(campo, valor):
+    if valor is None:
+        return F(campo)
+    return Greatest(Coalesce(campo, Value(valor)), Value(valor))
+
+
+def actualizar_resumenes(registros):
+    """
+    Incorpora registros recién insertados al resumen semanal. Suma contadores
+    y volumen con expresiones F, de modo que inserciones concurrentes no se pisan.
+    """
+    filas = [tuple(getattr(r, campo) for campo in CAMPOS_REGISTRO) for r in registros]
+    for (cliente_id, ejercicio_id, semana), grupo in _acumular(filas).items():
+        filtro = ResumenSemanalProgreso.objects.filter(cliente_id=cliente_id, ejercicio_id=ejercicio_id, semana=semana)
+        incremento = {
+            'registros': F('registros') + grupo['registros'],
+            'series': F('series') + grupo['series'],
+            'volumen': F('volumen') + grupo['volumen'],
+            'peso_maximo': _maximo('peso_maximo', grupo['peso_maximo']),
+            'e1rm_maximo': _maximo('e1rm_maximo', grupo['e1rm_maximo']),
+        }
+        if filtro.update(**incremento):
+            continue
+        try:
+            with transaction.atomic():
+                ResumenSemanalProgreso.objects.create(
+                    cliente_id=cliente_id, ejercicio_id=ejercicio_id, semana=semana, **grupo
+                )
+        except IntegrityError:
+            # Otra transacción creó la fila entre el update y el insert
+            filtro.update(**incremento)
+
+
+def totales_por_ejercicio(registros):
+    """Registros, series, volumen, peso máximo y e1RM de un conjunto de registros, por ejercicio"""
+    filas = [tuple(getattr(r, campo) for campo in CAMPOS_REGISTRO) for r in registros]
+    return {ejercicio_id: grupo for (_, ejercicio_id), grupo in _acumular(filas, por_semana=False).items()}
+
+
+def recalcular_resumen(cliente_id, ejercicio_id, semana):
+    """Recalcula desde los registros una semana puntual (tras editar o eliminar un registro)"""
+    desde = timezone.make_aware(datetime.combine(semana, time.min))
+    filas = RegistroProgreso.objects.filter(
+        cliente_id=cliente_id, ejercicio_id=ejercicio_id,
+        fecha__gte=desde, fecha__lt=desde + timedelta(days=7),
+    ).values_list(*CAMPOS_REGISTRO)
+    grupo = _acumular(filas).get((cliente_id, ejercicio_id, semana))
+    if grupo is None:
+        ResumenSemanalProgreso.objects.filter(cliente_id=cliente_id, ejercicio_id=ejercicio_id, semana=semana).delete()
+    else:
+        ResumenSemanalProgreso.objects.update_or_create(
+            cliente_id=cliente_id, ejercicio_id=ejercicio_id, semana=semana, defaults=grupo
+        )
+
+
+def reconstruir_resumenes(clientes=None, tamano_lote=2000):
+    """
+    Regenera el resumen semanal recorriendo RegistroProgreso en orden del índice
+    (cliente, ejercicio, fecha). Retorna la cantidad de filas de resumen creadas.
+    """
+    registros = RegistroProgreso.objects.all()
+    resumenes = ResumenSemanalProgreso.objects.all()
+    if clientes is not None:
+        registros = registros.filter(cliente_id__in=clientes)
+        resumenes = resumenes.filter(cliente_id__in=clientes)
+
+    filas = registros.order_by('cliente_id', 'ejercicio_id', 'fecha').values_list(*CAMPOS_REGISTRO)
+    creados = 0
+    with transaction.atomic():
+        resumenes.delete()
+        pendientes, lote = [], []
+        for fila in filas.iterator(chunk_size=tamano_lote):
+            # Se acumula por (cliente, ejercicio) para acotar la memoria
+            if pendientes and fila[:2] != pendientes[-1][:2]:
+                lote.extend(_resumenes(pendientes))
+                pendientes = []
+                if len(lote) >= tamano_lote:
+                    ResumenSemanalProgreso.objects.bulk_create(lote)
+                    creados += len(lote)
+                    lote = []
+            pendientes.append(fila)
+        lote.extend(_resumenes(pendientes))
+        ResumenSemanalProgreso.objects.bulk_create(lote, batch_size=tamano_lote)
+        creados += len(lote)
+
+    logger.info(f"Resumen semanal de progreso reconstruido: {creados} semanas")
+    return creados
+
+
+def _resumenes(filas):
+    return [
+        ResumenSemanalProgreso(cliente_id=cliente_id, ejercicio_id=ejercicio_id, semana=semana, **grupo)
+        for (cliente_id, ejercicio_id, semana), grupo in _acumular(filas).items()
+    ]
+
+
+def _numero(valor):
+    return float(valor) if valor is not None else None
+
+
+def serie_progreso(cliente_id, desde=None, hasta=None, ejercicios=None):
+    """
+    Historial de un cliente en todos sus ejercicios: peso máximo diario (desde
+    RegistroProgreso) y volumen / e1RM semanal (desde el resumen). Dos consultas
+    sobre índices que comienzan por cliente más una para los nombres.
+    """
+    hasta = hasta or timezone.localdate()
+    desde = desde or hasta - timedelta(days=365)
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+
+    registros = RegistroProgreso.objects.filter(cliente_id=cliente_id, fecha__gte=inicio, fecha__lt=fin, peso__isnull=False)
+    semanas = ResumenSemanalProgreso.objects.filter(
+        cliente_id=cliente_id, semana__gte=desde - timedelta(days=desde.weekday()), semana__lte=hasta
+    )
+    if ejercicios:
+        registros = registros.filter(ejercicio_id__in=ejercicios)
+        semanas = semanas.filter(ejercicio_id__in=ejercicios)
+
+    diario = defaultdict(dict)
+    for ejercicio_id, fecha, peso in registros.order_by('ejercicio_id', 'fecha').values_list('ejercicio_id', 'fecha', 'peso'):
+        dia = timezone.localdate(fecha)
+        maximo = diario[ejercicio_id].get(dia)
+        if maximo is None or peso > maximo:
+            diario[ejercicio_id][dia] = peso
+
+    semanal = defaultdict(list)
+    for fila in semanas.order_by('ejercicio_id', 'semana').values(
+        'ejercicio_id', 'semana', 'registros', 'series', 'volumen', 'peso_maximo', 'e1rm_maximo'
+    ):
+        semanal[fila.pop('ejercicio_id')].append(fila)
+
+    ids = sorted(set(diario) | set(semanal))
+    nombres = dict(Ejercicio.objects.filter(id__in=ids).values_list('id', 'nombre'))
+    return {
+        'cliente_id': cliente_id,
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'ejercicios': [
+            {
+                'ejercicio_id': ejercicio_id,
+                'nombre': nombres.get(ejercicio_id, ''),
+                'diario': [
+                    {'fecha': dia.isoformat(), 'peso_maximo': _numero(peso)}
+                    for dia, peso in diario[ejercicio_id].items()
+                ],
+                'semanal': [
+                    {
+                        'semana': fila['semana'].isoformat(),
+                        'registros': fila['registros'],
+                        'series': fila['series'],
+                        'volumen': _numero(fila['volumen']),
+                        'peso_maximo': _numero(fila['peso_maximo']),
+                        'e1rm': _numero(fila['e1rm_maximo']),
+                    }
+                    for fila in semanal[ejercicio_id]
+                ],
+            }
+            for ejercicio_id in ids
+        ],
+    }
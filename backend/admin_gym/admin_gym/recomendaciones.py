@@ -0,0 +1,279 @@
+"""
+Motor de recomendaciones de entrenamiento a partir de RegistroProgreso
+
+Carga el historial reciente de todos los clientes en arreglos columnares y
+calcula por (cliente, ejercicio) la tendencia del 1RM estimado, y por cliente
+la carga de volumen y los indicadores de fatiga (RPE, sueño, energía), todo
+con operaciones vectorizadas de NumPy agrupadas con bincount/ufunc.at.
+"""
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import ConfiguracionSistema, Ejercicio, RecomendacionSistema, RegistroProgreso
+import logging
+
+logger = logging.getLogger(__name__)
+
+CLAVE_ULTIMA_EJECUCION = 'recomendaciones_ultima_ejecucion'
+SEMANAS_HISTORIA = 12
+REGISTROS_TENDENCIA = 8            # Últimos registros por ejercicio para la tendencia
+MIN_REGISTROS_ESTANCAMIENTO = 6
+MIN_DIAS_ESTANCAMIENTO = 21
+PENDIENTE_ESTANCAMIENTO = 0.005    # Variación semanal relativa del 1RM considerada plana
+PROGRESION_MAXIMA = 0.10           # Alza del mejor 1RM en 2 semanas considerada excesiva
+RPE_SOBRECARGA = 9
+AUMENTO_VOLUMEN_SOBRECARGA = 1.5
+
+
+def _ultima_ejecucion():
+    valor = ConfiguracionSistema.objects.filter(clave=CLAVE_ULTIMA_EJECUCION).values_list('valor', flat=True).first()
+    if not valor:
+        return None
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        return None
+
+
+def cargar_registros(np, desde, clientes=None):
+    """Historial desde `desde` en arreglos columnares, ordenado por (cliente, ejercicio, fecha)"""
+    registros = RegistroProgreso.objects.filter(fecha__gte=desde)
+    if clientes is not None:
+        registros = registros.filter(cliente_id__in=clientes)
+    filas = list(registros.values_list(
+        'cliente_id', 'ejercicio_id', 'fecha', 'series_completadas', 'repeticiones', 'peso',
+        'rpe', 'calidad_sueno', 'nivel_energia',
+    ).iterator(chunk_size=5000))
+
+    def columna(i, dtype=np.float64):
+        return np.array([np.nan if fila[i] is None else float(fila[i]) for fila in filas], dtype=dtype)
+
+    origen = desde.timestamp()
+    datos = {
+        'cliente': np.array([fila[0] for fila in filas], dtype=np.int64),
+        'ejercicio': np.array([fila[1] for fila in filas], dtype=np.int64),
+        'dia': np.array([(fila[2].timestamp() - origen) / 86400 for fila in filas], dtype=np.float64),
+        'series': columna(3),
+        'repeticiones': columna(4),
+        'peso': columna(5),
+        'rpe': columna(6),
+        'sueno': columna(7),
+        'energia': columna(8),
+    }
+    orden = np.lexsort((datos['dia'], datos['ejercicio'], datos['cliente']))
+    return {clave: valor[orden] for clave, valor in datos.items()}
+
+
+def _grupos(np, *claves):
+    """Identificador de grupo consecutivo para arreglos ya ordenados por las claves"""
+    n = len(claves[0])
+    inicio = np.ones(n, dtype=bool)
+    if n:
+        inicio[1:] = np.logical_or.reduce([clave[1:] != clave[:-1] for clave in claves])
+    grupo = np.cumsum(inicio) - 1
+    return grupo, np.nonzero(inicio)[0]
+
+
+def indicadores_ejercicio(np, datos, hoy):
+    """
+    Por (cliente, ejercicio): pendiente semanal relativa del 1RM estimado (Epley)
+    sobre los últimos registros, y razón entre el mejor 1RM de las últimas 2
+    semanas y el de las 2 anteriores.
+    """
+    grupo, inicios = _grupos(np, datos['cliente'], datos['ejercicio'])
+    n_grupos = len(inicios)
+    e1rm = datos['peso'] * (1 + datos['repeticiones'] / 30)
+    valido = ~np.isnan(e1rm)
+
+    # Posición desde el final de cada grupo para tomar los últimos N registros
+    finales = np.append(inicios[1:], len(grupo)) - 1
+    desde_final = finales[grupo] - np.arange(len(grupo))
+    ventana = valido & (desde_final < REGISTROS_TENDENCIA)
+
+    x = datos['dia'][ventana]
+    y = e1rm[ventana]
+    g = grupo[ventana]
+    n = np.bincount(g, minlength=n_grupos).astype(np.float64)
+    sx = np.bincount(g, weights=x, minlength=n_grupos)
+    sy = np.bincount(g, weights=y, minlength=n_grupos)
+    sxy = np.bincount(g, weights=x * y, minlength=n_grupos)
+    sxx = np.bincount(g, weights=x * x, minlength=n_grupos)
+    dia_min = np.full(n_grupos, np.inf)
+    dia_max = np.full(n_grupos, -np.inf)
+    np.minimum.at(dia_min, g, x)
+    np.maximum.at(dia_max, g, x)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pendiente = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        media = sy / n
+        pendiente_relativa = pendiente * 7 / media
+
+    mejor_reciente = np.zeros(n_grupos)
+    mejor_previo = np.zeros(n_grupos)
+    reciente = valido & (datos['dia'] >= hoy - 14)
+    previo = valido & (datos['dia'] >= hoy - 28) & (datos['dia'] < hoy - 14)
+    np.maximum.at(mejor_reciente, grupo[reciente], e1rm[reciente])
+    np.maximum.at(mejor_previo, grupo[previo], e1rm[previo])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        progresion = np.where(mejor_previo > 0, mejor_reciente / mejor_previo - 1, 0.0)
+
+    estancado = (
+        (n >= MIN_REGISTROS_ESTANCAMIENTO)
+        & ((dia_max - dia_min) >= MIN_DIAS_ESTANCAMIENTO)
+        & (np.abs(pendiente_relativa) < PENDIENTE_ESTANCAMIENTO)
+    )
+    excesivo = (mejor_reciente > 0) & (progresion > PROGRESION_MAXIMA)
+
+    return {
+        'cliente': datos['cliente'][inicios],
+        'ejercicio': datos['ejercicio'][inicios],
+        'estancado': estancado,
+        'excesivo': excesivo,
+        'progresion': progresion,
+    }
+
+
+def indicadores_cliente(np, datos, hoy):
+    """Por cliente: RPE, sueño y energía medios de 2 semanas y alza de la carga de volumen semanal"""
+    clientes, inverso = np.unique(datos['cliente'], return_inverse=True)
+    n_clientes = len(clientes)
+    reciente = datos['dia'] >= hoy - 14
+
+    def media(valores):
+        usar = reciente & ~np.isnan(valores)
+        suma = np.bincount(inverso[usar], weights=valores[usar], minlength=n_clientes)
+        cuenta = np.bincount(inverso[usar], minlength=n_clientes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(cuenta > 0, suma / np.maximum(cuenta, 1), np.nan), cuenta
+
+    rpe, registros_rpe = media(datos['rpe'])
+    sueno, _ = media(datos['sueno'])
+    energia, _ = media(datos['energia'])
+
+    volumen = np.nan_to_num(datos['series'] * datos['repeticiones'] * datos['peso'])
+    ultima_semana = datos['dia'] >= hoy - 7
+    tres_previas = (datos['dia'] >= hoy - 28) & ~ultima_semana
+    volumen_semana = np.bincount(inverso[ultima_semana], weights=volumen[ultima_semana], minlength=n_clientes)
+    volumen_previo = np.bincount(inverso[tres_previas], weights=volumen[tres_previas], minlength=n_clientes) / 3
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aumento_volumen = np.where(volumen_previo > 0, volumen_semana / volumen_previo, 0.0)
+
+    fatiga = (energia <= 3) & (sueno <= 4)
+    sobrecarga = (
+        ((registros_rpe >= 3) & (rpe >= RPE_SOBRECARGA))
+        | fatiga
+        | ((aumento_volumen >= AUMENTO_VOLUMEN_SOBRECARGA) & (rpe >= RPE_SOBRECARGA - 1))
+    )
+    return {
+        'cliente': clientes,
+        'sobrecarga': sobrecarga,
+        'rpe': rpe,
+        'aumento_volumen': aumento_volumen,
+    }
+
+
+def _nueva(cliente_id, tipo, descripcion, recomendacion):
+    return RecomendacionSistema(cliente_id=cliente_id, tipo=tipo, descripcion=descripcion, recomendacion=recomendacion)
+
+
+def generar_recomendaciones(completo=False, tamano_lote=1000):
+    """
+    Genera recomendaciones pendientes para los clientes con registros nuevos
+    (o para todos con `completo`), sin duplicar una recomendación pendiente
+    del mismo tipo para el mismo cliente. Retorna un resumen por tipo.
+    """
+    import numpy as np
+
+    ahora = timezone.now()
+    desde = ahora - timedelta(weeks=SEMANAS_HISTORIA)
+    ultima = None if completo else _ultima_ejecucion()
+
+    clientes = None
+    if ultima is not None:
+        clientes = RegistroProgreso.objects.filter(fecha__gt=ultima).values('cliente_id')
+
+    datos = cargar_registros(np, desde, clientes)
+    hoy = (ahora - desde).total_seconds() / 86400
+
+    por_ejercicio = indicadores_ejercicio(np, datos, hoy)
+    por_cliente = indicadores_cliente(np, datos, hoy)
+
+    ejercicios_relevantes = set(por_ejercicio['ejercicio'][por_ejercicio['estancado'] | por_ejercicio['excesivo']].tolist())
+    nombres = dict(Ejercicio.objects.filter(id__in=ejercicios_relevantes).values_list('id', 'nombre'))
+
+    candidatas = {}
+    estancados = {}
+    for cliente_id, ejercicio_id in zip(
+        por_ejercicio['cliente'][por_ejercicio['estancado']].tolist(),
+        por_ejercicio['ejercicio'][por_ejercicio['estancado']].tolist(),
+    ):
+        estancados.setdefault(cliente_id, []).append(nombres.get(ejercicio_id, str(ejercicio_id)))
+    clientes_unicos, cuentas = np.unique(por_ejercicio['cliente'], return_counts=True)
+    total_ejercicios = dict(zip(clientes_unicos.tolist(), cuentas.tolist()))
+
+    for cliente_id, lista in estancados.items():
+        candidatas[(cliente_id, 'estancamiento')] = _nueva(
+            cliente_id, 'estancamiento',
+            f"Sin progreso del 1RM estimado en las últimas {MIN_DIAS_ESTANCAMIENTO // 7}+ semanas: {', '.join(lista)}.",
+            'Variar el estímulo: cambiar rango de repeticiones, aplicar una semana de descarga o ajustar la progresión de carga.',
+        )
+        if len(lista) >= 2 and len(lista) * 2 >= total_ejercicios.get(cliente_id, 0):
+            candidatas[(cliente_id, 'cambio_rutina')] = _nueva(
+                cliente_id, 'cambio_rutina',
+                f"Estancamiento en {len(lista)} de {total_ejercicios[cliente_id]} ejercicios registrados.",
+                'Evaluar un cambio de rutina o de bloque de entrenamiento.',
+            )
+
+    excesivos = por_ejercicio['excesivo']
+    for cliente_id, ejercicio_id, progresion in zip(
+        por_ejercicio['cliente'][excesivos].tolist(),
+        por_ejercicio['ejercicio'][excesivos].tolist(),
+        por_ejercicio['progresion'][excesivos].tolist(),
+    ):
+        if (cliente_id, 'progresion_excesiva') in candidatas:
+            continue
+        candidatas[(cliente_id, 'progresion_excesiva')] = _nueva(
+            cliente_id, 'progresion_excesiva',
+            f"El 1RM estimado en {nombres.get(ejercicio_id, ejercicio_id)} subió {progresion * 100:.0f}% en 2 semanas.",
+            'Moderar los incrementos de carga y revisar la técnica para reducir el riesgo de lesión.',
+        )
+
+    sobrecarga = por_cliente['sobrecarga']
+    for cliente_id, rpe, aumento in zip(
+        por_cliente['cliente'][sobrecarga].tolist(),
+        por_cliente['rpe'][sobrecarga].tolist(),
+        por_cliente['aumento_volumen'][sobrecarga].tolist(),
+    ):
+        detalle = f"RPE medio {rpe:.1f}" if rpe == rpe else 'Baja energía y mala calidad de sueño'
+        candidatas[(cliente_id, 'sobrecarga')] = _nueva(
+            cliente_id, 'sobrecarga',
+            f"{detalle} en las últimas 2 semanas; volumen semanal x{aumento:.1f} respecto del promedio previo.",
+            'Programar una descarga: reducir volumen e intensidad y priorizar la recuperación.',
+        )
+
+    # Deduplicar contra recomendaciones pendientes en una sola consulta
+    pendientes = set(
+        RecomendacionSistema.objects.filter(
+            estado='pendiente', cliente_id__in={cliente_id for cliente_id, _ in candidatas}
+        ).values_list('cliente_id', 'tipo')
+    ) if candidatas else set()
+    nuevas = [recomendacion for clave, recomendacion in candidatas.items() if clave not in pendientes]
+
+    with transaction.atomic():
+        RecomendacionSistema.objects.bulk_create(nuevas, batch_size=tamano_lote)
+        ConfiguracionSistema.objects.update_or_create(
+            clave=CLAVE_ULTIMA_EJECUCION,
+            defaults={'valor': ahora.isoformat(), 'descripcion': 'Última ejecución del motor de recomendaciones'},
+        )
+
+    resumen = {tipo: 0 for tipo, _ in RecomendacionSistema.TIPOS_RECOMENDACION}
+    for recomendacion in nuevas:
+        resumen[recomendacion.tipo] += 1
+    logger.info(f"Recomendaciones generadas: {len(nuevas)} ({len(candidatas) - len(nuevas)} ya pendientes)")
+    return {
+        'registros': len(datos['cliente']),
+        'creadas': resumen,
+        'omitidas': len(candidatas) - len(nuevas),
+        'incremental': ultima is not None,
+    }
@@ -0,0 +1,178 @@
+"""
+Registro de escaneos en AccesoQR con inserciones en lote y retención compacta.
+
+El lector solo agrega el acceso a un buffer en memoria (sin tocar la base); un
+hilo de fondo lo vacía con bulk_create cada INTERVALO_VACIADO segundos o al
+llegar a TAMANO_VACIADO entradas, y al terminar el proceso. Si la base no
+responde, lo no escrito vuelve al frente del buffer y se reintenta en el
+siguiente vaciado; si el lote falla por sus datos, se divide en mitades hasta
+aislar las filas que fallan por sí solas, que se descartan con un error en el
+log. Una caída del proceso pierde a lo sumo los accesos aún en el buffer.
+
+Pasada la retención, el detalle se resume por cliente y mes en
+ResumenMensualAcceso y se elimina.
+"""
+from collections import deque
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+from .models import AccesoQR, ResumenMensualAcceso
+import atexit
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+TAMANO_VACIADO = 200
+INTERVALO_VACIADO = 2   # segundos
+MAX_BUFFER = 50000      # Si la base no responde, se descartan los más antiguos
+RETENCION_DIAS = 90
+
+_buffer = deque(maxlen=MAX_BUFFER)
+_pendiente = threading.Event()
+_candado = threading.Lock()
+_hilo = None
+
+
+def registrar_acceso(cliente_id, codigo, exitoso, motivo='', ip=None):
+    """Encola un escaneo; no bloquea ni consulta la base"""
+    _buffer.append(AccesoQR(
+        cliente_id=cliente_id,
+        qr_code=(codigo or '')[:100],
+        fecha_acceso=timezone.now(),
+        exitoso=exitoso,
+        motivo_fallo='' if exitoso else (motivo or '')[:200],
+        ip_address=ip,
+    ))
+    _iniciar_hilo()
+    if len(_buffer) >= TAMANO_VACIADO:
+        _pendiente.set()
+
+
+def _iniciar_hilo():
+    global _hilo
+    if _hilo is not None:
+        return
+    with _candado:
+        if _hilo is None:
+            _hilo = threading.Thread(target=_vaciar_periodicamente, name='registro-accesos', daemon=True)
+            _hilo.start()
+            atexit.register(vaciar)
+
+
+def _vaciar_periodicamente():
+    while True:
+        _pendiente.wait(INTERVALO_VACIADO)
+        _pendiente.clear()
+        vaciar()
+        # El hilo no debe retener una conexión abierta entre vaciados
+        connections.close_all()
+
+
+def vaciar():
+    """Inserta los accesos encolados; retorna cuántos se escribieron"""
+    accesos = []
+    while _buffer and len(accesos) < MAX_BUFFER:
+        try:
+            accesos.append(_buffer.popleft())
+        except IndexError:
+            break
+    escritos = 0
+    pendientes = deque([accesos] if accesos else [])
+    while pendientes:
+        lote = pendientes.popleft()
+        try:
+            # Todo o nada por lote: uno parcialmente escrito se duplicaría al reintentarlo
+            with transaction.atomic():
+                AccesoQR.objects.bulk_create(lote, batch_size=1000)
+        except (OperationalError, InterfaceError) as e:
+            # La base no responde: se reintenta todo lo no escrito en el siguiente vaciado
+            restantes = lote + [acceso for resto in pendientes for acceso in resto]
+            _reencolar(restantes)
+            logger.error(f"No se pudieron registrar {len(restantes)} accesos QR, se reintentarán: {e}")
+            break
+        except Exception as e:
+            _sin_guardar(lote)
+            if len(lote) == 1:
+                # p.ej. el cliente se eliminó entre el escaneo y el vaciado
+                acceso = lote[0]
+                logger.error(
+                    f"Acceso QR descartado (cliente {acceso.cliente_id}, código {acceso.qr_code!r}, "
+                    f"{acceso.fecha_acceso:%Y-%m-%d %H:%M:%S}): {e}"
+                )
+                continue
+            mitad = len(lote) // 2
+            pendientes.extendleft([lote[mitad:], lote[:mitad]])
+        else:
+            escritos += len(lote)
+    return escritos
+
+
+def _sin_guardar(accesos):
+    """bulk_create asigna la clave aun si la transacción se revierte"""
+    for acceso in accesos:
+        acceso.pk = None
+        acceso._state.adding = True
+
+
+def _reencolar(accesos):
+    """Devuelve el lote al frente del buffer; si no cabe, se descartan los más antiguos"""
+    _sin_guardar(accesos)
+    espacio = MAX_BUFFER - len(_buffer)
+    if espacio < len(accesos):
+        logger.warning(f"Buffer de accesos QR lleno: se descartan {len(accesos) - espacio} accesos")
+        accesos = accesos[len(accesos) - espacio:] if espacio > 0 else []
+    _buffer.extendleft(reversed(accesos))
+
+
+def _mes(fecha):
+    return timezone.localdate(fecha).replace(day=1)
+
+
+def _acumular_resumen(cliente_id, mes, grupo):
+    filtro = ResumenMensualAcceso.objects.filter(cliente_id=cliente_id, mes=mes)
+    incremento = {
+        'exitosos': F('exitosos') + grupo['exitosos'],
+        'fallidos': F('fallidos') + grupo['fallidos'],
+        'primer_acceso': Least('primer_acceso', Value(grupo['primer_acceso'])),
+        'ultimo_acceso': Greatest('ultimo_acceso', Value(grupo['ultimo_acceso'])),
+    }
+    if not filtro.update(**incremento):
+        ResumenMensualAcceso.objects.create(cliente_id=cliente_id, mes=mes, **grupo)
+
+
+def archivar_accesos(dias=None, tamano_lote=5000):
+    """
+    Resume por cliente y mes los accesos más antiguos que la retención y los
+    elimina, por lotes de tamano_lote en su propia transacción. Cada fila se
+    cuenta una sola vez porque se elimina en la misma transacción en que se resume.
+    """
+    dias = dias if dias is not None else settings.GYM_CONFIG.get('RETENCION_ACCESOS_DIAS', RETENCION_DIAS)
+    limite = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=dias), time.min))
+    archivados = 0
+    while True:
+        with transaction.atomic():
+            filas = list(
+                AccesoQR.objects.filter(fecha_acceso__lt=limite)
+                .order_by('fecha_acceso')
+                .values_list('id', 'cliente_id', 'fecha_acceso', 'exitoso')[:tamano_lote]
+            )
+            if not filas:
+                break
+            grupos = {}
+            for _, cliente_id, fecha, exitoso in filas:
+                grupo = grupos.setdefault((cliente_id, _mes(fecha)), {
+                    'exitosos': 0, 'fallidos': 0, 'primer_acceso': fecha, 'ultimo_acceso': fecha,
+                })
+                grupo['exitosos' if exitoso else 'fallidos'] += 1
+                grupo['primer_acceso'] = min(grupo['primer_acceso'], fecha)
+                grupo['ultimo_acceso'] = max(grupo['ultimo_acceso'], fecha)
+            for (cliente_id, mes), grupo in grupos.items():
+                _acumular_resumen(cliente_id, mes, grupo)
+            AccesoQR.objects.filter(id__in=[fila[0] for fila in filas]).delete()
+        archivados += len(filas)
+    logger.info(f"Accesos QR archivados: {archivados} (retención {dias} días)")
+    return archivados
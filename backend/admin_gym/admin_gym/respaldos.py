@@ -0,0 +1,545 @@
+"""
+Respaldos de la base de datos en streaming.
+
+El volcado (mysqldump, o SQL generado desde SQLite) pasa por una tubería
+directo al compresor y de ahí al archivo final, calculando el SHA-256 sobre la
+marcha: no hay archivo intermedio sin comprimir ni una segunda pasada. Se usa
+zstd o pigz con todos los núcleos si están instalados; si no, gzip en proceso.
+
+En modo diferencial las tablas grandes que crecen por inserción
+(TABLAS_INCREMENTALES) se vuelcan solo desde la marca del último respaldo
+completo (con un margen de solapamiento, deduplicado por clave primaria al
+restaurar con INSERT IGNORE); el resto de las tablas, pequeñas, se vuelca
+completo. Como esas tablas también pierden filas (archivado, cascadas al
+eliminar clientes), el diferencial lleva además los huecos de sus claves
+primarias en la misma instantánea y los borra al restaurar, y anula las
+claves foráneas SET_NULL que apuntan a filas eliminadas. Cada respaldo deja un
+manifiesto JSON con su checksum, su respaldo completo base y las ventanas
+volcadas; para restaurar un diferencial basta aplicar su base y luego él.
+El manifiesto incluye además filas y checksum de cada tabla, calculados en la
+misma instantánea del volcado, para verificar las restauraciones.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, models
+from django.utils import timezone
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = 'gym_backup_'
+TAMANO_BLOQUE = 1024 * 1024
+TIMEOUT_VOLCADO = 3600  # segundos por invocación de mysqldump
+# Filas insertadas tarde (transacciones largas, accesos QR encolados) caen igual en la ventana siguiente
+MARGEN_INCREMENTAL = timedelta(minutes=10)
+# Tablas que crecen por inserción y su columna de fecha de creación
+TABLAS_INCREMENTALES = {
+    'Asistencia': 'fecha',
+    'AuditoriaEvento': 'fecha',
+    'AccesoQR': 'fecha_acceso',
+    'NotificacionEnviada': 'fecha_envio',
+}
+RANGOS_POR_SENTENCIA = 200  # Huecos de claves por DELETE/UPDATE en el diferencial
+# Compresores externos multihilo, en orden de preferencia
+COMPRESORES = {
+    'zstd': (['zstd', '-q', '-c', '-3', '-T0'], '.zst'),
+    'pigz': (['pigz', '-c', '-6'], '.gz'),
+}
+
+
+class ErrorRespaldo(Exception):
+    pass
+
+
+def elegir_compresor(preferido='auto'):
+    """zstd, pigz o gzip (en proceso, siempre disponible)"""
+    if preferido == 'gzip':
+        return 'gzip'
+    candidatos = list(COMPRESORES) if preferido == 'auto' else [preferido]
+    for nombre in candidatos:
+        if shutil.which(COMPRESORES[nombre][0][0]):
+            return nombre
+    if preferido != 'auto':
+        raise ErrorRespaldo(f"Compresor no encontrado: {preferido}")
+    return 'gzip'
+
+
+def extension(compresor):
+    return COMPRESORES[compresor][1] if compresor in COMPRESORES else '.gz'
+
+
+class FlujoComprimido:
+    """
+    Destino de un volcado: lo que se escribe en `entrada` (o el stdout de un
+    subproceso apuntado a ella) se comprime y se guarda en `ruta`, calculando
+    SHA-256 y tamaño del archivo comprimido. El archivo se escribe como .part y
+    solo se renombra si todo terminó bien.
+    """
+
+    def __init__(self, ruta, compresor='gzip'):
+        self.ruta = Path(ruta)
+        self.compresor = compresor
+        self.sha256 = None
+        self.bytes = 0
+        self.bytes_sin_comprimir = 0  # None si el volcado fue directo de un subproceso al compresor externo
+        self._error = None
+
+    def __enter__(self):
+        self._parcial = self.ruta.with_name(self.ruta.name + '.part')
+        self._archivo = open(self._parcial, 'wb')
+        self._hash = hashlib.sha256()
+        self._sin_medir = False
+        if self.compresor in COMPRESORES:
+            self._proceso = subprocess.Popen(
+                COMPRESORES[self.compresor][0], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            )
+            self.entrada = self._proceso.stdin
+            salida, compresion = self._proceso.stdout.fileno(), None
+        else:
+            self._proceso = None
+            lectura, escritura = os.pipe()
+            self.entrada = os.fdopen(escritura, 'wb', buffering=TAMANO_BLOQUE)
+            salida, compresion = lectura, zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: formato gzip
+        self._hilo = threading.Thread(target=self._copiar, args=(salida, compresion), daemon=True)
+        self._hilo.start()
+        return self
+
+    def _copiar(self, salida, compresion):
+        try:
+            while bloque := os.read(salida, TAMANO_BLOQUE):
+                if compresion is not None:
+                    self.bytes_sin_comprimir += len(bloque)
+                    bloque = compresion.compress(bloque)
+                self._guardar(bloque)
+            if compresion is not None:
+                self._guardar(compresion.flush())
+                os.close(salida)
+        except Exception as e:
+            self._error = e
+
+    def _guardar(self, bloque):
+        self._hash.update(bloque)
+        self._archivo.write(bloque)
+        self.bytes += len(bloque)
+
+    def escribir(self, texto):
+        datos = texto.encode('utf-8')
+        if self._proceso is not None:
+            self.bytes_sin_comprimir += len(datos)
+        self.entrada.write(datos)
+
+    def destino_subproceso(self):
+        """Descriptor para el stdout de un subproceso (vacía antes lo escrito desde Python)"""
+        self.entrada.flush()
+        if self._proceso is not None:
+            # Los datos van del subproceso al compresor sin pasar por Python
+            self._sin_medir = True
+        return self.entrada
+
+    def __exit__(self, tipo, error, traza):
+        try:
+            self.entrada.close()
+        except OSError as e:
+            self._error = self._error or e
+        if self._proceso is not None and self._proceso.wait() != 0:
+            self._error = self._error or ErrorRespaldo(f"{self.compresor} terminó con código {self._proceso.returncode}")
+        self._hilo.join()
+        self._archivo.close()
+        if self._proceso is not None:
+            self._proceso.stdout.close()
+        if self._sin_medir:
+            self.bytes_sin_comprimir = None
+        if tipo is not None or self._error is not None:
+            self._parcial.unlink(missing_ok=True)
+            if tipo is None:
+                raise ErrorRespaldo(f"Error comprimiendo el respaldo: {self._error}")
+            return False
+        self._parcial.replace(self.ruta)
+        self.sha256 = self._hash.hexdigest()
+        return False
+
+
+def tablas_incrementales():
+    """{tabla: columna de fecha} de las tablas que se vuelcan por ventana en un diferencial"""
+    tablas = {}
+    for nombre, campo in TABLAS_INCREMENTALES.items():
+        modelo = apps.get_model('admin_gym', nombre)
+        tablas[modelo._meta.db_table] = modelo._meta.get_field(campo).column
+    return tablas
+
+
+def _claves_incrementales():
+    """{tabla: (clave primaria, [(columna SET_NULL, tabla referida, su clave primaria)])}"""
+    claves = {}
+    for nombre in TABLAS_INCREMENTALES:
+        modelo = apps.get_model('admin_gym', nombre)
+        anulables = [
+            (campo.column, campo.related_model._meta.db_table, campo.related_model._meta.pk.column)
+            for campo in modelo._meta.concrete_fields
+            if campo.many_to_one and campo.remote_field.on_delete is models.SET_NULL
+        ]
+        claves[modelo._meta.db_table] = (modelo._meta.pk.column, anulables)
+    return claves
+
+
+def _huecos(cursor, motor, tabla, pk):
+    """
+    Rangos [desde, hasta] de claves ausentes bajo la mayor, y la mayor (0 si
+    está vacía). Se calculan en el servidor: solo viajan los bordes de cada hueco.
+    """
+    q = '`' if motor == 'mysql' else '"'
+    t, c = f'{q}{tabla}{q}', f'{q}{pk}{q}'
+    cursor.execute(f'SELECT MIN({c}), MAX({c}) FROM {t}')
+    minimo, maximo = cursor.fetchone()
+    if minimo is None:
+        return [], 0
+    cursor.execute(
+        f'SELECT a.{c} FROM {t} a WHERE a.{c} < {int(maximo)} '
+        f'AND NOT EXISTS (SELECT 1 FROM {t} b WHERE b.{c} = a.{c} + 1) ORDER BY a.{c}'
+    )
+    antes = [fila[0] for fila in cursor.fetchall()]
+    cursor.execute(
+        f'SELECT a.{c} FROM {t} a WHERE a.{c} > {int(minimo)} '
+        f'AND NOT EXISTS (SELECT 1 FROM {t} b WHERE b.{c} = a.{c} - 1) ORDER BY a.{c}'
+    )
+    despues = [fila[0] for fila in cursor.fetchall()]
+    huecos = [(1, int(minimo) - 1)] if minimo > 1 else []
+    huecos += [(int(a) + 1, int(b) - 1) for a, b in zip(antes, despues)]
+    return huecos, int(maximo)
+
+
+def _condiciones(columna, huecos, tope):
+    """Condiciones que cubren los huecos y todo lo mayor que el tope, en grupos por sentencia"""
+    condiciones = [f'{columna} BETWEEN {desde} AND {hasta}' for desde, hasta in huecos] + [f'{columna} > {tope}']
+    for i in range(0, len(condiciones), RANGOS_POR_SENTENCIA):
+        yield ' OR '.join(condiciones[i:i + RANGOS_POR_SENTENCIA])
+
+
+def _sql_bajas(cursor, motor, ventanas):
+    """
+    Sentencias que llevan las tablas con ventana al estado de la instantánea:
+    borran las filas cuya clave ya no existe (el respaldo base o el margen
+    pueden traerlas) y anulan las referencias SET_NULL a filas eliminadas.
+    """
+    q = '`' if motor == 'mysql' else '"'
+    huecos = {}
+
+    def huecos_de(tabla, pk):
+        if tabla not in huecos:
+            huecos[tabla] = _huecos(cursor, motor, tabla, pk)
+        return huecos[tabla]
+
+    for tabla, (pk, anulables) in _claves_incrementales().items():
+        if tabla not in ventanas:
+            continue
+        if motor == 'mysql':
+            # Sección propia: la restauración selectiva la asigna a su tabla
+            yield f'\n--\n-- Bajas for table `{tabla}`\n--\n\n'
+        for condicion in _condiciones(f'{q}{pk}{q}', *huecos_de(tabla, pk)):
+            yield f'DELETE FROM {q}{tabla}{q} WHERE {condicion};\n'
+        for columna, referida, pk_referida in anulables:
+            for condicion in _condiciones(f'{q}{columna}{q}', *huecos_de(referida, pk_referida)):
+                yield f'UPDATE {q}{tabla}{q} SET {q}{columna}{q} = NULL WHERE {condicion};\n'
+
+
+def _marca_sql(fecha):
+    # Las fechas se guardan en UTC con USE_TZ
+    return fecha.astimezone(dt_timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f') if fecha else None
+
+
+def _clasificar_tablas_sqlite(filas):
+    """
+    Separa las tablas virtuales (p.ej. el índice FTS5 de búsqueda) de las
+    normales; las tablas internas de una virtual (<virtual>_data, ...) se omiten
+    porque se regeneran al reconstruir el índice.
+    """
+    virtuales = {nombre: sql for nombre, sql in filas if sql.upper().startswith('CREATE VIRTUAL TABLE')}
+    normales = [
+        (nombre, sql) for nombre, sql in filas
+        if nombre not in virtuales and not any(nombre.startswith(f'{virtual}_') for virtual in virtuales)
+    ]
+    return normales, virtuales
+
+
+def tablas_base(cursor, motor):
+    """Tablas con datos propios (sin vistas, tablas virtuales ni sus tablas internas)"""
+    if motor == 'sqlite':
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        return [nombre for nombre, _ in _clasificar_tablas_sqlite(cursor.fetchall())[0]]
+    cursor.execute(
+        "SELECT TABLE_NAME FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE' ORDER BY TABLE_NAME"
+    )
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+def _columnas(cursor, motor, tabla):
+    if motor == 'sqlite':
+        cursor.execute(f'PRAGMA table_info("{tabla}")')
+        return [fila[1] for fila in cursor.fetchall()]
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+        f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{tabla}' ORDER BY ORDINAL_POSITION"
+    )
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+def estadisticas_tabla(cursor, motor, tabla):
+    """
+    Filas y checksum de una tabla: XOR de los primeros 64 bits del MD5 de cada
+    fila, independiente del orden físico. Solo es comparable entre bases del mismo motor.
+    """
+    columnas = _columnas(cursor, motor, tabla)
+    if motor == 'mysql':
+        # Misma técnica que pt-table-checksum, calculada por el servidor
+        valores = ', '.join(f'`{columna}`' for columna in columnas)
+        nulos = ', '.join(f'ISNULL(`{columna}`)' for columna in columnas)
+        cursor.execute(
+            f"SELECT COUNT(*), COALESCE(BIT_XOR(CAST(CONV(LEFT(MD5(CONCAT_WS('#', {valores}, CONCAT({nulos}))), 16), 16, 10) "
+            f"AS UNSIGNED)), 0) FROM `{tabla}`"
+        )
+        filas, suma = cursor.fetchone()
+    else:
+        valores = " || ',' || ".join(f'quote("{columna}")' for columna in columnas)
+        cursor.execute(f'SELECT {valores} FROM "{tabla}"')
+        filas = suma = 0
+        while lote := cursor.fetchmany(5000):
+            for texto, in lote:
+                suma ^= int.from_bytes(hashlib.md5(texto.encode('utf-8', 'surrogatepass')).digest()[:8], 'big')
+            filas += len(lote)
+    return {'filas': int(filas), 'checksum': f'{int(suma):016x}'}
+
+
+def estadisticas(cursor, motor, tablas=None):
+    return {tabla: estadisticas_tabla(cursor, motor, tabla) for tabla in (tablas or tablas_base(cursor, motor))}
+
+
+def _volcar_mysql(db_config, flujo, ventanas):
+    base = [
+        'mysqldump',
+        f"--host={db_config['HOST']}",
+        f"--port={db_config['PORT']}",
+        f"--user={db_config['USER']}",
+        '--single-transaction',
+        '--quick',  # fila a fila, sin cargar cada tabla en memoria
+        '--default-character-set=utf8mb4',
+    ]
+    # La contraseña por entorno no queda visible en la lista de procesos
+    entorno = {**os.environ, 'MYSQL_PWD': db_config['PASSWORD'] or ''}
+    nombre = db_config['NAME']
+    invocaciones = [base + ['--routines', '--triggers'] + [f'--ignore-table={nombre}.{tabla}' for tabla in ventanas] + [nombre]]
+    for tabla, (columna, desde, hasta) in ventanas.items():
+        invocaciones.append(base + [
+            '--no-create-info', '--insert-ignore', '--skip-triggers',
+            f"--where=`{columna}` > '{desde}' AND `{columna}` <= '{hasta}'",
+            nombre, tabla,
+        ])
+    for cmd in invocaciones:
+        try:
+            resultado = subprocess.run(
+                cmd, stdout=flujo.destino_subproceso(), stderr=subprocess.PIPE, env=entorno, timeout=TIMEOUT_VOLCADO,
+            )
+        except FileNotFoundError:
+            raise ErrorRespaldo('mysqldump no encontrado. Instalar MySQL client.')
+        except subprocess.TimeoutExpired:
+            raise ErrorRespaldo('Timeout durante el backup')
+        if resultado.returncode != 0:
+            raise ErrorRespaldo(f"Error mysqldump: {resultado.stderr.decode(errors='replace').strip()}")
+
+
+def _volcado_sqlite(conexion, ventanas):
+    """
+    SQL de la base SQLite abierta en una transacción de lectura. Las tablas con
+    ventana solo agregan sus filas nuevas; las demás se recrean completas. Las
+    tablas virtuales FTS se recrean vacías y se reconstruyen al final.
+    """
+    yield 'PRAGMA foreign_keys=OFF;\nBEGIN TRANSACTION;\n'
+    tablas, virtuales = _clasificar_tablas_sqlite(conexion.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall())
+    for nombre, sql in tablas:
+        columnas = [fila[1] for fila in conexion.execute(f'PRAGMA table_info("{nombre}")')]
+        valores = " || ',' || ".join(f'quote("{columna}")' for columna in columnas)
+        if nombre in ventanas:
+            columna, desde, hasta = ventanas[nombre]
+            filas = conexion.execute(
+                f"""SELECT 'INSERT OR IGNORE INTO "{nombre}" VALUES(' || {valores} || ');' FROM "{nombre}" """
+                f'WHERE "{columna}" > ? AND "{columna}" <= ?', (desde, hasta),
+            )
+        else:
+            yield f'DROP TABLE IF EXISTS "{nombre}";\n{sql};\n'
+            filas = conexion.execute(f"""SELECT 'INSERT INTO "{nombre}" VALUES(' || {valores} || ');' FROM "{nombre}" """)
+        while lote := filas.fetchmany(1000):
+            yield '\n'.join(linea for linea, in lote) + '\n'
+    yield from _sql_bajas(conexion.cursor(), 'sqlite', ventanas)
+    for nombre, sql in virtuales.items():
+        yield f'DROP TABLE IF EXISTS "{nombre}";\n{sql};\n'
+    # Índices, vistas y triggers después de los datos: los triggers no se disparan al cargar
+    for tipo, tabla, sql in conexion.execute(
+        "SELECT type, tbl_name, sql FROM sqlite_master WHERE type != 'table' AND sql NOT NULL ORDER BY type, name"
+    ):
+        if tabla not in ventanas:
+            yield f'{sql};\n'
+    for nombre, sql in virtuales.items():
+        if re.search(r'USING\s+fts[45]', sql, re.IGNORECASE):
+            yield f"""INSERT INTO "{nombre}"("{nombre}") VALUES('rebuild');\n"""
+    if conexion.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+        yield 'DELETE FROM "sqlite_sequence";\n'
+        for nombre, secuencia in conexion.execute('SELECT name, seq FROM sqlite_sequence'):
+            yield f"""INSERT INTO "sqlite_sequence" VALUES('{nombre.replace("'", "''")}', {secuencia});\n"""
+    yield 'COMMIT;\n'
+
+
+def _volcar_sqlite(db_config, flujo, ventanas, checksums):
+    ruta = db_config['NAME']
+    if not os.path.exists(ruta):
+        raise ErrorRespaldo(f"Archivo de BD no encontrado: {ruta}")
+    conexion = sqlite3.connect(ruta, isolation_level=None)
+    try:
+        conexion.execute('BEGIN')  # Lectura consistente de todas las tablas
+        for texto in _volcado_sqlite(conexion, ventanas):
+            flujo.escribir(texto)
+        tablas = estadisticas(conexion.cursor(), 'sqlite') if checksums else {}
+        conexion.execute('COMMIT')
+        return tablas
+    finally:
+        conexion.close()
+
+
+def leer_manifiesto(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def manifiestos(directorio):
+    """Manifiestos del directorio cuyo respaldo existe, del más antiguo al más reciente"""
+    encontrados = []
+    for ruta in sorted(Path(directorio).glob(f'{PREFIJO}*.json')):
+        try:
+            manifiesto = leer_manifiesto(ruta)
+        except (OSError, ValueError):
+            continue
+        if (ruta.parent / manifiesto['archivo']).exists():
+            encontrados.append(manifiesto)
+    return encontrados
+
+
+def _ventanas(base, marca, incrementales):
+    desde = datetime.fromisoformat(base['marca']) - MARGEN_INCREMENTAL
+    return {tabla: (columna, _marca_sql(desde), _marca_sql(marca)) for tabla, columna in incrementales.items()}
+
+
+def _volcar_mysql_con_estadisticas(alias, db_config, flujo, ventanas, checksums):
+    instantanea = checksums or bool(ventanas)
+    with connections[alias].cursor() as cursor:
+        if instantanea:
+            # Instantánea abierta justo antes de la de mysqldump: solo difieren los commits entre ambas.
+            # Los huecos de claves salen de ella, así que el diferencial restaurado vuelve a este estado.
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            cursor.execute('START TRANSACTION WITH CONSISTENT SNAPSHOT')
+        try:
+            _volcar_mysql(db_config, flujo, ventanas)
+            for texto in _sql_bajas(cursor, 'mysql', ventanas):
+                flujo.escribir(texto)
+            return estadisticas(cursor, 'mysql') if checksums else {}
+        finally:
+            if instantanea:
+                cursor.execute('COMMIT')
+
+
+def crear_respaldo(directorio='backups', diferencial=False, compresion='auto', dias_completo=7, alias='default',
+                   checksums=True):
+    """
+    Respalda la base en `directorio`; retorna el manifiesto. Un diferencial sin
+    respaldo completo previo (o con uno más antiguo que dias_completo) se hace completo.
+    """
+    db_config = settings.DATABASES[alias]
+    motores = {'django.db.backends.mysql': 'mysql', 'django.db.backends.sqlite3': 'sqlite'}
+    motor = motores.get(db_config['ENGINE'])
+    if motor is None:
+        raise ErrorRespaldo(f"Motor de BD no soportado: {db_config['ENGINE']}")
+
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    marca = timezone.now()
+    base = None
+    if diferencial:
+        completos = [
+            m for m in manifiestos(directorio)
+            if m['tipo'] == 'completo' and m['motor'] == motor and m['base_datos'] == str(db_config['NAME'])
+        ]
+        if completos and marca - datetime.fromisoformat(completos[-1]['marca']) <= timedelta(days=dias_completo):
+            base = completos[-1]
+    ventanas = _ventanas(base, marca, tablas_incrementales()) if base else {}
+
+    compresor = elegir_compresor(compresion)
+    sufijo = '_dif' if base else ''
+    nombre = f"{PREFIJO}{marca.strftime('%Y%m%d_%H%M%S')}{sufijo}.sql{extension(compresor)}"
+    inicio = time.monotonic()
+    with FlujoComprimido(directorio / nombre, compresor) as flujo:
+        if motor == 'mysql':
+            tablas = _volcar_mysql_con_estadisticas(alias, db_config, flujo, ventanas, checksums)
+        else:
+            tablas = _volcar_sqlite(db_config, flujo, ventanas, checksums)
+    segundos = time.monotonic() - inicio
+
+    manifiesto = {
+        'archivo': nombre,
+        'tipo': 'diferencial' if base else 'completo',
+        'base': base['archivo'] if base else None,
+        'motor': motor,
+        'base_datos': str(db_config['NAME']),
+        'compresion': compresor,
+        'sha256': flujo.sha256,
+        'bytes': flujo.bytes,
+        'bytes_sin_comprimir': flujo.bytes_sin_comprimir,
+        'marca': marca.isoformat(),
+        'segundos': round(segundos, 3),
+        'ventanas': {tabla: [desde, hasta] for tabla, (_, desde, hasta) in ventanas.items()},
+        'tablas': tablas,
+    }
+    with open(directorio / f'{nombre}.json', 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=2)
+    logger.info(
+        f"Respaldo {manifiesto['tipo']} {nombre}: {flujo.bytes} bytes en {segundos:.1f}s ({compresor})"
+    )
+    return manifiesto
+
+
+def eliminar_antiguos(directorio, dias):
+    """
+    Elimina respaldos (y sus manifiestos) de más de `dias` días, salvo los
+    completos que siguen siendo base de un diferencial conservado.
+    """
+    directorio = Path(directorio)
+    limite = time.time() - dias * 86400
+    conservados = set()
+    por_eliminar = []
+    for ruta in directorio.glob(f'{PREFIJO}*'):
+        if ruta.suffix in ('.json', '.part'):
+            continue
+        if ruta.stat().st_mtime < limite:
+            por_eliminar.append(ruta)
+        else:
+            conservados.add(ruta.name)
+    bases = {m['base'] for m in manifiestos(directorio) if m['archivo'] in conservados and m['base']}
+    eliminados = 0
+    for ruta in por_eliminar:
+        if ruta.name in bases:
+            continue
+        ruta.unlink()
+        ruta.with_name(ruta.name + '.json').unlink(missing_ok=True)
+        eliminados += 1
+    return eliminados
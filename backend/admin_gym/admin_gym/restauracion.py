@@ -0,0 +1,374 @@
+"""
+Restauración y verificación de respaldos.
+
+El archivo comprimido se lee una sola vez: su SHA-256 se compara con el
+manifiesto mientras se descomprime, y el SQL se aplica en streaming a una base
+de prueba (un archivo SQLite o una base MySQL del mismo servidor), sin
+descomprimir a disco. Luego se comparan filas y checksum de cada tabla con los
+calculados al respaldar. Un diferencial se restaura sobre su respaldo base.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from pathlib import Path
+from .respaldos import TAMANO_BLOQUE, ErrorRespaldo, estadisticas, leer_manifiesto
+import codecs
+import hashlib
+import os
+import re
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE_SQL = 4 * 1024 * 1024  # SQL por transacción al aplicar en SQLite
+ALIAS_RESTAURACION = 'restauracion'
+# Solo se crean y eliminan bases MySQL con este sufijo: --destino no puede apuntar a otra base del servidor
+SUFIJO_RESTAURACION = '_restauracion'
+PATRON_BASE_MYSQL = re.compile(r'[0-9A-Za-z$_]{1,64}')
+PATRON_TABLA_SQLITE = re.compile(
+    r'(?:INSERT(?: OR IGNORE)? INTO|DELETE FROM|UPDATE|DROP TABLE IF EXISTS|CREATE TABLE|CREATE (?:UNIQUE )?INDEX "?[^"\s]+"? ON) "?([^"\s(]+)'
+)
+PATRON_SECUENCIA_SQLITE = re.compile(r"""INSERT INTO "sqlite_sequence" VALUES\('((?:[^']|'')*)'""")
+# Secciones de mysqldump: cada tabla (o vista) empieza con un comentario con su nombre
+PATRON_SECCION_MYSQL = re.compile(r'-- .* for (?:table|view) `([^`]+)`')
+
+
+def cadena(ruta):
+    """Manifiestos a aplicar en orden para restaurar el respaldo (su base primero si es diferencial)"""
+    ruta = Path(ruta)
+    try:
+        manifiesto = leer_manifiesto(ruta.with_name(ruta.name + '.json'))
+    except FileNotFoundError:
+        raise ErrorRespaldo(f"No existe el manifiesto de {ruta.name}")
+    if manifiesto['tipo'] != 'diferencial':
+        return [manifiesto]
+    try:
+        base = leer_manifiesto(ruta.with_name(manifiesto['base'] + '.json'))
+    except FileNotFoundError:
+        raise ErrorRespaldo(f"Falta el respaldo base {manifiesto['base']}")
+    return [base, manifiesto]
+
+
+def resolver_tablas(nombres):
+    """Acepta nombres de tabla o de modelo de admin_gym (Asistencia -> admin_gym_asistencia)"""
+    tablas = set()
+    for nombre in nombres:
+        try:
+            tablas.add(apps.get_model('admin_gym', nombre)._meta.db_table)
+        except LookupError:
+            tablas.add(nombre)
+    return tablas
+
+
+def _bloques_comprimidos(ruta, resumen):
+    with open(ruta, 'rb') as f:
+        while bloque := f.read(TAMANO_BLOQUE):
+            resumen.update(bloque)
+            yield bloque
+
+
+def _descomprimir_externo(cmd, ruta, resumen):
+    try:
+        proceso = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    except FileNotFoundError:
+        raise ErrorRespaldo(f"{cmd[0]} no encontrado")
+
+    def alimentar():
+        try:
+            for bloque in _bloques_comprimidos(ruta, resumen):
+                proceso.stdin.write(bloque)
+        except BrokenPipeError:
+            pass
+        finally:
+            proceso.stdin.close()
+
+    hilo = threading.Thread(target=alimentar, daemon=True)
+    hilo.start()
+    while bloque := proceso.stdout.read(TAMANO_BLOQUE):
+        yield bloque
+    hilo.join()
+    if proceso.wait() != 0:
+        raise ErrorRespaldo(f"{cmd[0]} terminó con código {proceso.returncode}")
+
+
+def _descomprimir(ruta, compresor, resumen):
+    """Bytes descomprimidos del respaldo; acumula en `resumen` el SHA-256 del archivo"""
+    if compresor == 'zstd':
+        yield from _descomprimir_externo(['zstd', '-dc', '-q'], ruta, resumen)
+        return
+    descompresor = zlib.decompressobj(31)
+    for bloque in _bloques_comprimidos(ruta, resumen):
+        while bloque:
+            yield descompresor.decompress(bloque)
+            bloque = b''
+            if descompresor.eof:
+                # gzip de varios miembros
+                bloque = descompresor.unused_data
+                descompresor = zlib.decompressobj(31)
+    yield descompresor.flush()
+
+
+def _lineas(bloques):
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    resto = ''
+    for bloque in bloques:
+        lineas = (resto + decodificador.decode(bloque)).split('\n')
+        resto = lineas.pop()
+        for linea in lineas:
+            yield linea + '\n'
+    resto += decodificador.decode(b'', final=True)
+    if resto:
+        yield resto
+
+
+def _sentencias_sqlite(lineas):
+    pendiente = []
+    for linea in lineas:
+        pendiente.append(linea)
+        # Un texto con saltos de línea deja la sentencia abierta en varias líneas
+        if linea.endswith(';\n') or linea.endswith(';'):
+            sentencia = ''.join(pendiente)
+            if sqlite3.complete_statement(sentencia):
+                yield sentencia
+                pendiente = []
+    if pendiente:
+        yield ''.join(pendiente)
+
+
+def _tabla_sqlite(sentencia):
+    """Tabla a la que pertenece la sentencia; '' para objetos derivados que la restauración selectiva omite"""
+    if sentencia.startswith(('CREATE TRIGGER', 'CREATE VIRTUAL TABLE', 'CREATE VIEW')):
+        return ''
+    secuencia = PATRON_SECUENCIA_SQLITE.match(sentencia)
+    if secuencia:
+        return secuencia.group(1).replace("''", "'")
+    coincidencia = PATRON_TABLA_SQLITE.match(sentencia)
+    if coincidencia:
+        return coincidencia.group(1)
+    return 'sqlite_sequence' if sentencia.startswith('DELETE FROM "sqlite_sequence"') else None
+
+
+def _aplicar_sqlite(conexion, bloques, tablas):
+    lote, tamano = [], 0
+
+    def ejecutar():
+        # executescript confirma cualquier transacción abierta: cada lote lleva la suya
+        conexion.executescript('BEGIN;\n' + ''.join(lote) + 'COMMIT;\n')
+        lote.clear()
+
+    for sentencia in _sentencias_sqlite(_lineas(bloques)):
+        if sentencia in ('BEGIN TRANSACTION;\n', 'COMMIT;\n'):
+            continue
+        if tablas is not None:
+            tabla = _tabla_sqlite(sentencia)
+            if tabla is not None and tabla not in tablas:
+                continue
+        lote.append(sentencia)
+        tamano += len(sentencia)
+        if tamano >= TAMANO_LOTE_SQL:
+            ejecutar()
+            tamano = 0
+    if lote:
+        ejecutar()
+
+
+def _filtrar_mysql(lineas, tablas):
+    """Líneas de las tablas elegidas, más cabeceras y pies de cada volcado"""
+    actual = None  # None: fuera de una sección de tabla
+    for linea in lineas:
+        if linea.startswith('-- '):
+            seccion = PATRON_SECCION_MYSQL.match(linea)
+            if seccion:
+                actual = seccion.group(1)
+            elif linea.startswith('-- Dumping routines'):
+                actual = ''
+        elif linea.startswith('/*!40103 SET TIME_ZONE=@OLD_TIME_ZONE'):
+            actual = None  # Comienzo del pie del volcado
+        if actual is None or actual in tablas:
+            yield linea
+
+
+def _aplicar_mysql(db_config, destino, bloques, tablas):
+    cmd = [
+        'mysql',
+        f"--host={db_config['HOST']}",
+        f"--port={db_config['PORT']}",
+        f"--user={db_config['USER']}",
+        '--default-character-set=utf8mb4',
+        destino,
+    ]
+    entorno = {**os.environ, 'MYSQL_PWD': db_config['PASSWORD'] or ''}
+    with tempfile.TemporaryFile() as errores:
+        try:
+            proceso = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=errores, env=entorno)
+        except FileNotFoundError:
+            raise ErrorRespaldo('mysql no encontrado. Instalar MySQL client.')
+        try:
+            if tablas is None:
+                for bloque in bloques:
+                    proceso.stdin.write(bloque)
+            else:
+                for linea in _filtrar_mysql(_lineas(bloques), tablas):
+                    proceso.stdin.write(linea.encode('utf-8'))
+            proceso.stdin.close()
+        except BrokenPipeError:
+            pass
+        if proceso.wait() != 0:
+            errores.seek(0)
+            raise ErrorRespaldo(f"Error mysql: {errores.read().decode(errors='replace').strip()}")
+
+
+def _validar_destino_mysql(destino):
+    if destino == settings.DATABASES['default']['NAME']:
+        raise ErrorRespaldo('La base de prueba no puede ser la base de producción')
+    if not (PATRON_BASE_MYSQL.fullmatch(destino) and destino.endswith(SUFIJO_RESTAURACION)):
+        raise ErrorRespaldo(f"La base de prueba debe terminar en '{SUFIJO_RESTAURACION}': {destino}")
+
+
+def _preparar_mysql(db_config, destino):
+    _validar_destino_mysql(destino)
+    with connections['default'].cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS `{destino}`')
+        cursor.execute(f'CREATE DATABASE `{destino}` CHARACTER SET utf8mb4')
+
+
+def _preparar_sqlite(db_config, destino):
+    if os.path.exists(destino):
+        if db_config['ENGINE'] == 'django.db.backends.sqlite3' and os.path.samefile(destino, db_config['NAME']):
+            raise ErrorRespaldo('La base de prueba no puede ser la base de producción')
+        os.remove(destino)
+
+
+def _estadisticas_mysql(db_config, destino, tablas):
+    connections.databases[ALIAS_RESTAURACION] = {**connections.databases['default'], 'NAME': destino}
+    try:
+        with connections[ALIAS_RESTAURACION].cursor() as cursor:
+            return estadisticas(cursor, 'mysql', tablas)
+    finally:
+        connections[ALIAS_RESTAURACION].close()
+        del connections[ALIAS_RESTAURACION]
+        del connections.databases[ALIAS_RESTAURACION]
+
+
+def _contar(bloques, reporte):
+    for bloque in bloques:
+        reporte['bytes'] += len(bloque)
+        yield bloque
+
+
+def _comparar(esperadas, obtenidas):
+    tablas = {}
+    for tabla, esperada in esperadas.items():
+        obtenida = obtenidas.get(tabla, {'filas': 0, 'checksum': None})
+        tablas[tabla] = {
+            'filas_esperadas': esperada['filas'],
+            'filas': obtenida['filas'],
+            'ok': obtenida == esperada,
+        }
+    return tablas
+
+
+def restaurar(ruta, destino=None, tablas=None, verificar=True):
+    """
+    Restaura el respaldo (y su base, si es diferencial) en una base de prueba y
+    lo verifica contra el manifiesto. Retorna el reporte con tiempos y diferencias.
+    """
+    ruta = Path(ruta)
+    manifiestos = cadena(ruta)
+    temporal = destino is None
+    motor = manifiestos[-1]['motor']
+    db_config = settings.DATABASES['default']
+    esperadas = manifiestos[-1].get('tablas') or {}
+    if tablas is not None:
+        tablas = resolver_tablas(tablas)
+        desconocidas = tablas - set(esperadas) if esperadas else set()
+        if desconocidas:
+            raise ErrorRespaldo(f"Tablas que no están en el respaldo: {', '.join(sorted(desconocidas))}")
+        esperadas = {tabla: valor for tabla, valor in esperadas.items() if tabla in tablas}
+
+    if motor == 'mysql':
+        if db_config['ENGINE'] != 'django.db.backends.mysql':
+            raise ErrorRespaldo('Un respaldo MySQL solo se puede restaurar en un servidor MySQL')
+        destino = destino or f"{db_config['NAME']}{SUFIJO_RESTAURACION}"
+        _preparar_mysql(db_config, destino)
+    else:
+        destino = str(destino or Path(tempfile.gettempdir()) / f'{ruta.name}.restauracion.sqlite3')
+        _preparar_sqlite(db_config, destino)
+
+    reporte = {
+        'destino': destino,
+        'archivos': [m['archivo'] for m in manifiestos],
+        'bytes_comprimidos': 0,
+        'bytes': 0,
+        'segundos_restauracion': 0.0,
+        'filas': None,
+        'segundos_verificacion': None,
+        'tablas': {},
+        'diferencias': [],
+    }
+    inicio = time.monotonic()
+    conexion = None
+    if motor == 'sqlite':
+        conexion = sqlite3.connect(destino, isolation_level=None)
+        # Base desechable: sin journal ni fsync
+        conexion.execute('PRAGMA journal_mode=OFF')
+        conexion.execute('PRAGMA synchronous=OFF')
+    try:
+        for manifiesto in manifiestos:
+            archivo = ruta.with_name(manifiesto['archivo'])
+            resumen = hashlib.sha256()
+            bloques = _contar(_descomprimir(archivo, manifiesto['compresion'], resumen), reporte)
+            try:
+                if motor == 'sqlite':
+                    _aplicar_sqlite(conexion, bloques, tablas)
+                else:
+                    _aplicar_mysql(db_config, destino, bloques, tablas)
+            except (zlib.error, UnicodeDecodeError, sqlite3.Error) as e:
+                raise ErrorRespaldo(f"{manifiesto['archivo']}: {e}")
+            reporte['bytes_comprimidos'] += archivo.stat().st_size
+            if resumen.hexdigest() != manifiesto['sha256']:
+                raise ErrorRespaldo(f"{manifiesto['archivo']}: el SHA-256 no coincide con el manifiesto")
+        reporte['segundos_restauracion'] = round(time.monotonic() - inicio, 3)
+
+        if verificar and esperadas:
+            inicio = time.monotonic()
+            if motor == 'sqlite':
+                obtenidas = estadisticas(conexion.cursor(), 'sqlite', list(esperadas))
+            else:
+                obtenidas = _estadisticas_mysql(db_config, destino, list(esperadas))
+            reporte['segundos_verificacion'] = round(time.monotonic() - inicio, 3)
+            reporte['tablas'] = _comparar(esperadas, obtenidas)
+            reporte['diferencias'] = sorted(tabla for tabla, valor in reporte['tablas'].items() if not valor['ok'])
+            reporte['filas'] = sum(valor['filas'] for valor in obtenidas.values())
+    except Exception:
+        if conexion is not None:
+            conexion.close()
+            conexion = None
+        if temporal:
+            eliminar_destino(destino, motor)
+        raise
+    finally:
+        if conexion is not None:
+            conexion.close()
+
+    logger.info(
+        f"Restauración de {ruta.name} en {destino}: {reporte['segundos_restauracion']}s, "
+        f"{len(reporte['diferencias'])} tablas con diferencias"
+    )
+    return reporte
+
+
+def eliminar_destino(destino, motor):
+    """Descarta la base de prueba"""
+    if motor == 'mysql':
+        _validar_destino_mysql(destino)
+        with connections['default'].cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS `{destino}`')
+    elif os.path.exists(destino):
+        os.remove(destino)
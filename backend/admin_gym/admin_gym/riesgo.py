@@ -0,0 +1,114 @@
+"""
+Detección de clientes en riesgo de abandono a partir de sus patrones de asistencia
+"""
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from .models import Asistencia, Cliente, ConfiguracionSistema, RiesgoAbandono
+import logging
+
+logger = logging.getLogger(__name__)
+
+CLAVE_ULTIMA_EJECUCION = 'riesgo_abandono_ultima_ejecucion'
+UMBRAL_RIESGO = 0.6
+DIAS_AUSENCIA_MAXIMA = 21   # Ausencia a partir de la cual el componente de ausencia es máximo
+DIAS_REVISION = 7           # Ausencia desde la que se re-evalúa a clientes sin asistencias nuevas
+FRECUENCIA_SALUDABLE = 2    # Asistencias por semana
+
+
+def calcular_puntaje(recientes, previas, dias_sin_asistir):
+    """
+    Puntaje de riesgo entre 0 y 1 combinando ausencia (50%), caída de la
+    asistencia respecto del mes anterior (30%) y baja frecuencia (20%).
+    """
+    ausencia = min(dias_sin_asistir / DIAS_AUSENCIA_MAXIMA, 1.0)
+    caida = max(0.0, (previas - recientes) / previas) if previas else 0.0
+    frecuencia = max(0.0, 1.0 - (recientes / 4) / FRECUENCIA_SALUDABLE)
+    return round(0.5 * ausencia + 0.3 * caida + 0.2 * frecuencia, 4)
+
+
+def _ultima_ejecucion():
+    valor = ConfiguracionSistema.objects.filter(clave=CLAVE_ULTIMA_EJECUCION).values_list('valor', flat=True).first()
+    if not valor:
+        return None
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        return None
+
+
+def calcular_riesgo(completo=False, tamano_lote=1000):
+    """
+    Calcula el riesgo de abandono de los clientes con membresía activa.
+
+    En modo incremental solo se re-evalúan los clientes con asistencias nuevas
+    desde la última ejecución, los que aún no tienen puntaje y los que no están
+    marcados pero ya superan DIAS_REVISION sin asistir (su ausencia sigue creciendo).
+    Retorna un resumen con la cantidad de clientes evaluados y marcados.
+    """
+    ahora = timezone.now()
+    hace_4_semanas = ahora - timedelta(weeks=4)
+    hace_8_semanas = ahora - timedelta(weeks=8)
+    ultima = None if completo else _ultima_ejecucion()
+
+    clientes = Cliente.objects.filter(activo=True, estado_membresia='activa', suspendido=False)
+    if ultima is not None:
+        clientes = clientes.filter(
+            Q(id__in=Asistencia.objects.filter(fecha__gt=ultima).values('cliente_id'))
+            | Q(riesgo__isnull=True)
+            | Q(riesgo__en_riesgo=False, riesgo__ultima_asistencia__lte=ahora - timedelta(days=DIAS_REVISION))
+            | Q(riesgo__en_riesgo=False, riesgo__ultima_asistencia__isnull=True)
+        )
+
+    # Una sola pasada agrupada: última visita y asistencias por ventana
+    filas = clientes.annotate(
+        ultima_asistencia=Max('asistencia__fecha'),
+        recientes=Count('asistencia', filter=Q(asistencia__fecha__gte=hace_4_semanas)),
+        previas=Count('asistencia', filter=Q(asistencia__fecha__gte=hace_8_semanas, asistencia__fecha__lt=hace_4_semanas)),
+    ).values_list('id', 'fecha_registro', 'ultima_asistencia', 'recientes', 'previas')
+
+    riesgos = []
+    for cliente_id, fecha_registro, ultima_asistencia, recientes, previas in filas.iterator(chunk_size=tamano_lote):
+        referencia = ultima_asistencia or fecha_registro
+        dias_sin_asistir = max((ahora - referencia).days, 0)
+        puntaje = calcular_puntaje(recientes, previas, dias_sin_asistir)
+        riesgos.append(RiesgoAbandono(
+            cliente_id=cliente_id,
+            puntaje=puntaje,
+            en_riesgo=puntaje >= UMBRAL_RIESGO,
+            asistencias_recientes=recientes,
+            asistencias_previas=previas,
+            ultima_asistencia=ultima_asistencia,
+            dias_sin_asistir=dias_sin_asistir,
+            fecha_calculo=ahora,
+        ))
+
+    with transaction.atomic():
+        RiesgoAbandono.objects.bulk_create(
+            riesgos,
+            batch_size=tamano_lote,
+            update_conflicts=True,
+            unique_fields=['cliente'],
+            update_fields=[
+                'puntaje', 'en_riesgo', 'asistencias_recientes', 'asistencias_previas',
+                'ultima_asistencia', 'dias_sin_asistir', 'fecha_calculo',
+            ],
+        )
+        # Clientes que dejaron de tener membresía activa ya no se evalúan
+        eliminados, _ = RiesgoAbandono.objects.exclude(
+            cliente__activo=True, cliente__estado_membresia='activa', cliente__suspendido=False
+        ).delete()
+        ConfiguracionSistema.objects.update_or_create(
+            clave=CLAVE_ULTIMA_EJECUCION,
+            defaults={'valor': ahora.isoformat(), 'descripcion': 'Última ejecución del cálculo de riesgo de abandono'},
+        )
+
+    marcados = RiesgoAbandono.objects.filter(en_riesgo=True).count()
+    logger.info(f"Riesgo de abandono: {len(riesgos)} clientes evaluados, {marcados} en riesgo")
+    return {
+        'evaluados': len(riesgos),
+        'en_riesgo': marcados,
+        'eliminados': eliminados,
+        'incremental': ultima is not None,
+    }
@@ -0,0 +1,90 @@
+"""
+Lectura de rutinas asignadas con carga acotada de consultas y caché por versión
+"""
+from django.core.cache import cache
+from django.db.models import Prefetch, prefetch_related_objects
+from .models import EjercicioRutina, Rutina, RutinaCliente
+
+DURACION_CACHE = 60 * 60 * 24
+
+
+def clave_cache(rutina_id, version):
+    return f'rutina:{rutina_id}:v{version}'
+
+
+def ejercicios_ordenados():
+    return Prefetch(
+        'ejercicios',
+        queryset=EjercicioRutina.objects.select_related('ejercicio').order_by('orden', 'id'),
+    )
+
+
+def serializar_rutina(rutina):
+    """Rutina con sus ejercicios; requiere el prefetch de ejercicios_ordenados()"""
+    return {
+        'rutina_id': rutina.id,
+        'nombre': rutina.nombre,
+        'descripcion': rutina.descripcion,
+        'objetivo': rutina.objetivo,
+        'objetivo_display': rutina.get_objetivo_display(),
+        'version': rutina.version,
+        'ejercicios': [
+            {
+                'id': ejercicio_rutina.id,
+                'orden': ejercicio_rutina.orden,
+                'ejercicio_id': ejercicio_rutina.ejercicio_id,
+                'nombre': ejercicio_rutina.ejercicio.nombre,
+                'tipo': ejercicio_rutina.ejercicio.tipo,
+                'grupo_muscular': ejercicio_rutina.ejercicio.grupo_muscular,
+                'instrucciones': ejercicio_rutina.ejercicio.instrucciones,
+                'series': ejercicio_rutina.series,
+                'repeticiones': ejercicio_rutina.repeticiones,
+                'peso_sugerido': float(ejercicio_rutina.peso_sugerido) if ejercicio_rutina.peso_sugerido is not None else None,
+                'tiempo_descanso': ejercicio_rutina.tiempo_descanso,
+                'notas': ejercicio_rutina.notas,
+            }
+            for ejercicio_rutina in rutina.ejercicios.all()
+        ],
+    }
+
+
+def rutinas_activas(cliente_id):
+    """
+    Rutinas activas del cliente. Una consulta para las asignaciones y, solo
+    para las rutinas que no están en caché, una más para sus ejercicios.
+    """
+    asignaciones = list(
+        RutinaCliente.objects.filter(cliente_id=cliente_id, activa=True, rutina__activa=True)
+        .select_related('rutina')
+        .order_by('-fecha_inicio', '-id')
+    )
+    claves = {asignacion.rutina_id: clave_cache(asignacion.rutina_id, asignacion.rutina.version) for asignacion in asignaciones}
+    en_cache = cache.get_many(claves.values())
+
+    faltantes = {a.rutina_id: a.rutina for a in asignaciones if claves[a.rutina_id] not in en_cache}
+    if faltantes:
+        prefetch_related_objects(list(faltantes.values()), ejercicios_ordenados())
+        nuevas = {claves[rutina_id]: serializar_rutina(rutina) for rutina_id, rutina in faltantes.items()}
+        cache.set_many(nuevas, DURACION_CACHE)
+        en_cache.update(nuevas)
+
+    return [
+        {
+            **en_cache[claves[asignacion.rutina_id]],
+            'asignacion_id': asignacion.id,
+            'fecha_inicio': asignacion.fecha_inicio.isoformat(),
+            'fecha_fin': asignacion.fecha_fin.isoformat() if asignacion.fecha_fin else None,
+            'actualizada': asignacion.rutina.version > asignacion.version_asignada,
+        }
+        for asignacion in asignaciones
+    ]
+
+
+def invalidar_rutina(rutina_id, version):
+    cache.delete(clave_cache(rutina_id, version))
+
+
+def invalidar_rutinas_con_ejercicio(ejercicio_id):
+    """El caché de cada rutina copia nombre, tipo e instrucciones de sus ejercicios"""
+    versiones = Rutina.objects.filter(ejercicios__ejercicio_id=ejercicio_id).distinct().values_list('id', 'version')
+    cache.delete_many([clave_cache(rutina_id, version) for rutina_id, version in versiones])
@@ -0,0 +1,591 @@
+"""
+Servicios de dominio con operaciones transaccionales sobre pagos, rutinas, progreso y accesos
+"""
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.html import escape
+from django.db.models import F, Max, Prefetch, Q, Value
+from django.db.models.functions import Coalesce
+from .models import Asistencia, Cliente, EjercicioRutina, LoteProgreso, Pago, Profesor, RegistroProgreso, Rutina, RutinaCliente
+from .notifications import NotificationService
+from .progreso import actualizar_resumenes, totales_por_ejercicio
+from .registro_accesos import registrar_acceso
+from .sincronizacion_entrenador import registrar_cambios
+from .tokens_qr import TokenInvalido, es_token, verificar_token
+from .utils import descomponer_rut
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+REMITENTE = 'proyectogym12@gmail.com'
+MAX_REGISTROS_LOTE = 200
+RUN_CEDULA = re.compile(r'RUN=([0-9.]+-?[0-9Kk])')
+HORAS_ENTRE_ASISTENCIAS = 12
+MAX_CODIGOS_LOTE = 50
+
+
+def _mensaje_vencimiento(nombre, email, monto, plan_display):
+    return (
+        'Membresía Vencida - GymPro',
+        f'Hola {nombre},\n\nTu membresía ha vencido. Para continuar usando nuestros servicios, por favor renueva tu membresía.\n\nMonto: ${monto}\nPlan: {plan_display}\n\nContacta con nosotros para renovar.\n\nSaludos,\nEquipo GymPro',
+        REMITENTE,
+        [email],
+    )
+
+
+class PagoService:
+    """Cambios de estado de pagos y de la membresía asociada, de forma atómica"""
+
+    @staticmethod
+    def marcar_pagado(pago_id):
+        """Marca un pago como pagado y reactiva la membresía del cliente"""
+        with transaction.atomic():
+            pago = Pago.objects.select_for_update().select_related('cliente').get(id=pago_id)
+            pago.estado = 'Pagado'
+            pago.save(update_fields=['estado'])
+
+            pago.cliente.estado_membresia = 'activa'
+            pago.cliente.fecha_vencimiento = pago.vencimiento
+            pago.cliente.save(update_fields=['estado_membresia', 'fecha_vencimiento'])
+        return pago
+
+    @staticmethod
+    def marcar_vencido(pago_id, notificar=True):
+        """
+        Marca un pago pendiente como vencido, vence la membresía y difiere el aviso
+        por correo. Retorna el pago, o None si no estaba pendiente.
+        """
+        with transaction.atomic():
+            pago = Pago.objects.select_for_update().select_related('cliente').filter(id=pago_id, estado='Pendiente').first()
+            if pago is None:
+                return None
+            pago.estado = 'Vencido'
+            pago.save(update_fields=['estado'])
+
+            pago.cliente.estado_membresia = 'vencida'
+            pago.cliente.save(update_fields=['estado_membresia'])
+
+            if notificar:
+                NotificationService.enviar_diferido([
+                    _mensaje_vencimiento(pago.cliente.nombre, pago.cliente.email, pago.monto, pago.get_plan_display())
+                ])
+        return pago
+
+    @staticmethod
+    def marcar_pagados(pago_ids):
+        """
+        Marca en lote pagos como pagados con actualizaciones por conjunto.
+        Cada cliente queda activo con el vencimiento más lejano de sus pagos marcados.
+        Retorna la cantidad de pagos actualizados.
+        """
+        with transaction.atomic():
+            filas = list(
+                Pago.objects.select_for_update()
+                .filter(id__in=pago_ids)
+                .exclude(estado='Pagado')
+                .values_list('id', 'cliente_id', 'vencimiento')
+            )
+            if not filas:
+                return 0
+
+            Pago.objects.filter(id__in=[pago_id for pago_id, _, _ in filas]).update(estado='Pagado')
+
+            vencimientos = {}
+            for _, cliente_id, vencimiento in filas:
+                if cliente_id not in vencimientos or vencimiento > vencimientos[cliente_id]:
+                    vencimientos[cliente_id] = vencimiento
+            Cliente.objects.bulk_update(
+                [
+                    Cliente(id=cliente_id, estado_membresia='activa', fecha_vencimiento=vencimiento)
+                    for cliente_id, vencimiento in vencimientos.items()
+                ],
+                ['estado_membresia', 'fecha_vencimiento'],
+                batch_size=500,
+            )
+            registrar_cambios(vencimientos)
+
+        logger.info(f"{len(filas)} pagos marcados como pagados en lote")
+        return len(filas)
+
+    @staticmethod
+    def marcar_vencidos(pago_ids, notificar=True):
+        """
+        Marca en lote pagos pendientes como vencidos y vence las membresías asociadas.
+        Los avisos se envían en segundo plano tras el commit, en una sola conexión SMTP.
+        Retorna la cantidad de pagos actualizados.
+        """
+        planes = dict(Cliente.TIPOS_MEMBRESIA)
+        with transaction.atomic():
+            filas = list(
+                Pago.objects.select_for_update()
+                .filter(id__in=pago_ids, estado='Pendiente')
+                .values_list('id', 'cliente_id', 'monto', 'plan', 'cliente__nombre', 'cliente__email')
+            )
+            if not filas:
+                return 0
+
+            Pago.objects.filter(id__in=[fila[0] for fila in filas]).update(estado='Vencido')
+            cliente_ids = {fila[1] for fila in filas}
+            Cliente.objects.filter(id__in=cliente_ids).update(estado_membresia='vencida')
+            registrar_cambios(cliente_ids)
+
+            if notificar:
+                NotificationService.enviar_diferido(
+                    _mensaje_vencimiento(nombre, email, monto, planes.get(plan, plan))
+                    for _, _, monto, plan, nombre, email in filas
+                )
+
+        logger.info(f"{len(filas)} pagos marcados como vencidos en lote")
+        return len(filas)
+
+
+def _entero(datos, campo, errores, prefijo='', minimo=0, maximo=None, requerido=False):
+    valor = datos.get(campo)
+    if valor in (None, ''):
+        if requerido:
+            errores.append(f'{prefijo}{campo} es obligatorio')
+        return None
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        errores.append(f'{prefijo}{campo} debe ser un número entero')
+        return None
+    if numero < minimo or (maximo is not None and numero > maximo):
+        rango = f'estar entre {minimo} y {maximo}' if maximo is not None else f'ser mayor o igual a {minimo}'
+        errores.append(f'{prefijo}{campo} debe {rango}')
+        return None
+    return numero
+
+
+def _peso(datos, errores, prefijo=''):
+    valor = datos.get('peso')
+    if valor in (None, ''):
+        return None
+    try:
+        peso = Decimal(str(valor)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        errores.append(f'{prefijo}peso inválido')
+        return None
+    if not Decimal(0) <= peso < Decimal(1000):
+        errores.append(f'{prefijo}peso fuera de rango')
+        return None
+    return peso
+
+
+def _numero(valor):
+    return float(valor) if valor is not None else None
+
+
+class ProgresoService:
+    """Registro de sesiones de entrenamiento completas"""
+
+    @staticmethod
+    def _lote_previo(clave, cliente_id):
+        previo = LoteProgreso.objects.filter(clave=clave).values_list('cliente_id', 'respuesta').first()
+        if previo is not None and previo[0] != cliente_id:
+            raise ValidationError('La clave de idempotencia ya fue usada para otro cliente')
+        return previo[1] if previo else None
+
+    @staticmethod
+    def registrar_lote(datos, usuario=None, clave=None):
+        """
+        Registra todas las series de una sesión validándolas contra las rutinas
+        activas del cliente. Con clave de idempotencia, un reintento devuelve la
+        respuesta original sin duplicar series.
+        Retorna (respuesta, repetido); lanza ValidationError con la lista de errores.
+        """
+        errores = []
+        cliente_id = _entero(datos, 'cliente_id', errores, minimo=1, requerido=True)
+        filas = datos.get('registros')
+        if not isinstance(filas, list) or not filas:
+            errores.append('registros debe ser una lista no vacía')
+        elif len(filas) > MAX_REGISTROS_LOTE:
+            errores.append(f'Máximo {MAX_REGISTROS_LOTE} registros por lote')
+        clave = str(clave or datos.get('clave_idempotencia') or '').strip() or None
+        if clave and len(clave) > 64:
+            errores.append('La clave de idempotencia no puede superar 64 caracteres')
+        if errores:
+            raise ValidationError(errores)
+
+        if clave:
+            respuesta = ProgresoService._lote_previo(clave, cliente_id)
+            if respuesta is not None:
+                return respuesta, True
+
+        # Rutinas activas con su prescripción en una sola carga
+        asignaciones = RutinaCliente.objects.filter(
+            cliente_id=cliente_id, activa=True, rutina__activa=True
+        ).select_related('rutina').prefetch_related(
+            Prefetch('rutina__ejercicios', queryset=EjercicioRutina.objects.select_related('ejercicio'))
+        )
+        prescripcion = {}
+        for asignacion in asignaciones:
+            ejercicios = prescripcion.setdefault(asignacion.rutina_id, {})
+            for ejercicio_rutina in asignacion.rutina.ejercicios.all():
+                ejercicios.setdefault(ejercicio_rutina.ejercicio_id, ejercicio_rutina)
+        if not prescripcion:
+            raise ValidationError('El cliente no tiene rutinas activas')
+
+        sesion = {
+            'enfoque_dia': str(datos.get('enfoque_dia') or '')[:100],
+            'estado_animo': str(datos.get('estado_animo') or '')[:50],
+            'calidad_sueno': _entero(datos, 'calidad_sueno', errores, minimo=1, maximo=10),
+            'nivel_energia': _entero(datos, 'nivel_energia', errores, minimo=1, maximo=10),
+        }
+        rutina_sesion = _entero(datos, 'rutina_id', errores, minimo=1)
+
+        registros = []
+        rutina_de = {}
+        for i, fila in enumerate(filas):
+            prefijo = f'registros[{i}].'
+            if not isinstance(fila, dict):
+                errores.append(f'registros[{i}] debe ser un objeto')
+                continue
+            ejercicio_id = _entero(fila, 'ejercicio_id', errores, prefijo, minimo=1, requerido=True)
+            rutina_id = _entero(fila, 'rutina_id', errores, prefijo, minimo=1) or rutina_sesion
+            registro = RegistroProgreso(
+                cliente_id=cliente_id,
+                ejercicio_id=ejercicio_id,
+                series_completadas=_entero(fila, 'series_completadas', errores, prefijo, minimo=1, requerido=True),
+                repeticiones=_entero(fila, 'repeticiones', errores, prefijo),
+                peso=_peso(fila, errores, prefijo),
+                tiempo=_entero(fila, 'tiempo', errores, prefijo),
+                rpe=_entero(fila, 'rpe', errores, prefijo, minimo=1, maximo=10),
+                notas=str(fila.get('notas') or ''),
+                **sesion,
+            )
+            if ejercicio_id is None:
+                continue
+            if rutina_id is None:
+                rutina_id = next((r for r, ejercicios in prescripcion.items() if ejercicio_id in ejercicios), None)
+            if ejercicio_id not in prescripcion.get(rutina_id, {}):
+                errores.append(f'{prefijo}ejercicio_id {ejercicio_id} no pertenece a una rutina activa del cliente')
+                continue
+            registro.rutina_id = rutina_id
+            rutina_de.setdefault(ejercicio_id, rutina_id)
+            registros.append(registro)
+
+        if errores:
+            raise ValidationError(errores)
+
+        try:
+            with transaction.atomic():
+                RegistroProgreso.objects.bulk_create(registros, batch_size=500)
+                actualizar_resumenes(registros)
+                respuesta = ProgresoService._resumen_sesion(registros, prescripcion, rutina_de)
+                respuesta['clave_idempotencia'] = clave
+                if clave:
+                    LoteProgreso.objects.create(
+                        clave=clave, cliente_id=cliente_id, registrado_por=usuario,
+                        registros=len(registros), respuesta=respuesta,
+                    )
+        except IntegrityError:
+            # Un reintento concurrente con la misma clave se confirmó primero
+            respuesta = ProgresoService._lote_previo(clave, cliente_id) if clave else None
+            if respuesta is None:
+                raise
+            return respuesta, True
+
+        logger.info(f"Sesión de progreso registrada: cliente {cliente_id}, {len(registros)} series")
+        return respuesta, False
+
+    @staticmethod
+    def _resumen_sesion(registros, prescripcion, rutina_de):
+        """Totales por ejercicio comparados con lo prescrito en la rutina"""
+        totales = totales_por_ejercicio(registros)
+        rpes = {}
+        for registro in registros:
+            if registro.rpe is not None:
+                rpes.setdefault(registro.ejercicio_id, []).append(registro.rpe)
+
+        ejercicios = []
+        for ejercicio_id, rutina_id in rutina_de.items():
+            total = totales[ejercicio_id]
+            prescrito = prescripcion[rutina_id][ejercicio_id]
+            rpe = rpes.get(ejercicio_id)
+            ejercicios.append({
+                'ejercicio_id': ejercicio_id,
+                'nombre': prescrito.ejercicio.nombre,
+                'rutina_id': rutina_id,
+                'registros': total['registros'],
+                'series': total['series'],
+                'series_prescritas': prescrito.series,
+                'repeticiones_prescritas': prescrito.repeticiones,
+                'peso_sugerido': _numero(prescrito.peso_sugerido),
+                'volumen': _numero(total['volumen']),
+                'peso_maximo': _numero(total['peso_maximo']),
+                'e1rm': _numero(total['e1rm_maximo']),
+                'rpe_promedio': round(sum(rpe) / len(rpe), 1) if rpe else None,
+                'completo': total['series'] >= prescrito.series,
+            })
+        return {'success': True, 'registros_creados': len(registros), 'ejercicios': ejercicios}
+
+
+class RutinaService:
+    """Asignación y clonado masivo de plantillas de rutina"""
+
+    CAMPOS_EJERCICIO = ('ejercicio_id', 'series', 'repeticiones', 'peso_sugerido', 'tiempo_descanso', 'orden', 'notas')
+
+    @staticmethod
+    def _clientes_validos(cliente_ids):
+        return list(Cliente.objects.filter(id__in=set(cliente_ids), activo=True).values_list('id', flat=True))
+
+    @staticmethod
+    def _reemplazar_asignaciones(rutina_por_cliente, version_por_rutina, usuario, fecha_inicio, fecha_fin):
+        """Desactiva las asignaciones vigentes con un solo UPDATE y crea las nuevas en lote"""
+        RutinaCliente.objects.filter(cliente_id__in=list(rutina_por_cliente), activa=True).update(
+            activa=False, fecha_fin=Coalesce('fecha_fin', Value(fecha_inicio))
+        )
+        RutinaCliente.objects.bulk_create(
+            [
+                RutinaCliente(
+                    cliente_id=cliente_id, rutina_id=rutina_id, asignado_por=usuario,
+                    fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, version_asignada=version_por_rutina[rutina_id],
+                )
+                for cliente_id, rutina_id in rutina_por_cliente.items()
+            ],
+            batch_size=500,
+        )
+
+    @staticmethod
+    def asignar_plantilla(plantilla_id, cliente_ids, usuario, fecha_inicio=None, fecha_fin=None):
+        """
+        Asigna la plantilla por referencia: todos los clientes comparten sus
+        ejercicios, por lo que las ediciones posteriores les llegan sin copiar filas.
+        Retorna la cantidad de clientes asignados.
+        """
+        fecha_inicio = fecha_inicio or timezone.localdate()
+        with transaction.atomic():
+            plantilla = Rutina.objects.select_for_update().get(id=plantilla_id, es_plantilla=True, activa=True)
+            clientes = RutinaService._clientes_validos(cliente_ids)
+            RutinaService._reemplazar_asignaciones(
+                {cliente_id: plantilla.id for cliente_id in clientes},
+                {plantilla.id: plantilla.version}, usuario, fecha_inicio, fecha_fin,
+            )
+        logger.info(f"Plantilla {plantilla.id} v{plantilla.version} asignada a {len(clientes)} clientes")
+        return len(clientes)
+
+    @staticmethod
+    def clonar_plantilla(plantilla_id, cliente_ids, usuario, fecha_inicio=None, fecha_fin=None):
+        """
+        Crea una copia personalizable de la plantilla para cada cliente y se la
+        asigna. Copias, ejercicios y asignaciones se insertan con bulk_create.
+        Retorna la cantidad de clientes asignados.
+        """
+        fecha_inicio = fecha_inicio or timezone.localdate()
+        with transaction.atomic():
+            plantilla = Rutina.objects.select_for_update().get(id=plantilla_id, es_plantilla=True, activa=True)
+            ejercicios = list(
+                EjercicioRutina.objects.filter(rutina=plantilla).order_by('orden').values(*RutinaService.CAMPOS_EJERCICIO)
+            )
+            clientes = RutinaService._clientes_validos(cliente_ids)
+
+            copias = Rutina.objects.bulk_create(
+                [
+                    Rutina(
+                        nombre=plantilla.nombre, descripcion=plantilla.descripcion, objetivo=plantilla.objetivo,
+                        es_plantilla=False, creado_por=usuario, plantilla_origen=plantilla,
+                        version_origen=plantilla.version, cliente_id=cliente_id,
+                    )
+                    for cliente_id in clientes
+                ],
+                batch_size=500,
+            )
+            if copias and copias[0].pk is not None:
+                rutina_por_cliente = {copia.cliente_id: copia.pk for copia in copias}
+            else:
+                # MySQL no retorna las claves del INSERT múltiple: la copia más reciente de cada cliente es la recién creada
+                rutina_por_cliente = dict(
+                    Rutina.objects.filter(plantilla_origen=plantilla, cliente_id__in=clientes)
+                    .values('cliente_id').annotate(ultima=Max('id')).values_list('cliente_id', 'ultima')
+                )
+
+            EjercicioRutina.objects.bulk_create(
+                [
+                    EjercicioRutina(rutina_id=rutina_id, **ejercicio)
+                    for rutina_id in rutina_por_cliente.values()
+                    for ejercicio in ejercicios
+                ],
+                batch_size=1000,
+            )
+            RutinaService._reemplazar_asignaciones(
+                rutina_por_cliente, dict.fromkeys(rutina_por_cliente.values(), 1), usuario, fecha_inicio, fecha_fin,
+            )
+        logger.info(f"Plantilla {plantilla.id} v{plantilla.version} clonada para {len(clientes)} clientes")
+        return len(clientes)
+
+    @staticmethod
+    def asignaciones_desactualizadas(plantilla_id):
+        """Asignaciones activas hechas sobre una versión anterior de la plantilla"""
+        return RutinaCliente.objects.filter(
+            rutina_id=plantilla_id, activa=True, version_asignada__lt=F('rutina__version')
+        )
+
+
+class RutService:
+    """
+    Búsqueda de personas por RUT. Toda consulta es una igualdad sobre la
+    columna entera rut_numero, sin importar el formato en que llegue el RUT.
+    """
+
+    @staticmethod
+    def numero(rut):
+        """Cuerpo numérico de un RUT válido, o None"""
+        partes = descomponer_rut(rut)
+        return partes[0] if partes else None
+
+    @staticmethod
+    def desde_codigo(codigo):
+        """RUT tecleado en el escáner o leído del QR de la cédula de identidad (…?RUN=12345678-5&…)"""
+        encontrado = RUN_CEDULA.search(codigo or '')
+        return encontrado.group(1) if encontrado else codigo
+
+    @staticmethod
+    def _numero(rut):
+        return rut if isinstance(rut, int) else RutService.numero(rut)
+
+    @staticmethod
+    def clientes(rut):
+        """Clientes con ese RUT; acepta el RUT en cualquier formato o su cuerpo numérico"""
+        numero = RutService._numero(rut)
+        # filter(rut_numero=None) sería IS NULL y coincidiría con RUTs heredados inválidos
+        return Cliente.objects.filter(rut_numero=numero) if numero is not None else Cliente.objects.none()
+
+    @staticmethod
+    def profesores(rut):
+        numero = RutService._numero(rut)
+        return Profesor.objects.filter(rut_numero=numero) if numero is not None else Profesor.objects.none()
+
+    @staticmethod
+    def buscar_cliente(rut, **filtros):
+        return RutService.clientes(rut).filter(**filtros).select_related('user').first()
+
+    @staticmethod
+    def buscar_profesor(rut):
+        return RutService.profesores(rut).select_related('user').first()
+
+    @staticmethod
+    def usuarios(rut):
+        """
+        Usuarios candidatos para iniciar sesión con ese RUT, en orden: el del
+        cliente activo y luego el del profesor. Una misma persona puede ser
+        ambas cosas con contraseñas distintas.
+        """
+        numero = RutService._numero(rut)
+        candidatos = [RutService.buscar_cliente(numero, activo=True), RutService.buscar_profesor(numero)]
+        return [persona.user for persona in candidatos if persona is not None and persona.user is not None]
+
+
+class AccesoService:
+    """
+    Control de acceso en recepción: traduce los códigos escaneados a clientes y
+    registra asistencias. Acepta tokens QR firmados y, solo si están habilitados
+    en GYM_CONFIG, el RUT (tecleado o desde la cédula) y el formato antiguo
+    user_id:token:timestamp.
+    """
+
+    @staticmethod
+    def resolver_codigo(codigo):
+        """
+        Campo y valor con que buscar al cliente, p.ej. ('id', 12). Lanza
+        TokenInvalido sin consultar la base si el código es inválido o expiró.
+        """
+        if es_token(codigo):
+            return 'id', verificar_token(codigo)
+        partes = codigo.split(':')
+        if len(partes) != 3:
+            # RUT ingresado a mano o QR de la cédula: quien conoce el RUT de un socio puede ingresar sin su QR
+            if not settings.GYM_CONFIG.get('ACCESO_POR_RUT', False):
+                raise TokenInvalido('Código QR no válido')
+            numero = RutService.numero(RutService.desde_codigo(codigo))
+            if numero is None:
+                raise TokenInvalido('Código QR no válido')
+            return 'rut_numero', numero
+        # Formato antiguo con token sin firma, solo durante la migración
+        if not settings.GYM_CONFIG.get('QR_FORMATO_ANTIGUO', False):
+            raise TokenInvalido('Código QR no válido')
+        try:
+            user_id, timestamp = int(partes[0]), float(partes[2])
+        except ValueError:
+            raise TokenInvalido('Código QR no válido')
+        if time.time() - timestamp > 300:
+            raise TokenInvalido('QR expirado')
+        return 'user_id', user_id
+
+    @staticmethod
+    def validar_lote(codigos, ip=None):
+        """
+        Valida un lote de códigos de varios torniquetes y registra las asistencias
+        aceptadas. Una consulta IN para los clientes, una agrupada para las
+        asistencias recientes y un bulk_create. Retorna un veredicto por código.
+        """
+        ahora = timezone.now()
+        veredictos = [None] * len(codigos)
+        motivos = [''] * len(codigos)   # Motivo de rechazo para AccesoQR
+        buscados = {}
+        for posicion, codigo in enumerate(codigos):
+            try:
+                campo, valor = AccesoService.resolver_codigo(codigo)
+            except TokenInvalido as e:
+                veredictos[posicion] = {'success': False, 'message': str(e)}
+                motivos[posicion] = str(e)
+                continue
+            buscados[posicion] = (campo, valor)
+
+        valores = {'id': set(), 'rut_numero': set(), 'user_id': set()}
+        for campo, valor in buscados.values():
+            valores[campo].add(valor)
+        filtro = Q()
+        for campo, conjunto in valores.items():
+            if conjunto:
+                filtro |= Q(**{f'{campo}__in': conjunto})
+        clientes = {}
+        if buscados:
+            for cliente in Cliente.objects.filter(filtro, activo=True):
+                for campo in valores:
+                    clientes[(campo, getattr(cliente, campo))] = cliente
+
+        ultimas = dict(
+            Asistencia.objects.filter(
+                cliente_id__in={cliente.id for cliente in clientes.values()},
+                fecha__gte=ahora - timedelta(hours=HORAS_ENTRE_ASISTENCIAS),
+            ).values('cliente_id').annotate(ultima=Max('fecha')).values_list('cliente_id', 'ultima')
+        ) if clientes else {}
+
+        nuevas = []
+        for posicion, clave in buscados.items():
+            cliente = clientes.get(clave)
+            if cliente is None:
+                veredicto = {'success': False, 'message': 'Cliente no encontrado'}
+            elif not cliente.puede_acceder():
+                veredicto = {'success': False, 'message': f'Acceso denegado - Estado: {cliente.get_estado_membresia_display()}'}
+            elif cliente.id in ultimas:
+                # Incluye al mismo cliente escaneado dos veces dentro del lote
+                restante = ultimas[cliente.id] + timedelta(hours=HORAS_ENTRE_ASISTENCIAS) - ahora
+                horas, minutos = int(restante.total_seconds() // 3600), int(restante.total_seconds() % 3600 // 60)
+                veredicto = {
+                    'success': False,
+                    'message': f'{escape(cliente.nombre)} ya marcó asistencia. Podrá marcar nuevamente en {horas}h {minutos}m',
+                }
+                motivos[posicion] = 'Asistencia ya registrada'
+            else:
+                nuevas.append(Asistencia(cliente=cliente, fecha=ahora))
+                ultimas[cliente.id] = ahora
+                veredicto = {'success': True, 'message': 'Asistencia registrada exitosamente'}
+            if not veredicto['success'] and not motivos[posicion]:
+                motivos[posicion] = veredicto['message']
+            if cliente is not None:
+                veredicto.update({'cliente_id': cliente.id, 'cliente_nombre': escape(cliente.nombre)})
+            veredictos[posicion] = veredicto
+
+        Asistencia.objects.bulk_create(nuevas)
+        for codigo, veredicto, motivo in zip(codigos, veredictos, motivos):
+            registrar_acceso(veredicto.get('cliente_id'), codigo, veredicto['success'], motivo, ip)
+        logger.info(f"Lote de accesos: {len(codigos)} códigos, {len(nuevas)} asistencias registradas")
+        return [{'codigo': codigo, **veredicto} for codigo, veredicto in zip(codigos, veredictos)]
@@ -1,70 +1,107 @@
-from django.db.models.signals import post_save
+from contextlib import contextmanager
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Cliente
-import uuid
+from django.db.models import F
+from .models import Cliente, Ejercicio, EjercicioRutina, RegistroProgreso, Rutina
+from .progreso import actualizar_resumenes, inicio_semana, recalcular_resumen
+from .rutinas import invalidar_rutina, invalidar_rutinas_con_ejercicio
+from .busqueda import desindexar, indexar
+from .sincronizacion_entrenador import registrar_baja, registrar_cambio
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+_bajas_en_lote = threading.local()
+
+
+@contextmanager
+def bajas_en_lote():
+    """
+    Dentro del bloque, eliminar clientes no registra la baja ni los desindexa
+    uno por uno: quien elimina lo hace en lote (ver depuracion.eliminar_clientes).
+    """
+    _bajas_en_lote.activo = True
+    try:
+        yield
+    finally:
+        _bajas_en_lote.activo = False
+
+
 @receiver(post_save, sender=Cliente)
-def crear_cliente_entrenador_app(sender, instance, created, **kwargs):
+def sincronizar_cliente_entrenador_app(sender, instance, update_fields=None, **kwargs):
     """
-    Señal que se ejecuta después de guardar un cliente en admin_app.
-    Crea automáticamente un registro correspondiente en entrenador_app.
+    Registra el cambio en el outbox dentro de la transacción del guardado; el
+    comando sincronizar_entrenador lo entrega a entrenador_app.
     """
-    if created and instance.user:  # Solo si es un nuevo cliente y tiene usuario
-        try:
-            # Intentar importar el modelo del entrenador_app
-            # Si falla, simplemente registrar el error y continuar
-            try:
-                import sys
-                import os
-                
-                # Agregar el path de entrenador_app al sys.path si no está
-                base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-                entrenador_path = os.path.join(base_dir, 'entrenador_app')
-                if entrenador_path not in sys.path:
-                    sys.path.append(entrenador_path)
-                
-                from entrenador_app.admin_gym_models import AdminGymCliente
-                
-                # Verificar si ya existe un cliente en entrenador_app para este usuario
-                if not AdminGymCliente.objects.filter(user=instance.user).exists():
-                    # Generar QR único
-                    qr_code = str(uuid.uuid4())[:20]
-                    qr_secret = str(uuid.uuid4())[:32]
-
-                    # Crear el cliente en entrenador_app
-                    AdminGymCliente.objects.create(
-                        nombre=instance.nombre,
-                        email=instance.email,
-                        telefono=instance.telefono or '',
-                        activo=instance.activo,
-                        fecha_registro=instance.fecha_registro,
-                        membresia=instance.membresia,
-                        estado_membresia=instance.estado_membresia,
-                        suspendido=instance.suspendido,
-                        qr_code=qr_code,
-                        qr_image='',
-                        rut=instance.rut,
-                        user=instance.user,
-                        facebook='',
-                        instagram='',
-                        twitter='',
-                        qr_secret=qr_secret,
-                        fecha_vencimiento=instance.fecha_vencimiento,
-                        profesor_asignado_id=instance.profesor_asignado_id if hasattr(instance, 'profesor_asignado_id') else None,
-                        foto_perfil=''
-                    )
-                    print(f"[SIGNAL] Cliente {instance.nombre} creado automáticamente en entrenador_app")
-                else:
-                    print(f"[SIGNAL] Cliente {instance.nombre} ya existe en entrenador_app")
-                    
-            except ImportError as ie:
-                print(f"[SIGNAL WARNING] No se pudo importar entrenador_app models: {ie}")
-                print(f"[SIGNAL INFO] Cliente {instance.nombre} creado solo en admin_app")
-            except Exception as inner_e:
-                print(f"[SIGNAL ERROR] Error interno creando cliente en entrenador_app: {inner_e}")
-                
-        except Exception as e:
-            print(f"[SIGNAL ERROR] Error general en signal: {e}")
+    registrar_cambio(instance, update_fields)
+
+
+@receiver(post_delete, sender=Cliente)
+def sincronizar_baja_entrenador_app(sender, instance, **kwargs):
+    if not getattr(_bajas_en_lote, 'activo', False):
+        registrar_baja(instance)
+
+
+@receiver(post_save, sender=RegistroProgreso)
+def actualizar_resumen_progreso(sender, instance, created, **kwargs):
+    """Mantiene el resumen semanal de progreso al registrar o editar una serie"""
+    if created:
+        actualizar_resumenes([instance])
+    else:
+        recalcular_resumen(instance.cliente_id, instance.ejercicio_id, inicio_semana(instance.fecha))
+
+
+@receiver(post_delete, sender=RegistroProgreso)
+def descontar_resumen_progreso(sender, instance, origin=None, **kwargs):
+    """Recalcula la semana afectada; al borrar un cliente o ejercicio su resumen se elimina en cascada"""
+    modelo_origen = getattr(origin, 'model', type(origin))
+    if modelo_origen in (Cliente, Ejercicio):
+        return
+    recalcular_resumen(instance.cliente_id, instance.ejercicio_id, inicio_semana(instance.fecha))
+
+
+@receiver(post_save, sender=EjercicioRutina)
+@receiver(post_delete, sender=EjercicioRutina)
+def versionar_rutina(sender, instance, **kwargs):
+    """Cada cambio en los ejercicios publica una nueva versión de la rutina"""
+    if isinstance(kwargs.get('origin'), Rutina):
+        return
+    version = Rutina.objects.filter(id=instance.rutina_id).values_list('version', flat=True).first()
+    Rutina.objects.filter(id=instance.rutina_id).update(version=F('version') + 1)
+    if version is not None:
+        invalidar_rutina(instance.rutina_id, version)
+
+
+@receiver(post_save, sender=Rutina)
+def invalidar_cache_rutina(sender, instance, **kwargs):
+    """Cambios de nombre, objetivo o estado de la rutina no alteran su versión"""
+    invalidar_rutina(instance.id, instance.version)
+
+
+@receiver(post_save, sender=Ejercicio)
+def invalidar_cache_ejercicio(sender, instance, created, **kwargs):
+    """
+    Editar un ejercicio no cambia la versión de las rutinas que lo usan; al
+    eliminarlo, la cascada sobre EjercicioRutina ya las versiona
+    """
+    if not created:
+        invalidar_rutinas_con_ejercicio(instance.id)
+
+
+@receiver(post_save, sender=Cliente)
+def indexar_cliente(sender, instance, **kwargs):
+    indexar('cliente', instance)
+
+
+@receiver(post_save, sender=Ejercicio)
+def indexar_ejercicio(sender, instance, **kwargs):
+    indexar('ejercicio', instance)
+
+
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Ejercicio)
+def desindexar_objeto(sender, instance, **kwargs):
+    if sender is Cliente and getattr(_bajas_en_lote, 'activo', False):
+        return
+    desindexar('cliente' if sender is Cliente else 'ejercicio', instance.pk)
@@ -0,0 +1,207 @@
+"""
+Sincronización de clientes con la app de entrenadores mediante un outbox.
+
+Cada alta, modificación o baja de un Cliente escribe un EventoSincronizacion en
+la misma transacción que el cambio (un INSERT, sin importar nada de la otra
+app). El relay (comando sincronizar_entrenador) lee los eventos pendientes en
+orden, conserva el último por cliente y los aplica en lote al modelo de la app
+de entrenadores: una consulta de existentes, un bulk_create, un bulk_update y
+un delete por lote. Si el destino no responde, los eventos quedan pendientes y
+se reintentan en la siguiente ejecución; como upserts y bajas son idempotentes,
+reentregar un lote no duplica datos. Si el destino rechaza el lote, se reintenta
+cliente por cliente para que los eventos válidos pasen; un evento rechazado
+MAX_INTENTOS veces se marca como procesado conservando su error (descartado) y
+no se purga. Debe correr un solo relay a la vez.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Cliente, EventoSincronizacion
+import sys
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Campos de Cliente que se replican; cambios solo en otros campos no generan evento
+CAMPOS_SINCRONIZADOS = (
+    'nombre', 'email', 'telefono', 'activo', 'fecha_registro', 'membresia',
+    'estado_membresia', 'suspendido', 'rut', 'user_id', 'fecha_vencimiento', 'profesor_asignado_id',
+)
+CAMPOS_DESTINO = tuple(campo for campo in CAMPOS_SINCRONIZADOS if campo != 'user_id')
+_NOMBRES_SINCRONIZADOS = {campo.removesuffix('_id') for campo in CAMPOS_SINCRONIZADOS}
+MODELO_DESTINO = 'entrenador_app.admin_gym_models.AdminGymCliente'
+MAX_INTENTOS = 5
+
+
+class DestinoNoDisponible(Exception):
+    pass
+
+
+def registrar_cambios(cliente_ids):
+    """Eventos de alta o modificación para escrituras en lote (bulk_create, bulk_update, update)"""
+    eventos = [EventoSincronizacion(cliente_id=cliente_id) for cliente_id in cliente_ids]
+    EventoSincronizacion.objects.bulk_create(eventos, batch_size=1000)
+    return len(eventos)
+
+
+def registrar_cambio(cliente, update_fields=None):
+    if update_fields is not None and not {campo.removesuffix('_id') for campo in update_fields} & _NOMBRES_SINCRONIZADOS:
+        return
+    EventoSincronizacion.objects.create(cliente_id=cliente.pk)
+
+
+def registrar_baja(cliente):
+    EventoSincronizacion.objects.create(cliente_id=cliente.pk, user_id=cliente.user_id, tipo='baja')
+
+
+def registrar_bajas(clientes):
+    """Eventos de baja para eliminaciones en lote; clientes son pares (cliente_id, user_id)"""
+    EventoSincronizacion.objects.bulk_create(
+        [EventoSincronizacion(cliente_id=cliente_id, user_id=user_id, tipo='baja') for cliente_id, user_id in clientes],
+        batch_size=1000,
+    )
+
+
+def modelo_destino():
+    """Importa el modelo de clientes de la app de entrenadores (solo en el relay)"""
+    ruta = getattr(settings, 'ENTRENADOR_APP_RUTA', None)
+    if ruta and str(ruta) not in sys.path:
+        sys.path.append(str(ruta))
+    try:
+        return import_string(getattr(settings, 'ENTRENADOR_APP_MODELO_CLIENTE', MODELO_DESTINO))
+    except ImportError as e:
+        raise DestinoNoDisponible(f"No se pudo importar el modelo de la app de entrenadores: {e}") from e
+
+
+def _datos(cliente):
+    return {campo: cliente[campo] for campo in CAMPOS_DESTINO}
+
+
+def _aplicar(modelo, cliente_ids, bajas):
+    """Eliminación de los usuarios dados de baja y upserts por usuario de los clientes indicados"""
+    # Primero las bajas: un usuario puede haber pasado de un cliente eliminado a uno nuevo
+    eliminados = modelo.objects.filter(user_id__in=bajas).delete()[0] if bajas else 0
+    clientes = {
+        cliente['user_id']: cliente
+        for cliente in Cliente.objects.filter(id__in=cliente_ids, user__isnull=False).values(*CAMPOS_SINCRONIZADOS)
+    }
+    existentes = dict(modelo.objects.filter(user_id__in=list(clientes)).values_list('user_id', 'id'))
+
+    nuevos, cambios = [], []
+    for user_id, cliente in clientes.items():
+        if user_id in existentes:
+            cambios.append(modelo(id=existentes[user_id], **_datos(cliente)))
+        else:
+            # Los campos propios de la app de entrenadores solo se inicializan en el alta
+            nuevos.append(modelo(
+                user_id=user_id,
+                qr_code=str(uuid.uuid4())[:20],
+                qr_secret=str(uuid.uuid4())[:32],
+                qr_image='',
+                facebook='',
+                instagram='',
+                twitter='',
+                foto_perfil='',
+                **_datos(cliente),
+            ))
+
+    modelo.objects.bulk_create(nuevos)
+    if cambios:
+        modelo.objects.bulk_update(cambios, CAMPOS_DESTINO)
+    return {'creados': len(nuevos), 'actualizados': len(cambios), 'eliminados': eliminados}
+
+
+def _aplicar_por_cliente(modelo, eventos, resumen):
+    """Reintenta un lote rechazado de a un cliente; solo los eventos que fallan solos quedan pendientes"""
+    por_cliente = {}
+    for evento_id, cliente_id, user_id, tipo in eventos:
+        ids, _, _ = por_cliente.get(cliente_id, ([], None, None))
+        por_cliente[cliente_id] = (ids + [evento_id], user_id, tipo)
+
+    for cliente_id, (ids, user_id, tipo) in por_cliente.items():
+        try:
+            with transaction.atomic(using=router.db_for_write(modelo)):
+                aplicado = _aplicar(
+                    modelo, [cliente_id] if tipo == 'upsert' else [], [user_id] if tipo == 'baja' and user_id else []
+                )
+        except (OperationalError, InterfaceError):
+            raise
+        except Exception as e:
+            eventos_cliente = EventoSincronizacion.objects.filter(id__in=ids)
+            eventos_cliente.update(intentos=F('intentos') + 1, error=str(e)[:200])
+            if eventos_cliente.filter(intentos__gte=MAX_INTENTOS).update(procesado=timezone.now()):
+                logger.error(f"Eventos del cliente {cliente_id} descartados tras {MAX_INTENTOS} intentos: {e}")
+                resumen['descartados'] += len(ids)
+            else:
+                resumen['fallidos'] += len(ids)
+            continue
+        EventoSincronizacion.objects.filter(id__in=ids).update(procesado=timezone.now(), error='')
+        resumen['eventos'] += len(ids)
+        for clave, valor in aplicado.items():
+            resumen[clave] += valor
+
+
+def sincronizar(tamano_lote=500, modelo=None):
+    """
+    Entrega los eventos pendientes; retorna el resumen. Si el destino no responde
+    el lote queda pendiente (con el error registrado) y se relanza; si lo rechaza,
+    se reintenta cliente por cliente y los eventos que fallan quedan para la
+    siguiente ejecución, o descartados tras MAX_INTENTOS.
+    """
+    modelo = modelo or modelo_destino()
+    resumen = {'eventos': 0, 'creados': 0, 'actualizados': 0, 'eliminados': 0, 'fallidos': 0, 'descartados': 0}
+    ultimo_id = 0
+    while True:
+        # Por clave: los eventos que siguen pendientes tras fallar no se releen en esta ejecución
+        eventos = list(
+            EventoSincronizacion.objects.filter(procesado__isnull=True, id__gt=ultimo_id)
+            .order_by('id')
+            .values_list('id', 'cliente_id', 'user_id', 'tipo')[:tamano_lote]
+        )
+        if not eventos:
+            break
+        ultimo_id = eventos[-1][0]
+
+        # Solo cuenta el último evento de cada cliente: el estado actual se lee de la base
+        ultimo = {cliente_id: (user_id, tipo) for _, cliente_id, user_id, tipo in eventos}
+        upserts = [cliente_id for cliente_id, (_, tipo) in ultimo.items() if tipo == 'upsert']
+        bajas = [user_id for user_id, tipo in ultimo.values() if tipo == 'baja' and user_id]
+        ids = [evento[0] for evento in eventos]
+
+        try:
+            with transaction.atomic(using=router.db_for_write(modelo)):
+                aplicado = _aplicar(modelo, upserts, bajas)
+        except (OperationalError, InterfaceError) as e:
+            EventoSincronizacion.objects.filter(id__in=ids).update(error=str(e)[:200])
+            logger.error(f"Error sincronizando {len(ids)} eventos con la app de entrenadores: {e}")
+            raise
+        except Exception as e:
+            logger.warning(f"La app de entrenadores rechazó un lote de {len(ids)} eventos, se reintenta por cliente: {e}")
+            _aplicar_por_cliente(modelo, eventos, resumen)
+            continue
+
+        EventoSincronizacion.objects.filter(id__in=ids).update(procesado=timezone.now(), error='')
+        resumen['eventos'] += len(ids)
+        for clave, valor in aplicado.items():
+            resumen[clave] += valor
+
+    if resumen['eventos'] or resumen['fallidos'] or resumen['descartados']:
+        logger.info(f"Sincronización con la app de entrenadores: {resumen}")
+    return resumen
+
+
+def purgar_eventos(dias=7, tamano_lote=5000):
+    """Elimina por lotes los eventos ya entregados hace más de dias días; los descartados se conservan"""
+    limite = timezone.now() - timedelta(days=dias)
+    eliminados = 0
+    while True:
+        ids = list(
+            EventoSincronizacion.objects.filter(procesado__lt=limite, error='').values_list('id', flat=True)[:tamano_lote]
+        )
+        if not ids:
+            return eliminados
+        eliminados += EventoSincronizacion.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,72 @@
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from .archivo_historico import archivar
+from .models import Asistencia, AuditoriaEvento, Cliente
+from .respaldos import crear_respaldo
+from .restauracion import restaurar
+import sqlite3
+import tempfile
+
+
+class RespaldoDiferencialTests(TransactionTestCase):
+    """Un diferencial restaurado sobre su base reproduce también las filas eliminadas después del completo"""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('El respaldo de prueba usa el volcado SQLite')
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.directorio = Path(temporal.name)
+        self.base_datos = self.directorio / 'gym.sqlite3'
+        alias = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(self.base_datos)}
+        parche = mock.patch.dict(settings.DATABASES, {'respaldo': alias})
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _respaldar(self, diferencial=False):
+        # La base de pruebas vive en memoria: se respalda una copia en archivo
+        self.base_datos.unlink(missing_ok=True)
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM INTO %s', [str(self.base_datos)])
+        return crear_respaldo(self.directorio / 'respaldos', diferencial=diferencial, compresion='gzip', alias='respaldo')
+
+    def _asistencia(self, cliente, dias):
+        asistencia = Asistencia.objects.create(cliente=cliente)
+        Asistencia.objects.filter(pk=asistencia.pk).update(fecha=timezone.now() - timedelta(days=dias))
+
+    def test_diferencial_reproduce_archivado_y_cascadas(self):
+        ana = Cliente.objects.create(rut='11111111-1', nombre='Ana', email='ana@example.com')
+        beto = Cliente.objects.create(rut='22222222-2', nombre='Beto', email='beto@example.com')
+        for dias in (400, 401, 402, 403, 404, 1, 2):
+            self._asistencia(ana, dias)
+        self._asistencia(beto, 3)
+        usuario = User.objects.create(username='recepcion')
+        AuditoriaEvento.objects.create(usuario=usuario, tipo_evento='login', descripcion='Inicio de sesión')
+        completo = self._respaldar()
+
+        with override_settings(ARCHIVO_HISTORICO_DIR=self.directorio / 'archivo'):
+            self.assertEqual(archivar('asistencia', dias=365), 5)
+        beto.delete()
+        usuario.delete()
+        self._asistencia(ana, 0)
+        diferencial = self._respaldar(diferencial=True)
+        self.assertEqual(diferencial['base'], completo['archivo'])
+
+        destino = self.directorio / 'restaurada.sqlite3'
+        reporte = restaurar(self.directorio / 'respaldos' / diferencial['archivo'], destino=destino)
+        self.assertEqual(reporte['diferencias'], [])
+        with sqlite3.connect(destino) as restaurada:
+            filas = restaurada.execute('SELECT cliente_id FROM admin_gym_asistencia').fetchall()
+            usuarios = restaurada.execute('SELECT usuario_id FROM admin_gym_auditoriaevento').fetchall()
+            archivadas = restaurada.execute(
+                "SELECT SUM(cantidad) FROM admin_gym_resumenarchivado WHERE tabla = 'asistencia'"
+            ).fetchone()[0]
+        self.assertEqual(filas, [(ana.pk,)] * 3)
+        self.assertEqual(usuarios, [(None,)])
+        self.assertEqual(archivadas, 5)
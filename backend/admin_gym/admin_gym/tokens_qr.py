@@ -0,0 +1,77 @@
+"""
+Tokens QR rotativos firmados con HMAC.
+
+Formato: G1.<cliente_id>.<paso>.<firma>, donde paso es el número de ventana de
+PERIODO segundos (como en TOTP) y firma son 96 bits de HMAC-SHA256 sobre
+cliente y paso con una clave derivada de SECRET_KEY. El lector verifica firma
+y vigencia solo con CPU, antes de tocar la base de datos: los códigos
+falsificados o vencidos se rechazan sin consultas.
+"""
+from django.conf import settings
+from functools import lru_cache
+import base64
+import hashlib
+import hmac
+import time
+
+PREFIJO = 'G1'
+PERIODO = 30             # segundos por paso
+PASOS_TOLERADOS = 2      # pasos anteriores aceptados (pantalla abierta, relojes desfasados)
+BYTES_FIRMA = 12         # 16 caracteres en base64url
+
+
+class TokenInvalido(ValueError):
+    pass
+
+
+@lru_cache(maxsize=8)
+def _mac_base(secreto):
+    # Clave propia de los tokens QR, independiente de otros usos de SECRET_KEY
+    clave = hashlib.sha256(f'admin_gym.tokens_qr:{secreto}'.encode()).digest()
+    return hmac.new(clave, digestmod=hashlib.sha256)
+
+
+def _firma(cliente_id, paso, secreto):
+    mac = _mac_base(secreto).copy()
+    mac.update(f'{cliente_id}.{paso}'.encode())
+    return base64.urlsafe_b64encode(mac.digest()[:BYTES_FIRMA]).decode()
+
+
+def paso_actual(instante=None):
+    return int((time.time() if instante is None else instante) // PERIODO)
+
+
+def generar_token(cliente_id, instante=None):
+    paso = paso_actual(instante)
+    return f'{PREFIJO}.{cliente_id}.{paso}.{_firma(cliente_id, paso, settings.SECRET_KEY)}'
+
+
+def segundos_restantes(instante=None):
+    """Segundos hasta que el token generado ahora cambie"""
+    instante = time.time() if instante is None else instante
+    return PERIODO - int(instante % PERIODO)
+
+
+def es_token(codigo):
+    return codigo.startswith(PREFIJO + '.')
+
+
+def verificar_token(codigo, instante=None):
+    """Retorna el id del cliente o lanza TokenInvalido; no accede a la base de datos"""
+    partes = codigo.split('.')
+    if len(partes) != 4 or partes[0] != PREFIJO:
+        raise TokenInvalido('Código QR no válido')
+    _, cliente, paso, firma = partes
+    if not (cliente.isascii() and cliente.isdigit() and paso.isascii() and paso.isdigit()):
+        raise TokenInvalido('Código QR no válido')
+    cliente_id, paso = int(cliente), int(paso)
+
+    # Las claves anteriores (SECRET_KEY_FALLBACKS) siguen validando durante una rotación
+    secretos = [settings.SECRET_KEY, *getattr(settings, 'SECRET_KEY_FALLBACKS', [])]
+    if not any(hmac.compare_digest(firma, _firma(cliente_id, paso, secreto)) for secreto in secretos):
+        raise TokenInvalido('Código QR no válido')
+
+    actual = paso_actual(instante)
+    if paso < actual - PASOS_TOLERADOS or paso > actual + 1:
+        raise TokenInvalido('QR expirado')
+    return cliente_id
@@ -8,6 +8,7 @@ urlpatterns = [
     path('sesiones/', views.sesiones, name='sesiones'),
     path('pagos/', views.pagos, name='pagos'),
     path('reportes/', views.reportes, name='reportes'),
+    path('reportes/analitica/', views.reportes_analitica, name='reportes_analitica'),
     path('configuracion/', views.configuracion, name='configuracion'),
     path('usuario/<int:usuario_id>/', views.usuario_detalle, name='usuario_detalle'),
     path('usuario/<int:usuario_id>/marcar-asistencia/', views.marcar_asistencia, name='marcar_asistencia'),
@@ -20,10 +21,21 @@ urlpatterns = [
     path('avisar-pago/<int:pago_id>/', views.avisar_pago, name='avisar_pago'),
     path('marcar-pagado/<int:pago_id>/', views.marcar_pagado, name='marcar_pagado'),
     path('marcar-vencido/<int:pago_id>/', views.marcar_vencido, name='marcar_vencido'),
+    path('pagos/lote/', views.marcar_pagos_lote, name='marcar_pagos_lote'),
     path('scanner-qr/', views.scanner_qr, name='scanner_qr'),
     path('api/validar-qr/', views.validar_qr_api, name='validar_qr_api'),
+    path('api/validar-qr/lote/', views.validar_qr_lote_api, name='validar_qr_lote_api'),
+    path('api/clientes/<int:cliente_id>/accesos/', views.accesos_cliente_api, name='accesos_cliente_api'),
+    path('api/mi-qr/', views.mi_qr_api, name='mi_qr_api'),
     path('api/asistencias-hoy/', views.asistencias_hoy_api, name='asistencias_hoy_api'),
     path('api/dashboard-stats/', views.dashboard_stats_api, name='dashboard_stats_api'),
+    path('api/progreso/<int:cliente_id>/', views.progreso_cliente_api, name='progreso_cliente_api'),
+    path('api/progreso/lote/', views.registrar_progreso_lote_api, name='registrar_progreso_lote_api'),
+    path('api/rutinas/<int:plantilla_id>/asignar/', views.asignar_plantilla_api, name='asignar_plantilla_api'),
+    path('api/clientes/<int:cliente_id>/rutinas/', views.rutinas_cliente_api, name='rutinas_cliente_api'),
+    path('api/buscar/', views.buscar_api, name='buscar_api'),
+    path('api/clientes/<int:cliente_id>/qr.<str:formato>', views.qr_cliente, name='qr_cliente'),
+    path('api/socios/importar/', views.importar_socios_api, name='importar_socios_api'),
     path('reportes/exportar/pdf/', views.exportar_reporte_pdf, name='exportar_reporte_pdf'),
     path('reportes/exportar/excel/', views.exportar_reporte_excel, name='exportar_reporte_excel'),
     path('test-tailwind/', lambda request: render(request, 'admin_gym/test_tailwind.html'), name='test_tailwind'),
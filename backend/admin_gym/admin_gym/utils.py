@@ -1,32 +1,6 @@
 def validar_rut(rut):
-    # Elimina puntos, guiones y espacios
-    rut = rut.upper().replace('.', '').replace('-', '').replace(' ', '')
-    if len(rut) < 2:
-        return False
-    numero = rut[:-1]
-    dv = rut[-1]
-    if not numero.isdigit():
-        return False
-    
-    suma = 0
-    multiplicador = 2
-    for c in reversed(numero):
-        suma += int(c) * multiplicador
-        multiplicador += 1
-        if multiplicador > 7:
-            multiplicador = 2
-    
-    resto = suma % 11
-    dv_calculado = 11 - resto
-    
-    if dv_calculado == 11:
-        dv_final = '0'
-    elif dv_calculado == 10:
-        dv_final = 'K'
-    else:
-        dv_final = str(dv_calculado)
-    
-    return dv == dv_final
+    """Indica si el RUT es válido, con las mismas reglas que descomponer_rut"""
+    return descomponer_rut(rut) is not None
 
 def formatear_rut(rut):
     """
@@ -41,31 +15,16 @@ def formatear_rut(rut):
     if len(rut_limpio) < 2:
         return rut
     
-    # Separar número y dígito verificador
+    # Separar número y dígito verificador, y agrupar el número de a tres desde la derecha
     numero = rut_limpio[:-1]
     dv = rut_limpio[-1]
-    
-    # Formatear con puntos
-    numero_formateado = ""
-    for i, digit in enumerate(reversed(numero)):
-        if i > 0 and i % 3 == 0:
-            numero_formateado = "." + numero_formateado
-        numero_formateado = digit + numero_formateado
-    
-    return f"{numero_formateado}-{dv}"
+    grupos = [numero[max(i - 3, 0):i] for i in range(len(numero), 0, -3)]
+    return f"{'.'.join(reversed(grupos))}-{dv}"
 
 def calcular_dv(numero):
     """Calcula el dígito verificador de un RUT"""
-    suma = 0
-    multiplicador = 2
-    for c in reversed(str(numero)):
-        suma += int(c) * multiplicador
-        multiplicador += 1
-        if multiplicador > 7:
-            multiplicador = 2
-    
-    resto = suma % 11
-    dv_calculado = 11 - resto
+    suma = sum(int(c) * (2 + i % 6) for i, c in enumerate(reversed(str(numero))))
+    dv_calculado = 11 - suma % 11
     
     if dv_calculado == 11:
         return '0'
@@ -78,4 +37,249 @@ def generar_password_temporal():
     """Genera una contraseña temporal de 6 caracteres"""
     import random
     import string
-    return ''.join(random.choices(string.ascii_letters + string.digits, k=6))
\ No newline at end of file
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=6))
+
+# Meses de vigencia por plan de membresía (claves de Cliente.TIPOS_MEMBRESIA)
+MESES_POR_PLAN = {
+    'anual': 12,
+    '6m': 6,
+    '3m': 3,
+}
+
+# Reglas compartidas por descomponer_rut y validar_ruts: caracteres que se ignoran en
+# cualquier posición y cuerpo de a lo sumo 8 dígitos significativos (los ceros a la
+# izquierda no cuentan), que cabe en rut_numero (INT) y su forma canónica en rut (max_length=12)
+SEPARADORES_RUT = '.- \t\r\n'
+MAX_DIGITOS_RUT = 8
+
+def normalizar_rut(rut):
+    """Normaliza un RUT a su forma compacta sin puntos ni guion (ej: 12345678K)"""
+    if not rut:
+        return ''
+    return str(rut).upper().translate(str.maketrans('', '', SEPARADORES_RUT))
+
+def descomponer_rut(rut):
+    """
+    Separa un RUT en cuerpo numérico y dígito verificador aceptando cualquier
+    formato (12.345.678-5, 12345678-5, 123456785). Retorna (numero, dv) o None si es inválido.
+    """
+    rut = normalizar_rut(rut)
+    cuerpo = rut[:-1]
+    if len(rut) < 2 or not (cuerpo.isascii() and cuerpo.isdigit()):
+        return None
+    if len(cuerpo.lstrip('0')) > MAX_DIGITOS_RUT:
+        return None
+    numero = int(cuerpo)
+    if numero == 0 or calcular_dv(numero) != rut[-1]:
+        return None
+    return numero, rut[-1]
+
+def componer_rut(numero, dv):
+    """Forma canónica de un RUT: 12.345.678-5"""
+    return f"{numero:,}".replace(',', '.') + f"-{dv}"
+
+# --- RUT en lote (NumPy) ---
+# Los RUT se tratan como una matriz de códigos de carácter (una fila por RUT),
+# de modo que limpieza, dígito verificador y formato son operaciones por columna.
+ANCHO_RUT_FORMATEADO = 14   # 8 dígitos + 2 puntos + guion + dv, con holgura
+CODIGOS_SEPARADORES = [0] + [ord(c) for c in SEPARADORES_RUT]   # 0: relleno de los textos más cortos
+
+def _codigos_dv(np, numeros):
+    """Código de carácter del dígito verificador de cada número (0-9 o K)"""
+    numeros = np.asarray(numeros, dtype=np.int64)
+    suma = np.zeros(len(numeros), dtype=np.int64)
+    resto = numeros.copy()
+    for posicion in range(MAX_DIGITOS_RUT + 1):
+        suma += (resto % 10) * (2 + posicion % 6)
+        resto //= 10
+    dv = 11 - suma % 11
+    return np.where(dv == 11, ord('0'), np.where(dv == 10, ord('K'), ord('0') + dv)).astype(np.uint32)
+
+def _validar_ruts_np(np, ruts):
+    textos = np.array(['' if r is None else str(r) for r in ruts], dtype=str)
+    n = len(textos)
+    ancho = max(textos.dtype.itemsize // 4, 1)
+    # Traspuesta contigua: cada columna (posición de carácter) es un vector continuo
+    columnas = np.ascontiguousarray(np.ascontiguousarray(textos).view(np.uint32).reshape(n, ancho).T)
+
+    # Recorrido por columnas: cada carácter útil incorpora el anterior al cuerpo,
+    # de modo que al final 'previo' queda con el dígito verificador
+    numeros = np.zeros(n, dtype=np.int64)
+    largo = np.zeros(n, dtype=np.int64)
+    previo = np.zeros(n, dtype=np.uint32)
+    validos = np.ones(n, dtype=bool)
+    for columna in columnas:
+        digito = (columna >= ord('0')) & (columna <= ord('9'))
+        letra_k = (columna == ord('K')) | (columna == ord('k'))
+        util = digito | letra_k
+        separador = np.isin(columna, CODIGOS_SEPARADORES)
+        validos &= util | separador
+
+        avanza = util & (previo != 0)
+        validos &= ~(avanza & (previo == ord('K')))   # K solo puede ser dígito verificador
+        # Solo cuentan los dígitos significativos; pasado el máximo se deja de acumular
+        # para que el cuerpo no desborde int64
+        acumula = avanza & (largo <= MAX_DIGITOS_RUT)
+        numeros = np.where(acumula, numeros * 10 + (previo.astype(np.int64) - ord('0')), numeros)
+        largo += avanza & (numeros > 0)
+        previo = np.where(util, np.where(letra_k, ord('K'), columna), previo).astype(np.uint32)
+
+    validos &= (largo <= MAX_DIGITOS_RUT) & (numeros > 0)
+    validos &= previo == _codigos_dv(np, np.where(validos, numeros, 0))
+    numeros = np.where(validos, numeros, 0)
+    dvs = np.where(validos, previo, 0).astype(np.uint32).view('U1')
+    return validos, numeros, dvs
+
+def validar_ruts(ruts):
+    """
+    Valida y descompone una secuencia de RUT en cualquier formato en una sola pasada.
+    Retorna (validos, numeros, dvs): máscara booleana, cuerpo numérico (0 si es
+    inválido) y dígito verificador ('' si es inválido). Son arreglos NumPy si está
+    instalado y listas en su defecto.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        partes = [descomponer_rut(r) for r in ruts]
+        return ([p is not None for p in partes], [p[0] if p else 0 for p in partes], [p[1] if p else '' for p in partes])
+    return _validar_ruts_np(np, ruts)
+
+def _formatear_ruts_np(np, numeros, dvs, puntos):
+    numeros = np.asarray(numeros, dtype=np.int64)
+    n, ancho = len(numeros), ANCHO_RUT_FORMATEADO
+    dv_codigos = np.asarray(dvs, dtype='U1').view(np.uint32).reshape(n)
+    digitos = 1 + sum((numeros >= 10 ** k).astype(np.int64) for k in range(1, MAX_DIGITOS_RUT + 1))
+    largo = digitos + ((digitos - 1) // 3 if puntos else 0) + 2
+
+    # Se arma alineado a la derecha columna por columna: dv, guion y luego el cuerpo
+    derecha = np.zeros((n, ancho), dtype=np.uint32)
+    derecha[:, -1] = dv_codigos
+    derecha[:, -2] = ord('-')
+    resto = numeros.copy()
+    for q in range(ancho - 2):
+        if puntos and q % 4 == 3:
+            caracter = np.uint32(ord('.'))
+        else:
+            caracter = (resto % 10 + ord('0')).astype(np.uint32)
+            resto //= 10
+        derecha[:, ancho - 3 - q] = np.where(q + 2 < largo, caracter, 0)
+
+    # Alinear a la izquierda por largo (a lo sumo unos pocos largos distintos);
+    # los ceros finales desaparecen al ver la fila como texto
+    izquierda = np.zeros_like(derecha)
+    for valor in np.unique(largo[numeros > 0]):
+        filas = (largo == valor) & (numeros > 0)
+        izquierda[filas, :valor] = derecha[filas, ancho - valor:]
+    return izquierda.view(f'U{ancho}').reshape(n)
+
+def formatear_ruts(numeros, dvs, puntos=True):
+    """
+    Forma canónica (12.345.678-5, o 12345678-5 con puntos=False) de cuerpos
+    numéricos y dígitos verificadores, p.ej. los que retorna validar_ruts.
+    Los números en 0 producen ''.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return [
+            (componer_rut(n, dv) if puntos else f"{n}-{dv}") if n else ''
+            for n, dv in zip(numeros, dvs)
+        ]
+    return _formatear_ruts_np(np, numeros, dvs, puntos)
+
+def calcular_dvs(numeros):
+    """Dígitos verificadores de una secuencia de cuerpos numéricos"""
+    try:
+        import numpy as np
+    except ImportError:
+        return [calcular_dv(n) for n in numeros]
+    return _codigos_dv(np, numeros).view('U1')
+
+def sumar_meses(fecha, meses):
+    """Agregar meses a una fecha manejando fin de mes correctamente."""
+    return calcular_vencimientos([fecha], [meses])[0]
+
+def calcular_vencimientos(fechas, meses):
+    """
+    Calcula en lote las fechas de vencimiento sumando meses a cada fecha.
+    `meses` puede ser una secuencia paralela a `fechas` o un entero común.
+    Trabaja con aritmética entera sobre índices de mes absolutos, sin
+    construir fechas intermedias, y ajusta el día al último del mes destino.
+    """
+    import calendar
+    from datetime import date
+
+    if isinstance(meses, int):
+        meses = [meses] * len(fechas)
+
+    ultimo_dia = {}
+    resultado = []
+    for fecha, n in zip(fechas, meses):
+        indice = fecha.year * 12 + (fecha.month - 1) + n
+        year, month = divmod(indice, 12)
+        month += 1
+        if (year, month) not in ultimo_dia:
+            ultimo_dia[(year, month)] = calendar.monthrange(year, month)[1]
+        resultado.append(date(year, month, min(fecha.day, ultimo_dia[(year, month)])))
+    return resultado
+
+def calcular_vencimiento_plan(fecha, plan):
+    """Vencimiento de una membresía según su plan (1 año si el plan no se reconoce)"""
+    return sumar_meses(fecha, MESES_POR_PLAN.get(plan, 12))
+
+def en_lotes(iterable, tamano):
+    """Recorre cualquier iterable en listas de a lo sumo tamano elementos"""
+    from itertools import islice
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+def codificar_cursor(fecha, pk):
+    """Cursor opaco para paginación por clave (fecha, id)"""
+    import base64
+    return base64.urlsafe_b64encode(f"{fecha.isoformat()}|{pk}".encode()).decode()
+
+def decodificar_cursor(cursor):
+    """Devuelve (fecha, id) desde un cursor, o None si es inválido"""
+    import base64
+    from datetime import datetime
+    try:
+        fecha, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(fecha), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def paginar_keyset(queryset, campo_fecha, despues=None, antes=None, tamano=25):
+    """
+    Paginación por clave (seek) sobre (campo_fecha, id), de más reciente a más antiguo.
+    A diferencia de OFFSET, el costo de cada página no crece con el tamaño de la tabla.
+    Retorna (items, cursor_siguiente, cursor_anterior).
+    """
+    from django.db.models import Q
+
+    posicion = decodificar_cursor(despues or antes or '')
+    hacia_atras = posicion is not None and not despues
+    if posicion:
+        fecha, pk = posicion
+        if hacia_atras:
+            filtro = Q(**{f'{campo_fecha}__gt': fecha}) | Q(**{campo_fecha: fecha, 'id__gt': pk})
+        else:
+            filtro = Q(**{f'{campo_fecha}__lt': fecha}) | Q(**{campo_fecha: fecha, 'id__lt': pk})
+        queryset = queryset.filter(filtro)
+
+    orden = [campo_fecha, 'id'] if hacia_atras else [f'-{campo_fecha}', '-id']
+    items = list(queryset.order_by(*orden)[:tamano + 1])
+    hay_mas = len(items) > tamano
+    items = items[:tamano]
+    if hacia_atras:
+        items.reverse()
+
+    if not items:
+        return items, None, None
+    primero, ultimo = items[0], items[-1]
+    siguiente = codificar_cursor(getattr(ultimo, campo_fecha), ultimo.pk) if (hay_mas or hacia_atras) else None
+    anterior = codificar_cursor(getattr(primero, campo_fecha), primero.pk) if (posicion and (hay_mas or not hacia_atras)) else None
+    return items, siguiente, anterior
@@ -6,22 +6,39 @@ from django.contrib.auth.models import User
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.core.mail import send_mail
-from django.http import HttpResponse, JsonResponse
-from django.db.models import Sum
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.db.models import Sum, Count
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.html import escape
 from django.core.exceptions import ValidationError
-from .models import Cliente, Profesor, Sesion, Asistencia, Pago, PerfilUsuario
+from .models import AccesoQR, Cliente, Profesor, Sesion, Asistencia, Pago, PerfilUsuario, ResumenMensualAcceso, Rutina
 from .forms import ClienteForm, ProfesorForm, SesionForm, PagoForm
+from .utils import calcular_vencimiento_plan, paginar_keyset
+from .services import HORAS_ENTRE_ASISTENCIAS, MAX_CODIGOS_LOTE, AccesoService, PagoService, ProgresoService, RutinaService
+from .progreso import serie_progreso
+from .rutinas import rutinas_activas
+from .busqueda import buscar_objetos
+from .notifications import ASUNTO_CREDENCIALES, mensaje_credenciales
+from .alta_masiva import AltaMasivaSocios
+from .importacion_pagos import leer_csv
+from .codigos_qr import huella, renderizar_png, renderizar_svg
+from .tokens_qr import PERIODO, TokenInvalido, generar_token, segundos_restantes
+from .registro_accesos import registrar_acceso
+from .middleware import sin_renovar_sesion
 import csv
+import io
 import json
 import logging
 from datetime import timedelta
-import calendar
-from datetime import date
+from datetime import date, datetime
+from urllib.parse import urlencode
 
 logger = logging.getLogger(__name__)
 
+PAGOS_POR_PAGINA = 50
+ACCESOS_POR_PAGINA = 100
+
 # --- Autenticación ---
 def custom_login(request):
     if request.method == 'POST':
@@ -75,6 +92,12 @@ def es_admin(user):
     except PerfilUsuario.DoesNotExist:
         return False
 
+def es_personal(user):
+    """Administradores, recepción y entrenadores"""
+    if es_admin(user):
+        return True
+    return PerfilUsuario.objects.filter(user=user, activo=True, rol='entrenador').exists()
+
 def crear_usuario(nombre, email, rut, rol='cliente'):
     from .utils import validar_rut, formatear_rut, generar_password_temporal
     
@@ -118,22 +141,8 @@ def crear_usuario(nombre, email, rut, rol='cliente'):
     
     # Enviar credenciales por email
     try:
-        asunto = "Credenciales de acceso - Fitspace "
-        mensaje = f"""
-Hola {nombre},
-
-Tus credenciales de acceso al sistema Fitspace son:
-
-Usuario (RUT): {rut_formateado}
-Contraseña temporal: {password}
-
-Por favor, cambia tu contraseña en el primer inicio de sesión.
-
-URL de acceso: 
-
-Saludos,
-Equipo Fitspace
-        """
+        asunto = ASUNTO_CREDENCIALES
+        mensaje = mensaje_credenciales(nombre, rut_formateado, password)
         
         send_mail(
             asunto,
@@ -211,12 +220,39 @@ def usuarios(request):
     else:
         form = ClienteForm()
 
-    clientes = Cliente.objects.all()
+    q = request.GET.get('q', '').strip()
+    clientes = buscar_objetos(q, 'cliente', limite=100) if q else Cliente.objects.all()
     hoy = timezone.now().date()
     for usuario in clientes:
         usuario.asistio_hoy = Asistencia.objects.filter(cliente=usuario, fecha__date=hoy).exists()
 
-    return render(request, 'admin_gym/usuarios.html', {'form': form, 'usuarios': clientes})
+    return render(request, 'admin_gym/usuarios.html', {'form': form, 'usuarios': clientes, 'q': q})
+
+@login_required
+@user_passes_test(es_admin)
+def importar_socios_api(request):
+    """
+    Alta masiva de socios desde una planilla CSV subida en el campo 'archivo'.
+    Las contraseñas no se hashean en la petición: las credenciales quedan
+    pendientes y las asigna y envía el comando enviar_credenciales.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Método no permitido'}, status=405)
+    archivo = request.FILES.get('archivo')
+    if archivo is None:
+        return JsonResponse({'success': False, 'message': 'Adjunte la planilla en el campo archivo'}, status=400)
+
+    alta = AltaMasivaSocios(
+        dry_run=request.POST.get('dry_run') == '1',
+        omitir_invalidas=request.POST.get('omitir_invalidas') == '1',
+    )
+    try:
+        reporte = alta.importar(leer_csv(io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline='')))
+    except UnicodeDecodeError:
+        return JsonResponse({'success': False, 'message': 'La planilla debe estar codificada en UTF-8'}, status=400)
+
+    exito = reporte['creadas'] > 0 or (alta.dry_run and reporte['validas'] > 0)
+    return JsonResponse({'success': exito, **reporte}, status=201 if reporte['creadas'] else 200 if exito else 400)
 
 @login_required
 @user_passes_test(es_admin)
@@ -371,31 +407,7 @@ def pagos(request):
 
             # Fecha de inicio para el cálculo (usar fecha de pago actual si no hay otra)
             inicio = date.today()
-
-            def add_months(d, months):
-                """Agregar meses a una fecha manejando fin de mes correctamente."""
-                year = d.year + (d.month - 1 + months) // 12
-                month = (d.month - 1 + months) % 12 + 1
-                day = d.day
-                # Obtener último día del mes destino
-                last_day = calendar.monthrange(year, month)[1]
-                if day > last_day:
-                    day = last_day
-                return date(year, month, day)
-
-            # Mapear planes a meses
-            meses_por_plan = {
-                'anual': 12,
-                '6m': 6,
-                '3m': 3,
-            }
-
-            meses = meses_por_plan.get(pago.plan, 0)
-            if meses > 0:
-                venc = add_months(inicio, meses)
-            else:
-                # Si no se reconoce el plan, usar 1 año por defecto
-                venc = add_months(inicio, 12)
+            venc = calcular_vencimiento_plan(inicio, pago.plan)
 
             pago.vencimiento = venc
             pago.save()
@@ -404,8 +416,68 @@ def pagos(request):
     else:
         form = PagoForm()
     
-    pagos = Pago.objects.select_related('cliente').all()
-    return render(request, 'admin_gym/pagos.html', {'form': form, 'pagos': pagos})
+    # Filtros
+    filtros = {
+        'estado': request.GET.get('estado', ''),
+        'plan': request.GET.get('plan', ''),
+        'desde': request.GET.get('desde', ''),
+        'hasta': request.GET.get('hasta', ''),
+    }
+    pagos_filtrados = Pago.objects.all()
+    if filtros['estado']:
+        pagos_filtrados = pagos_filtrados.filter(estado=filtros['estado'])
+    if filtros['plan']:
+        pagos_filtrados = pagos_filtrados.filter(plan=filtros['plan'])
+    try:
+        if filtros['desde']:
+            desde = date.fromisoformat(filtros['desde'])
+            pagos_filtrados = pagos_filtrados.filter(
+                fecha_pago__gte=timezone.make_aware(datetime.combine(desde, datetime.min.time()))
+            )
+        if filtros['hasta']:
+            hasta = date.fromisoformat(filtros['hasta']) + timedelta(days=1)
+            pagos_filtrados = pagos_filtrados.filter(
+                fecha_pago__lt=timezone.make_aware(datetime.combine(hasta, datetime.min.time()))
+            )
+    except ValueError:
+        messages.error(request, "Rango de fechas inválido.")
+
+    # Totales por estado en una sola consulta agregada
+    totales = {
+        fila['estado']: fila
+        for fila in pagos_filtrados.order_by().values('estado').annotate(cantidad=Count('id'), total=Sum('monto'))
+    }
+    resumen_estados = [
+        {
+            'estado': estado,
+            'cantidad': totales.get(estado, {}).get('cantidad', 0),
+            'total': totales.get(estado, {}).get('total') or 0,
+        }
+        for estado, _ in Pago._meta.get_field('estado').choices
+    ]
+    total_pagos = sum(fila['cantidad'] for fila in resumen_estados)
+
+    # Paginación por clave (fecha_pago, id)
+    pagos, cursor_siguiente, cursor_anterior = paginar_keyset(
+        pagos_filtrados.select_related('cliente'),
+        'fecha_pago',
+        despues=request.GET.get('despues'),
+        antes=request.GET.get('antes'),
+        tamano=PAGOS_POR_PAGINA,
+    )
+    query_filtros = urlencode({clave: valor for clave, valor in filtros.items() if valor})
+
+    return render(request, 'admin_gym/pagos.html', {
+        'form': form,
+        'pagos': pagos,
+        'filtros': filtros,
+        'query_filtros': query_filtros,
+        'resumen_estados': resumen_estados,
+        'total_pagos': total_pagos,
+        'cursor_siguiente': cursor_siguiente,
+        'cursor_anterior': cursor_anterior,
+        'planes': Cliente.TIPOS_MEMBRESIA,
+    })
 
 @login_required
 @user_passes_test(es_admin)
@@ -441,6 +513,27 @@ def reportes(request):
         'clientes_recientes': clientes_recientes,
     })
 
+@login_required
+@user_passes_test(es_admin)
+def reportes_analitica(request):
+    try:
+        from .analitica import obtener_metricas
+        metricas = obtener_metricas()
+    except ImportError:
+        return render(request, 'admin_gym/reportes_analitica.html', {
+            'error': 'La analítica requiere NumPy. Instálelo con: pip install numpy',
+        })
+
+    planes = [
+        {**mrr, 'probabilidad': renovacion['probabilidad']}
+        for mrr, renovacion in zip(metricas['mrr_por_plan'], metricas['renovacion_por_plan'])
+    ]
+    return render(request, 'admin_gym/reportes_analitica.html', {
+        'metricas': metricas,
+        'planes': planes,
+        'maximo_semanal': max(metricas['asistencia_semanal'], default=0) or 1,
+    })
+
 @login_required
 @user_passes_test(es_admin)
 def configuracion(request):
@@ -467,43 +560,49 @@ def avisar_pago(request, pago_id):
 @login_required
 @user_passes_test(es_admin)
 def marcar_pagado(request, pago_id):
-    pago = get_object_or_404(Pago, id=pago_id)
+    pago = get_object_or_404(Pago.objects.select_related('cliente'), id=pago_id)
     if request.method == "POST":
-        pago.estado = 'Pagado'
-        pago.save()
-        
-        # Actualizar estado del cliente
-        pago.cliente.estado_membresia = 'activa'
-        pago.cliente.fecha_vencimiento = pago.vencimiento
-        pago.cliente.save()
-        
+        PagoService.marcar_pagado(pago.id)
         messages.success(request, f'Pago de {pago.cliente.nombre} marcado como pagado.')
     return redirect('pagos')
 
 @login_required
 @user_passes_test(es_admin)
 def marcar_vencido(request, pago_id):
-    pago = get_object_or_404(Pago, id=pago_id)
+    pago = get_object_or_404(Pago.objects.select_related('cliente'), id=pago_id)
     if request.method == "POST":
-        pago.estado = 'Vencido'
-        pago.save()
-        
-        # Actualizar estado del cliente
-        pago.cliente.estado_membresia = 'vencida'
-        pago.cliente.save()
-        
-        # Enviar notificación de vencimiento
-        try:
-            send_mail(
-                'Membresía Vencida - GymPro',
-                f'Hola {pago.cliente.nombre},\n\nTu membresía ha vencido. Para continuar usando nuestros servicios, por favor renueva tu membresía.\n\nMonto: ${pago.monto}\nPlan: {pago.get_plan_display()}\n\nContacta con nosotros para renovar.\n\nSaludos,\nEquipo GymPro',
-                'proyectogym12@gmail.com',
-                [pago.cliente.email],
-                fail_silently=False,
-            )
-            messages.success(request, f'Pago marcado como vencido y notificación enviada a {pago.cliente.nombre}.')
-        except Exception as e:
-            messages.warning(request, f'Pago marcado como vencido pero error enviando email: {str(e)}')
+        if PagoService.marcar_vencido(pago.id):
+            messages.success(request, f'Pago marcado como vencido. Notificación a {pago.cliente.nombre} en cola de envío.')
+        else:
+            messages.error(request, f'El pago de {pago.cliente.nombre} no está pendiente.')
+    return redirect('pagos')
+
+@login_required
+@user_passes_test(es_admin)
+def marcar_pagos_lote(request):
+    if request.method != "POST":
+        messages.error(request, "Método no permitido. Use POST.")
+        return redirect('pagos')
+
+    try:
+        pago_ids = [int(pago_id) for pago_id in request.POST.getlist('pago_ids')]
+    except ValueError:
+        messages.error(request, "Selección de pagos inválida.")
+        return redirect('pagos')
+
+    if not pago_ids:
+        messages.warning(request, "No se seleccionaron pagos.")
+        return redirect('pagos')
+
+    accion = request.POST.get('accion')
+    if accion == 'pagado':
+        actualizados = PagoService.marcar_pagados(pago_ids)
+        messages.success(request, f'Pagos marcados como pagados: {actualizados}.')
+    elif accion == 'vencido':
+        actualizados = PagoService.marcar_vencidos(pago_ids)
+        messages.success(request, f'Pagos marcados como vencidos: {actualizados}. Notificaciones en cola de envío.')
+    else:
+        messages.error(request, "Acción no válida.")
     return redirect('pagos')
 
 # --- Exportación ---
@@ -635,52 +734,44 @@ def validar_qr_api(request):
         if not qr_code:
             return JsonResponse({'success': False, 'message': 'Código QR inválido'})
         
-        # Parsear QR del alumno: user_id:token:timestamp
-        try:
-            parts = qr_code.split(':')
-            if len(parts) != 3:
-                raise ValueError("Formato QR inválido")
-            
-            user_id = int(parts[0])
-            token = parts[1]
-            timestamp = float(parts[2])
-            
-            # Verificar que no haya expirado (5 minutos)
-            import time
-            if time.time() - timestamp > 300:
-                return JsonResponse({'success': False, 'message': 'QR expirado'})
-            
-        except (ValueError, IndexError):
-            logger.warning(f'QR code no válido: {qr_code}')
-            return JsonResponse({'success': False, 'message': 'Código QR no válido'})
+        ip = request.META.get('REMOTE_ADDR')
         
-        # Buscar cliente por user_id
+        # Los tokens firmados se verifican antes de consultar la base
         try:
-            cliente = Cliente.objects.select_related('user').get(user_id=user_id, activo=True)
-        except Cliente.DoesNotExist:
-            logger.warning(f'Cliente no encontrado para user_id: {user_id}')
+            campo, valor = AccesoService.resolver_codigo(qr_code)
+        except TokenInvalido as e:
+            logger.warning(f'QR code rechazado ({e}): {qr_code}')
+            registrar_acceso(None, qr_code, False, str(e), ip)
+            return JsonResponse({'success': False, 'message': str(e)})
+        
+        cliente = Cliente.objects.filter(**{campo: valor}, activo=True).first()
+        if cliente is None:
+            logger.warning(f'Cliente no encontrado para {campo}: {valor}')
+            registrar_acceso(None, qr_code, False, 'Cliente no encontrado', ip)
             return JsonResponse({'success': False, 'message': 'Cliente no encontrado'})
         
         # Verificar si puede acceder
         if not cliente.puede_acceder():
             estado = cliente.get_estado_membresia_display()
             logger.info(f'Acceso denegado para cliente {cliente.nombre}: {estado}')
+            registrar_acceso(cliente.id, qr_code, False, f'Acceso denegado - Estado: {estado}', ip)
             return JsonResponse({
                 'success': False, 
                 'message': f'Acceso denegado - Estado: {estado}'
             })
         
         # Verificar si ya marcó asistencia en las últimas 12 horas
-        hace_12_horas = timezone.now() - timedelta(hours=12)
+        hace_12_horas = timezone.now() - timedelta(hours=HORAS_ENTRE_ASISTENCIAS)
         asistencia_existente = Asistencia.objects.filter(
             cliente=cliente,
             fecha__gte=hace_12_horas
         ).first()
         
         if asistencia_existente:
-            tiempo_restante = asistencia_existente.fecha + timedelta(hours=12) - timezone.now()
+            tiempo_restante = asistencia_existente.fecha + timedelta(hours=HORAS_ENTRE_ASISTENCIAS) - timezone.now()
             horas_restantes = int(tiempo_restante.total_seconds() // 3600)
             minutos_restantes = int((tiempo_restante.total_seconds() % 3600) // 60)
+            registrar_acceso(cliente.id, qr_code, False, 'Asistencia ya registrada', ip)
             
             return JsonResponse({
                 'success': False, 
@@ -692,6 +783,7 @@ def validar_qr_api(request):
             cliente=cliente,
             fecha=timezone.now()
         )
+        registrar_acceso(cliente.id, qr_code, True, ip=ip)
         
         logger.info(f'Asistencia registrada para cliente: {cliente.nombre}')
         return JsonResponse({
@@ -708,6 +800,89 @@ def validar_qr_api(request):
         logger.error(f'Error en validar_qr_api: {str(e)}')
         return JsonResponse({'success': False, 'message': 'Error interno del sistema'})
 
+@login_required
+@user_passes_test(es_admin)
+def validar_qr_lote_api(request):
+    """Valida en una sola petición los códigos leídos por varios torniquetes"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Método no permitido'}, status=405)
+    try:
+        codigos = json.loads(request.body).get('codigos')
+    except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+        return JsonResponse({'success': False, 'message': 'Datos JSON inválidos'}, status=400)
+    if not isinstance(codigos, list) or not codigos or not all(isinstance(c, str) for c in codigos):
+        return JsonResponse({'success': False, 'message': 'Indique una lista de códigos'}, status=400)
+    if len(codigos) > MAX_CODIGOS_LOTE:
+        return JsonResponse({'success': False, 'message': f'Máximo {MAX_CODIGOS_LOTE} códigos por lote'}, status=400)
+
+    resultados = AccesoService.validar_lote([codigo.strip() for codigo in codigos], ip=request.META.get('REMOTE_ADDR'))
+    hora = timezone.localtime().strftime('%H:%M')
+    return JsonResponse({'success': True, 'hora': hora, 'resultados': resultados})
+
+@login_required
+@user_passes_test(es_admin)
+def accesos_cliente_api(request, cliente_id):
+    """Escaneos de un cliente en un rango de fechas (detalle reciente y resumen mensual archivado)"""
+    try:
+        hasta = date.fromisoformat(request.GET['hasta']) if request.GET.get('hasta') else timezone.localdate()
+        desde = date.fromisoformat(request.GET['desde']) if request.GET.get('desde') else hasta - timedelta(days=30)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Fechas inválidas, use AAAA-MM-DD'}, status=400)
+    inicio = timezone.make_aware(datetime.combine(desde, datetime.min.time()))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+
+    accesos, cursor_siguiente, cursor_anterior = paginar_keyset(
+        AccesoQR.objects.filter(cliente_id=cliente_id, fecha_acceso__gte=inicio, fecha_acceso__lt=fin),
+        'fecha_acceso',
+        despues=request.GET.get('despues'),
+        antes=request.GET.get('antes'),
+        tamano=ACCESOS_POR_PAGINA,
+    )
+    meses = ResumenMensualAcceso.objects.filter(
+        cliente_id=cliente_id, mes__gte=desde.replace(day=1), mes__lte=hasta
+    ).order_by('mes')
+    return JsonResponse({
+        'cliente_id': cliente_id,
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'accesos': [
+            {
+                'fecha': acceso.fecha_acceso.isoformat(),
+                'exitoso': acceso.exitoso,
+                'motivo': acceso.motivo_fallo,
+                'ip': acceso.ip_address,
+            }
+            for acceso in accesos
+        ],
+        'siguiente': cursor_siguiente,
+        'anterior': cursor_anterior,
+        'archivado': [
+            {
+                'mes': resumen.mes.isoformat(),
+                'exitosos': resumen.exitosos,
+                'fallidos': resumen.fallidos,
+                'ultimo_acceso': resumen.ultimo_acceso.isoformat() if resumen.ultimo_acceso else None,
+            }
+            for resumen in meses
+        ],
+    })
+
+@login_required
+def mi_qr_api(request):
+    """Token QR rotativo vigente del cliente autenticado, para mostrarlo en la app"""
+    cliente_id = Cliente.objects.filter(user=request.user, activo=True).values_list('id', flat=True).first()
+    if cliente_id is None:
+        return JsonResponse({'success': False, 'message': 'Cliente no encontrado'}, status=404)
+    response = JsonResponse({
+        'success': True,
+        'token': generar_token(cliente_id),
+        'periodo': PERIODO,
+        'expira_en': segundos_restantes(),
+    })
+    response['Cache-Control'] = 'no-store'
+    return response
+
+@sin_renovar_sesion
 @login_required
 def asistencias_hoy_api(request):
     hace_12_horas = timezone.now() - timedelta(hours=12)
@@ -729,6 +904,7 @@ def asistencias_hoy_api(request):
     
     return JsonResponse(data)
 
+@sin_renovar_sesion
 @login_required
 def dashboard_stats_api(request):
     hoy = timezone.now().date()
@@ -746,4 +922,126 @@ def dashboard_stats_api(request):
         ]
     }
     
-    return JsonResponse(data)
\ No newline at end of file
+    return JsonResponse(data)
+
+@login_required
+@user_passes_test(es_personal)
+def progreso_cliente_api(request, cliente_id):
+    """Series de progreso de un cliente; por defecto el último año en todos sus ejercicios"""
+    cliente = get_object_or_404(Cliente, id=cliente_id)
+    try:
+        desde = date.fromisoformat(request.GET['desde']) if request.GET.get('desde') else None
+        hasta = date.fromisoformat(request.GET['hasta']) if request.GET.get('hasta') else None
+        ejercicios = [int(e) for e in request.GET.getlist('ejercicio')]
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Parámetros inválidos'}, status=400)
+
+    data = serie_progreso(cliente.id, desde=desde, hasta=hasta, ejercicios=ejercicios)
+    data['cliente'] = cliente.nombre
+    return JsonResponse(data)
+
+@login_required
+@user_passes_test(es_personal)
+def registrar_progreso_lote_api(request):
+    """Registra en una sola petición todas las series de una sesión de entrenamiento"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Método no permitido'}, status=405)
+    try:
+        datos = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({'success': False, 'message': 'Datos JSON inválidos'}, status=400)
+    if not isinstance(datos, dict):
+        return JsonResponse({'success': False, 'message': 'Datos JSON inválidos'}, status=400)
+
+    try:
+        respuesta, repetido = ProgresoService.registrar_lote(
+            datos, usuario=request.user, clave=request.headers.get('Idempotency-Key')
+        )
+    except ValidationError as e:
+        return JsonResponse({'success': False, 'errores': e.messages}, status=400)
+
+    return JsonResponse({**respuesta, 'repetido': repetido}, status=200 if repetido else 201)
+
+@login_required
+@user_passes_test(es_personal)
+def asignar_plantilla_api(request, plantilla_id):
+    """Asigna (por referencia) o clona una plantilla de rutina a muchos clientes a la vez"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Método no permitido'}, status=405)
+    try:
+        datos = json.loads(request.body)
+        cliente_ids = [int(c) for c in datos.get('cliente_ids', [])]
+        fecha_inicio = date.fromisoformat(datos['fecha_inicio']) if datos.get('fecha_inicio') else None
+        fecha_fin = date.fromisoformat(datos['fecha_fin']) if datos.get('fecha_fin') else None
+    except (json.JSONDecodeError, UnicodeDecodeError, AttributeError, TypeError, ValueError):
+        return JsonResponse({'success': False, 'message': 'Datos JSON inválidos'}, status=400)
+
+    modo = datos.get('modo', 'asignar')
+    if modo not in ('asignar', 'clonar') or not cliente_ids:
+        return JsonResponse({'success': False, 'message': 'Indique cliente_ids y modo asignar o clonar'}, status=400)
+
+    operacion = RutinaService.clonar_plantilla if modo == 'clonar' else RutinaService.asignar_plantilla
+    try:
+        asignados = operacion(plantilla_id, cliente_ids, request.user, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+    except Rutina.DoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Plantilla no encontrada'}, status=404)
+
+    return JsonResponse({'success': True, 'modo': modo, 'asignados': asignados, 'omitidos': len(set(cliente_ids)) - asignados})
+
+@login_required
+def rutinas_cliente_api(request, cliente_id):
+    """Rutinas activas de un cliente, para el personal o para el propio cliente"""
+    if not (es_personal(request.user) or Cliente.objects.filter(id=cliente_id, user=request.user).exists()):
+        return JsonResponse({'success': False, 'message': 'No autorizado'}, status=403)
+    return JsonResponse({'cliente_id': cliente_id, 'rutinas': rutinas_activas(cliente_id)})
+
+FORMATOS_QR = {
+    'png': (renderizar_png, 'image/png'),
+    'svg': (renderizar_svg, 'image/svg+xml'),
+}
+
+@login_required
+def qr_cliente(request, cliente_id, formato):
+    """QR del cliente dibujado al vuelo, con ETag para que el navegador lo reutilice"""
+    if formato not in FORMATOS_QR:
+        raise Http404
+    if not (es_personal(request.user) or Cliente.objects.filter(id=cliente_id, user=request.user).exists()):
+        return JsonResponse({'success': False, 'message': 'No autorizado'}, status=403)
+    contenido = Cliente.objects.filter(id=cliente_id).exclude(qr_code='').values_list('qr_code', flat=True).first()
+    if contenido is None:
+        raise Http404
+
+    etag = f'"{huella(contenido)}-{formato}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        renderizar, tipo = FORMATOS_QR[formato]
+        response = HttpResponse(renderizar(contenido), content_type=tipo)
+    response['ETag'] = etag
+    # El código da acceso al gimnasio: solo la caché del navegador, nunca las compartidas
+    patch_cache_control(response, private=True, max_age=60 * 60 * 24)
+    return response
+
+@login_required
+@user_passes_test(es_personal)
+def buscar_api(request):
+    """Type-ahead de clientes o ejercicios"""
+    tipo = request.GET.get('tipo', 'cliente')
+    if tipo not in ('cliente', 'ejercicio'):
+        return JsonResponse({'success': False, 'message': 'Tipo inválido'}, status=400)
+    try:
+        limite = min(max(int(request.GET.get('limite', 10)), 1), 50)
+    except ValueError:
+        limite = 10
+
+    objetos = buscar_objetos(request.GET.get('q', ''), tipo, limite=limite)
+    if tipo == 'cliente':
+        resultados = [
+            {'id': c.id, 'nombre': c.nombre, 'rut': c.rut, 'email': c.email, 'estado_membresia': c.estado_membresia}
+            for c in objetos
+        ]
+    else:
+        resultados = [
+            {'id': e.id, 'nombre': e.nombre, 'tipo': e.tipo, 'grupo_muscular': e.grupo_muscular}
+            for e in objetos
+        ]
+    return JsonResponse({'resultados': resultados})
@@ -79,6 +79,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'admin_gym.middleware.SecurityMiddleware',
+    'admin_gym.middleware.RenovacionSesionMiddleware',
     'admin_gym.middleware.AuditMiddleware',
     'admin_gym.middleware.PerformanceMiddleware',
 ]
@@ -185,7 +186,8 @@ SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_AGE = 3600  # 1 hora
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_COOKIE_SAMESITE = 'Strict'
-SESSION_SAVE_EVERY_REQUEST = True
+# Expiración deslizante: RenovacionSesionMiddleware renueva la hora a lo sumo una vez por intervalo
+SESSION_RENOVACION_SEGUNDOS = 60
 
 # CSRF
 CSRF_COOKIE_SECURE = not DEBUG
@@ -290,12 +292,23 @@ handler404 = 'admin_gym.error_handlers.handler404'
 handler500 = 'admin_gym.error_handlers.handler500'
 handler403 = 'admin_gym.error_handlers.handler403'
 
+# Sincronización de clientes con entrenador_app (outbox, comando sincronizar_entrenador)
+ENTRENADOR_APP_RUTA = os.environ.get('ENTRENADOR_APP_RUTA', str(BASE_DIR.parent.parent / 'entrenador_app'))
+ENTRENADOR_APP_MODELO_CLIENTE = 'entrenador_app.admin_gym_models.AdminGymCliente'
+
+# Archivo histórico (comando archivar_historial): JSONL comprimido por tabla y mes
+ARCHIVO_HISTORICO_DIR = BASE_DIR / 'archivo'
+
 # RNF-07: Configuraciones personalizables
 GYM_CONFIG = {
     'HORARIO_APERTURA': '06:00',
     'HORARIO_CIERRE': '23:00',
     'CAPACIDAD_MAXIMA': 500,
     'QR_OFFLINE_TIMEOUT': 600,  # 10 minutos
+    'RETENCION_ACCESOS_DIAS': 90,  # Luego el detalle de AccesoQR se resume por mes
+    'RETENCION_HISTORIAL_DIAS': 365,  # Asistencia, auditoría y notificaciones más antiguas pasan al archivo histórico
+    'QR_FORMATO_ANTIGUO': False,  # Acepta QR user_id:token:timestamp sin firma (solo durante la migración a tokens firmados)
+    'ACCESO_POR_RUT': False,  # Acepta el RUT tecleado o el QR de la cédula en vez del token del socio
     'NOTIFICACIONES_ACTIVAS': True,
     'RACHA_MINIMA_NOTIFICACION': 7,  # días
 }